@@ -0,0 +1,24 @@
+(* TSV Importer *)
+
+Begin["System`Convert`TableDump`"]
+
+
+(* ImportTSV is implemented in Python, see mathics/builtin/importexport.py *)
+
+ImportExport`RegisterImport[
+    "TSV",
+    System`Convert`TableDump`ImportTSV,
+    {},
+    FunctionChannels -> {"FileNames"},
+    AvailableElements -> {"Data", "Grid"},
+    DefaultElement -> "Data",
+    Options -> {
+        "CharacterEncoding",
+        "FieldSeparators",
+        "HeaderLines"
+    },
+    PartialAccess -> True
+]
+
+
+End[]
@@ -5,11 +5,11 @@ from __future__ import unicode_literals
 from __future__ import absolute_import
 
 from mathics.builtin import (
-    algebra, arithmetic, assignment, attributes, calculus, combinatorial, compilation,
+    algebra, arithmetic, assignment, associations, attributes, calculus, combinatorial, compilation,
     comparison, control, datentime, diffeqns, evaluation, exptrig, functional,
     graphics, graphics3d, image, inout, integer, linalg, lists, logic, manipulate, natlang, numbertheory,
-    numeric, options, patterns, plot, physchemdata, randomnumbers, recurrence,
-    specialfunctions, scoping, strings, structure, system, tensors, xmlformat)
+    numeric, options, parallel, patterns, plot, physchemdata, randomnumbers, recurrence,
+    specialfunctions, scoping, sparse, strings, structure, system, tensors, xmlformat)
 
 from mathics.builtin.base import (
     Builtin, SympyObject, BoxConstruct, Operator, PatternObject)
@@ -17,11 +17,11 @@ from mathics.builtin.base import (
 from mathics.settings import ENABLE_FILES_MODULE
 
 modules = [
-    algebra, arithmetic, assignment, attributes, calculus, combinatorial, compilation,
+    algebra, arithmetic, assignment, associations, attributes, calculus, combinatorial, compilation,
     comparison, control, datentime, diffeqns, evaluation, exptrig, functional,
     graphics, graphics3d, image, inout, integer, linalg, lists, logic, manipulate, natlang, numbertheory,
-    numeric, options, patterns, plot, physchemdata, randomnumbers, recurrence,
-    specialfunctions, scoping, strings, structure, system, tensors, xmlformat]
+    numeric, options, parallel, patterns, plot, physchemdata, randomnumbers, recurrence,
+    specialfunctions, scoping, sparse, strings, structure, system, tensors, xmlformat]
 
 if ENABLE_FILES_MODULE:
     from mathics.builtin import files, importexport
@@ -65,6 +65,9 @@ box_constructs = {}
 pattern_objects = {}
 builtins_precedence = {}
 
+# Operators of all builtins, as displayed in boxes
+display_operators = set()
+
 
 def add_builtins(new_builtins):
     for var_name, builtin in new_builtins:
@@ -79,6 +82,9 @@ def add_builtins(new_builtins):
             builtins_precedence[name] = builtin.precedence
         if isinstance(builtin, PatternObject):
             pattern_objects[name] = builtin.__class__
+        operator = builtin.get_operator_display()
+        if operator is not None:
+            display_operators.add(operator)
     builtins.update(dict(new_builtins))
 
 new_builtins = builtins
@@ -247,6 +247,8 @@ class Simplify(Builtin):
      = x f[{y}]
     """
 
+    memoize = True
+
     rules = {
         'Simplify[list_List]': 'Simplify /@ list',
         'Simplify[rule_Rule]': 'Simplify /@ rule',
@@ -283,6 +285,8 @@ class Together(Builtin):
      = f[x] (1 + x) / x ^ 2
     """
 
+    memoize = True
+
     attributes = ['Listable']
 
     def apply(self, expr, evaluation):
@@ -315,6 +319,8 @@ class Factor(Builtin):
      = {x (1 + x)}
     """
 
+    memoize = True
+
     attributes = ('Listable',)
 
     def apply(self, expr, evaluation):
@@ -520,6 +526,8 @@ class Apart(Builtin):
      = f[2 x]
     """
 
+    memoize = True
+
     attributes = ['Listable']
     rules = {
         'Apart[expr_]': (
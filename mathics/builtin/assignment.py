@@ -177,6 +177,12 @@ class _SetOperator(object):
                 evaluation.message('$IterationLimit', 'limset', rhs)
                 return False
             ignore_protection = True
+        elif lhs_name == 'System`$OutputSizeLimit':
+            if ((not rhs_int_value or rhs_int_value <= 0) and
+                    not rhs.has_form('DirectedInfinity', 1)):
+                evaluation.message('$OutputSizeLimit', 'limset', rhs)
+                return False
+            ignore_protection = True
         elif lhs_name == 'System`$ModuleNumber':
             if not rhs_int_value or rhs_int_value <= 0:
                 evaluation.message('$ModuleNumber', 'set', rhs)
@@ -764,6 +770,10 @@ class Definition(Builtin):
                                 'HoldForm', expr.head), *expr.leaves)
                         return Expression('InputForm', expr)
                     print_rule(rule, lhs=lhs, rhs=rhs)
+        if 'System`ReadProtected' not in attributes:
+            # In and Out are kept in the history rather than as downvalues
+            for rule in evaluation.definitions.history.get_rules(name):
+                print_rule(rule)
         for rule in all.defaultvalues:
             print_rule(rule)
         if all.options:
@@ -871,6 +881,8 @@ class Clear(Builtin):
                     continue
                 definition = evaluation.definitions.get_user_definition(name)
                 self.do_clear(definition)
+                evaluation.definitions.mark_changed(definition)
+                evaluation.definitions.clear_definitions_cache(name)
 
         return Symbol('Null')
 
@@ -1043,7 +1055,7 @@ class Quit(Builtin):
     def apply(self, evaluation):
         'Quit[]'
 
-        evaluation.definitions.set_user_definitions({})
+        evaluation.definitions.reset_user_definitions()
         return Symbol('Null')
 
 
@@ -1056,8 +1068,12 @@ def get_symbol_values(symbol, func_name, position, evaluation):
         definition = evaluation.definitions.get_definition(name)
     else:
         definition = evaluation.definitions.get_user_definition(name)
+    rules = definition.get_values_list(position)
+    if position == 'down':
+        # In and Out are kept in the history rather than as downvalues
+        rules = rules + evaluation.definitions.history.get_rules(name)
     result = Expression('List')
-    for rule in definition.get_values_list(position):
+    for rule in rules:
         if isinstance(rule, Rule):
             pattern = rule.pattern
             if pattern.has_form('HoldPattern', 1):
@@ -0,0 +1,1057 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Associations
+
+An association maps keys to values and keeps its keys in the order in
+which they were added. Keys are looked up by hash, so that looking up,
+adding and dropping a key take constant time.
+"""
+
+from __future__ import unicode_literals
+from __future__ import absolute_import
+
+import weakref
+from collections import OrderedDict
+
+from mathics.builtin.base import Builtin, AtomBuiltin, Test
+from mathics.builtin.lists import list_boxes
+from mathics.core.expression import Atom, Expression, Symbol, String, Integer
+from mathics.core.rules import BuiltinRule, ExpressionKey
+
+
+_MIN_TRIM = 64
+
+
+class _AssociationStore(object):
+    """
+    The entries of associations derived from each other by AssociateTo and
+    KeyDropFrom. Every association is a view of a version of the store.
+    Only the latest version is held in the dictionary; the undo log of the
+    changes lets views of older versions, which are rarely used after an
+    update, copy their entries back out when they are used.
+    """
+
+    def __init__(self, entries, next_seq):
+        self.entries = entries      # ExpressionKey -> (sequence number, rule)
+        self.next_seq = next_seq
+        self.version = 0
+        self.log = []               # (ExpressionKey, old entry or None)
+        self.log_start = 0          # version before the first logged change
+        self.views = weakref.WeakValueDictionary()
+        self.next_trim = _MIN_TRIM
+        # names of the symbols the entries depend on, a superset once
+        # entries are replaced, those not yet in changed, and the most
+        # recent change to any of them as of checked, a (definitions, time)
+        # pair
+        self.symbols = None
+        self.pending = set()
+        self.changed = 0
+        self.checked = None
+
+    def add_view(self, view):
+        self.views[id(view)] = view
+
+    def trim_log(self):
+        # Replaced views are usually only freed by the garbage collector,
+        # so trimming is tried only when the log has doubled in length.
+        if len(self.log) < self.next_trim:
+            return
+        versions = [view.version for view in self.views.values()]
+        oldest = min(versions) if versions else self.version
+        if oldest > self.log_start:
+            del self.log[:oldest - self.log_start]
+            self.log_start = oldest
+        self.next_trim = 2 * len(self.log) + _MIN_TRIM
+
+    def add_symbols(self, rules):
+        if self.symbols is not None:
+            names = _symbol_names(rules)
+            self.pending.update(names - self.symbols)
+            self.symbols.update(names)
+
+    def get_symbols(self):
+        if self.symbols is None:
+            self.symbols = set(_symbol_names(
+                [rule for seq, rule in self.entries.values()]))
+            self.checked = None
+        return self.symbols
+
+    def get_last_changed(self, definitions):
+        """
+        The time of the most recent change to a symbol the entries depend
+        on. Only the symbols added and the definitions changed since the
+        last call are looked at.
+        """
+
+        symbols = self.get_symbols()
+        changed_names = None
+        if self.checked is not None and self.checked[0] is definitions:
+            changed_names = definitions.get_changed_names(self.checked[1])
+        if changed_names is None:
+            names = symbols
+            self.changed = 0
+        else:
+            names = self.pending.union(
+                name for name in changed_names if name in symbols)
+        for name in names:
+            self.changed = max(
+                self.changed, definitions.last_changed(Symbol(name)))
+        self.pending.clear()
+        self.checked = (definitions, definitions.now)
+        return self.changed
+
+
+class Association(Atom):
+    def __init__(self, store, version=None, **kwargs):
+        super(Association, self).__init__(**kwargs)
+        self.store = store
+        self.version = store.version if version is None else version
+        self.hash = None
+        # when the entries were last evaluated
+        self.last_evaluated = None
+        store.add_view(self)
+
+    @staticmethod
+    def from_rules(rules):
+        """
+        Creates an association from a list of rules. A later rule for a
+        key replaces the value of an earlier one, the key keeps its
+        position.
+        """
+
+        entries = OrderedDict()
+        seq = 0
+        for rule in rules:
+            key = ExpressionKey(rule.leaves[0])
+            old = entries.get(key)
+            if old is None:
+                entries[key] = (seq, rule)
+                seq += 1
+            else:
+                entries[key] = (old[0], rule)
+        return Association(_AssociationStore(entries, seq))
+
+    def get_entries(self):
+        if self.version != self.store.version:
+            self.detach()
+        return self.store.entries
+
+    def detach(self):
+        # copy the entries of this view's version into a store of its own
+        store = self.store
+        entries = store.entries.copy()
+        reinserted = False
+        for key, old in reversed(store.log[self.version - store.log_start:]):
+            if old is None:
+                del entries[key]
+            else:
+                reinserted = reinserted or key not in entries
+                entries[key] = old
+        if reinserted:
+            entries = OrderedDict(
+                sorted(entries.items(), key=lambda item: item[1][0]))
+        store.views.pop(id(self), None)
+        self.store = _AssociationStore(entries, store.next_seq)
+        self.version = 0
+        self.store.add_view(self)
+
+    def updated(self, rules=(), dropped=()):
+        """
+        Returns the association with rules added and the keys dropped,
+        leaving this one unchanged.
+        """
+
+        entries = self.get_entries()
+        store = self.store
+        store.trim_log()
+        store.add_symbols(rules)
+        log = store.log
+        for rule in rules:
+            key = ExpressionKey(rule.leaves[0])
+            old = entries.get(key)
+            if old is None:
+                entries[key] = (store.next_seq, rule)
+                store.next_seq += 1
+            else:
+                entries[key] = (old[0], rule)
+            log.append((key, old))
+        for key in dropped:
+            key = ExpressionKey(key)
+            old = entries.pop(key, None)
+            if old is not None:
+                log.append((key, old))
+        store.version = store.log_start + len(log)
+        result = Association(store)
+        result.last_evaluated = self.last_evaluated
+        return result
+
+    def get_rules(self):
+        return [rule for seq, rule in self.get_entries().values()]
+
+    def get_rule(self, key):
+        entry = self.get_entries().get(ExpressionKey(key))
+        if entry is not None:
+            return entry[1]
+
+    def get_length(self):
+        return len(self.get_entries())
+
+    def get_symbols(self):
+        # a superset of the names of the symbols the entries depend on
+        self.get_entries()
+        return self.store.get_symbols()
+
+    def get_last_changed(self, definitions):
+        self.get_entries()
+        return self.store.get_last_changed(definitions)
+
+    def evaluate(self, evaluation):
+        """
+        Evaluates the rules again if a definition they depend on changed
+        since they were last evaluated.
+        """
+
+        evaluation.check_stopped()
+        definitions = evaluation.definitions
+        if (self.last_evaluated is not None and
+                self.get_last_changed(definitions) <= self.last_evaluated):
+            return self
+        rules = self.get_rules()
+        new_rules = [rule.evaluate(evaluation) for rule in rules]
+        if all(new.same(rule) for new, rule in zip(new_rules, rules)):
+            result = self
+        else:
+            collected = []
+            if not _collect_rules(new_rules, collected):
+                return Expression('Association', *new_rules)
+            result = Association.from_rules(collected)
+        result.last_evaluated = definitions.now
+        return result
+
+    def apply_rules(self, rules, evaluation, level=0, options=None):
+        """
+        Applies rules to the association as a whole, and otherwise to the
+        keys and values of its entries.
+        """
+
+        if options is None:
+            result, applied = super(Association, self).apply_rules(
+                rules, evaluation, level, options)
+            if applied:
+                return result, True
+        applied = False
+        new_rules = []
+        for rule in self.get_rules():
+            new_leaves = []
+            for leaf in rule.leaves:
+                new, sub_applied = leaf.apply_rules(
+                    rules, evaluation, level + 1, options)
+                applied = applied or sub_applied
+                new_leaves.append(new)
+            new_rules.append(Expression(rule.head, *new_leaves))
+        if applied:
+            return Expression('Association', *new_rules), True
+        if options is not None:
+            return super(Association, self).apply_rules(
+                rules, evaluation, level, options)
+        return self, False
+
+    def get_expression(self):
+        return Expression('Association', *self.get_rules())
+
+    def get_lookup_name(self):
+        # assoc[key] is a subvalue of Association
+        return 'System`Association'
+
+    def __str__(self):
+        return '<|%s|>' % ', '.join(str(rule) for rule in self.get_rules())
+
+    def __getstate__(self):
+        # the store holds weak references, only its entries are pickled
+        state = self.__dict__.copy()
+        state['store'] = self.get_rules()
+        state['version'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        store = Association.from_rules(state['store']).store
+        self.store = store
+        self.version = store.version
+        self.last_evaluated = None
+        store.add_view(self)
+
+    def do_copy(self):
+        return Association(self.store, self.version)
+
+    def default_format(self, evaluation, form):
+        return self.get_expression().default_format(evaluation, form)
+
+    def get_sort_key(self, pattern_sort=False):
+        if pattern_sort:
+            return super(Association, self).get_sort_key(True)
+        else:
+            return self.get_expression().get_sort_key()
+
+    def same(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Association):
+            return False
+        if self.store is other.store and self.version == other.version:
+            return True
+        rules = self.get_rules()
+        other_rules = other.get_rules()
+        return len(rules) == len(other_rules) and all(
+            rule.same(other_rule)
+            for rule, other_rule in zip(rules, other_rules))
+
+    def to_python(self, *args, **kwargs):
+        return dict((rule.leaves[0].to_python(*args, **kwargs),
+                     rule.leaves[1].to_python(*args, **kwargs))
+                    for rule in self.get_rules())
+
+    def __hash__(self):
+        if self.hash is None:
+            self.hash = hash(('Association',) + tuple(self.get_rules()))
+        return self.hash
+
+    def user_hash(self, update):
+        rules = self.get_rules()
+        update(('System`Association>%d>' % len(rules)).encode('utf8'))
+        for rule in rules:
+            rule.user_hash(update)
+
+    def atom_to_boxes(self, f, evaluation):
+        rules = self.get_rules()
+        if f.get_name() == 'System`FullForm':
+            boxes = [String('Association')] + list_boxes(rules, f, '[', ']')
+        else:
+            boxes = list_boxes(rules, f, '<|', '|>')
+        return Expression('RowBox', Expression('List', *boxes))
+
+
+def _is_rule(expr):
+    return expr.has_form(('Rule', 'RuleDelayed'), 2)
+
+
+def _symbol_names(exprs):
+    names = set()
+    for expr in exprs:
+        for atom in expr.get_atoms():
+            if isinstance(atom, Symbol):
+                names.add(atom.get_name())
+            elif isinstance(atom, Association):
+                names.update(atom.get_symbols())
+    return frozenset(names)
+
+
+def _collect_rules(items, rules):
+    """
+    Appends the rules in items, which may be rules, lists of rules and
+    associations, to rules. Returns False if there is anything else.
+    """
+
+    for item in items:
+        if _is_rule(item):
+            rules.append(item)
+        elif isinstance(item, Association):
+            rules.extend(item.get_rules())
+        elif item.has_form('List', None):
+            if not _collect_rules(item.leaves, rules):
+                return False
+        else:
+            return False
+    return True
+
+
+def _to_association(expr):
+    if isinstance(expr, Association):
+        return expr
+    rules = []
+    if _collect_rules([expr], rules):
+        return Association.from_rules(rules)
+
+
+def _strip_key(key):
+    if key.has_form('Key', 1):
+        return key.leaves[0]
+    return key
+
+
+def _get_value(assoc, key, default=None):
+    key = _strip_key(key)
+    rule = assoc.get_rule(key)
+    if rule is not None:
+        return rule.leaves[1]
+    if default is not None:
+        return default
+    return Expression('Missing', String('KeyAbsent'), key)
+
+
+def association_part(assoc, index, evaluation):
+    """
+    Gives the part of an association for one part index: the value for a
+    key, the value at a position, or the association of the entries for a
+    list of them. Returns None after a message if there is no such part.
+    """
+
+    if index.get_name() == 'System`All':
+        return assoc
+    if index.has_form('List', None):
+        rules = []
+        for leaf in index.leaves:
+            if isinstance(leaf, Integer):
+                rule = _get_rule_at(assoc, leaf, evaluation)
+                if rule is None:
+                    return None
+                rules.append(rule)
+            else:
+                rule = assoc.get_rule(_strip_key(leaf))
+                if rule is None:
+                    return Expression('Missing', String('KeyAbsent'),
+                                      _strip_key(leaf))
+                rules.append(rule)
+        return Association.from_rules(rules)
+    if isinstance(index, Integer):
+        rule = _get_rule_at(assoc, index, evaluation)
+        if rule is not None:
+            return rule.leaves[1]
+        return None
+    return _get_value(assoc, index)
+
+
+def _get_rule_at(assoc, index, evaluation):
+    rules = assoc.get_rules()
+    n = index.get_int_value()
+    if 1 <= n <= len(rules):
+        return rules[n - 1]
+    elif -len(rules) <= n <= -1:
+        return rules[n]
+    evaluation.message('Part', 'partw', index, assoc)
+
+
+class AssociationAtom(AtomBuiltin):
+    """
+    <dl>
+    <dt>'Association[$key1$ -> $val1$, $key2$ -> $val2$, ...]'
+    <dt>'<|$key1$ -> $val1$, $key2$ -> $val2$, ...|>'
+        <dd>represents an association between keys and values.
+    <dt>'$assoc$[$key$]'
+        <dd>gives the value for $key$ in $assoc$.
+    </dl>
+
+    >> a = <|x -> 1, y -> 2|>
+     = <|x -> 1, y -> 2|>
+    >> a[y]
+     = 2
+    >> a[z]
+     = Missing[KeyAbsent, z]
+
+    A later value for a key replaces an earlier one, the key keeps its
+    position:
+    >> <|x -> 1, y -> 2, x -> 3|>
+     = <|x -> 3, y -> 2|>
+
+    Lists of rules and associations are joined:
+    >> Association[{u -> 1, v -> 2}, <|w -> 3|>]
+     = <|u -> 1, v -> 2, w -> 3|>
+
+    Associations are atoms with head 'Association':
+    >> {Head[a], AtomQ[a], Length[a]}
+     = {Association, True, 2}
+
+    The order of the keys matters when comparing associations:
+    >> {a === <|x -> 1, y -> 2|>, a === <|y -> 2, x -> 1|>}
+     = {True, False}
+
+    Values of delayed rules are evaluated when they are looked up:
+    >> b = <|x :> RandomInteger[{1, 1}]|>;
+    >> b[x]
+     = 1
+
+    Values of other rules are evaluated again when the association is:
+    >> d = <|x -> y|>;
+    >> y = 5;
+    >> d
+     = <|x -> 5|>
+    >> y =.
+
+    Functions are mapped over the values, and replacements apply to the
+    keys and values:
+    >> Map[f, <|p -> 1, q :> r|>]
+     = <|p -> f[1], q :> f[r]|>
+    >> <|x -> y|> /. y -> 3
+     = <|x -> 3|>
+    >> MapIndexed[f, <|p -> 1|>]
+     = <|p -> f[1, {Key[p]}]|>
+
+    'Part' takes keys, positions and lists of them:
+    >> c = <|"x" -> 1, "y" -> 2, z -> 3|>;
+    >> {c[["y"]], c[[Key[z]]], c[[-1]]}
+     = {2, 3, 3}
+    >> c[[{"x", 3}]]
+     = <|x -> 1, z -> 3|>
+    >> c[[4]]
+     : Part 4 of <|x -> 1, y -> 2, z -> 3|> does not exist.
+     = <|x -> 1, y -> 2, z -> 3|>[[4]]
+
+    >> FullForm[<|"s" -> 1|>]
+     = Association[Rule["s", 1]]
+    >> InputForm[<|"s" -> 1|>]
+     = <|"s" -> 1|>
+
+    #> <|x -> 1, y|>
+     = Association[x -> 1, y]
+    #> <||>
+     = <||>
+    #> e = {<|x -> <|y -> z|>|>}; z = 2; e
+     = {<|x -> <|y -> 2|>|>}
+    #> Replace[<|p -> 1|>, 1 -> 2, {1}]
+     = <|p -> 2|>
+    #> f /@ <||>
+     = <||>
+    #> <|{1, 2} -> "p", 1.5 -> "q", "s" -> "r"|>[{1, 2}]
+     = p
+    """
+
+    def apply(self, rules, evaluation):
+        'Association[rules___]'
+
+        result = []
+        if _collect_rules(rules.get_sequence(), result):
+            result = Association.from_rules(result)
+            result.last_evaluated = evaluation.definitions.now
+            return result
+
+    def apply_makeboxes(self, rules, f, evaluation):
+        '''MakeBoxes[Association[rules___],
+            f:StandardForm|TraditionalForm|OutputForm|InputForm]'''
+
+        rules = rules.get_sequence()
+        if all(_is_rule(rule) for rule in rules):
+            boxes = list_boxes(rules, f, "<|", "|>")
+        else:
+            boxes = [Expression('MakeBoxes', Symbol('Association'), f)]
+            boxes.extend(list_boxes(rules, f, "[", "]"))
+        return Expression('RowBox', Expression('List', *boxes))
+
+    def lookup(self, assoc, key, evaluation):
+        if isinstance(assoc, Association):
+            return _get_value(assoc, key)
+
+    def contribute(self, definitions):
+        from mathics.core.parser import parse_builtin_rule
+
+        super(AssociationAtom, self).contribute(definitions)
+        # assoc[key] has no symbol to attach a down value to, it is a sub
+        # value of Association like Association[...][key]
+        definitions.builtin[self.get_name()].add_rule_at(BuiltinRule(
+            parse_builtin_rule('assoc_Association[key_]'), self.lookup,
+            system=True), 'sub')
+
+
+class AssociationQ(Test):
+    """
+    <dl>
+    <dt>'AssociationQ[$expr$]'
+        <dd>gives 'True' if $expr$ is a valid association, and 'False'
+        otherwise.
+    </dl>
+
+    >> AssociationQ[<|a -> 1|>]
+     = True
+    >> AssociationQ[{a -> 1}]
+     = False
+    """
+
+    def test(self, expr):
+        return isinstance(expr, Association)
+
+
+class Key(Builtin):
+    """
+    <dl>
+    <dt>'Key[$key$]'
+        <dd>represents a key in an association, also when $key$ could be
+        taken as a part or list of keys.
+    <dt>'Key[$key$][$assoc$]'
+        <dd>gives the value for $key$ in $assoc$.
+    </dl>
+
+    >> a = <|{1, 2} -> x, 3 -> y|>;
+    >> Key[{1, 2}][a]
+     = x
+    >> a[[Key[3]]]
+     = y
+    >> Lookup[a, Key[{1, 2}]]
+     = x
+    """
+
+    def apply(self, key, assoc, evaluation):
+        'Key[key_][assoc_]'
+
+        if isinstance(assoc, Association):
+            return _get_value(assoc, key)
+
+
+class Lookup(Builtin):
+    """
+    <dl>
+    <dt>'Lookup[$assoc$, $key$]'
+        <dd>gives the value for $key$ in the association or list of rules
+        $assoc$, or 'Missing["KeyAbsent", $key$]' if there is none.
+    <dt>'Lookup[$assoc$, $key$, $default$]'
+        <dd>gives $default$ if $key$ is not in $assoc$.
+    <dt>'Lookup[$assoc$, {$key1$, $key2$, ...}]'
+        <dd>gives the values for several keys.
+    <dt>'Lookup[{$assoc1$, $assoc2$, ...}, $key$]'
+        <dd>looks up $key$ in each association.
+    </dl>
+
+    >> a = <|x -> 1, y -> 2|>;
+    >> Lookup[a, y]
+     = 2
+    >> Lookup[a, z]
+     = Missing[KeyAbsent, z]
+    >> Lookup[a, z, 0]
+     = 0
+    >> Lookup[a, {x, y, z}, 0]
+     = {1, 2, 0}
+    >> Lookup[{a, <|x -> 3|>}, x]
+     = {1, 3}
+    >> Lookup[{x -> 1, y -> 2}, y]
+     = 2
+
+    #> Lookup[f[x], x]
+     : The argument f[x] is not a valid Association or a list of rules.
+     = Lookup[f[x], x]
+    """
+
+    messages = {
+        'invrl': (
+            "The argument `1` is not a valid Association or a list of "
+            "rules."),
+    }
+
+    def apply(self, assoc, key, evaluation):
+        'Lookup[assoc_, key_]'
+
+        return self.apply_default(assoc, key, None, evaluation)
+
+    def apply_default(self, assoc, key, default, evaluation):
+        'Lookup[assoc_, key_, default_]'
+
+        def lookup(assoc):
+            if key.has_form('List', None):
+                return Expression('List', *[
+                    _get_value(assoc, leaf, default) for leaf in key.leaves])
+            return _get_value(assoc, key, default)
+
+        if assoc.has_form('List', None) and not all(
+                _is_rule(leaf) for leaf in assoc.leaves):
+            assocs = [_to_association(leaf) for leaf in assoc.leaves]
+            if any(item is None for item in assocs):
+                return evaluation.message('Lookup', 'invrl', assoc)
+            return Expression('List', *[lookup(item) for item in assocs])
+        result = _to_association(assoc)
+        if result is None:
+            return evaluation.message('Lookup', 'invrl', assoc)
+        return lookup(result)
+
+
+class KeyExistsQ(Builtin):
+    """
+    <dl>
+    <dt>'KeyExistsQ[$assoc$, $key$]'
+        <dd>gives 'True' if $key$ is a key in the association or list of
+        rules $assoc$, and 'False' otherwise.
+    </dl>
+
+    >> KeyExistsQ[<|a -> 1, b -> 2|>, b]
+     = True
+    >> KeyExistsQ[<|a -> 1, b -> 2|>, c]
+     = False
+    >> KeyExistsQ[{a -> 1}, a]
+     = True
+    """
+
+    messages = {
+        'invrl': (
+            "The argument `1` is not a valid Association or a list of "
+            "rules."),
+    }
+
+    def apply(self, assoc, key, evaluation):
+        'KeyExistsQ[assoc_, key_]'
+
+        result = _to_association(assoc)
+        if result is None:
+            return evaluation.message('KeyExistsQ', 'invrl', assoc)
+        if result.get_rule(_strip_key(key)) is None:
+            return Symbol('False')
+        return Symbol('True')
+
+
+class _KeysOrValues(Builtin):
+    messages = {
+        'invrl': (
+            "The argument `1` is not a valid Association or a list of "
+            "rules."),
+    }
+
+    index = None
+
+    def apply(self, expr, evaluation):
+        '%(name)s[expr_]'
+
+        def parts(expr):
+            if isinstance(expr, Association):
+                return Expression('List', *[
+                    rule.leaves[self.index] for rule in expr.get_rules()])
+            elif _is_rule(expr):
+                return expr.leaves[self.index]
+            elif expr.has_form('List', None):
+                leaves = [parts(leaf) for leaf in expr.leaves]
+                if all(leaf is not None for leaf in leaves):
+                    return Expression('List', *leaves)
+
+        result = parts(expr)
+        if result is None:
+            return evaluation.message(self.get_name(), 'invrl', expr)
+        return result
+
+
+class Keys(_KeysOrValues):
+    """
+    <dl>
+    <dt>'Keys[$assoc$]'
+        <dd>gives the keys of the association $assoc$ in order.
+    <dt>'Keys[{$rule1$, $rule2$, ...}]'
+        <dd>gives the left-hand sides of the rules.
+    </dl>
+
+    >> Keys[<|a -> 1, b -> 2|>]
+     = {a, b}
+    >> Keys[{a -> 1, {b -> 2, c :> 3}}]
+     = {a, {b, c}}
+
+    #> Keys[x]
+     : The argument x is not a valid Association or a list of rules.
+     = Keys[x]
+    """
+
+    index = 0
+
+
+class Values(_KeysOrValues):
+    """
+    <dl>
+    <dt>'Values[$assoc$]'
+        <dd>gives the values of the association $assoc$ in order.
+    <dt>'Values[{$rule1$, $rule2$, ...}]'
+        <dd>gives the right-hand sides of the rules.
+    </dl>
+
+    >> Values[<|a -> 1, b -> 2|>]
+     = {1, 2}
+    >> Values[{a -> 1, b :> 1 + 1}]
+     = {1, 2}
+    """
+
+    index = 1
+
+
+class AssociateTo(Builtin):
+    """
+    <dl>
+    <dt>'AssociateTo[$a$, $key$ -> $val$]'
+        <dd>changes the value for $key$ in the association $a$, or adds
+        $key$ to it.
+    <dt>'AssociateTo[$a$, {$key1$ -> $val1$, $key2$ -> $val2$, ...}]'
+        <dd>changes or adds several keys.
+    </dl>
+
+    >> a = <|x -> 1|>;
+    >> AssociateTo[a, y -> 2]
+     = <|x -> 1, y -> 2|>
+    >> AssociateTo[a, {x -> 3, z -> 4}]
+     = <|x -> 3, y -> 2, z -> 4|>
+    >> a
+     = <|x -> 3, y -> 2, z -> 4|>
+
+    An update takes constant time. Other variables that had the same
+    association keep their value:
+    >> b = a;
+    >> Do[AssociateTo[a, i -> i ^ 2], {i, 1000}]; Length[a]
+     = 1003
+    >> b
+     = <|x -> 3, y -> 2, z -> 4|>
+
+    #> d = <|1 -> u|>; AssociateTo[d, 2 -> v]; e = d; AssociateTo[d, 3 -> w];
+    #> {u, v, w} = {4, 5, 6}; {d, e}
+     = {<|1 -> 4, 2 -> 5, 3 -> 6|>, <|1 -> 4, 2 -> 5|>}
+    #> Clear[d, e, u, v, w]
+
+    #> AssociateTo[c, x -> 1]
+     : c is not a variable with an association value, so its value cannot be changed.
+     = AssociateTo[c, x -> 1]
+    #> AssociateTo[a, x]
+     : x is not a valid rule or list of rules.
+     = AssociateTo[a, x]
+    """
+
+    attributes = ('HoldFirst',)
+
+    messages = {
+        'rvalue': (
+            "`1` is not a variable with an association value, so its value "
+            "cannot be changed."),
+        'invrl': "`1` is not a valid rule or list of rules.",
+    }
+
+    def apply(self, s, rules, evaluation):
+        'AssociateTo[s_, rules_]'
+
+        if isinstance(s, Symbol):
+            assoc = s.evaluate(evaluation)
+            if isinstance(assoc, Association):
+                new_rules = []
+                if not _collect_rules([rules], new_rules):
+                    return evaluation.message('AssociateTo', 'invrl', rules)
+                result = Expression('Set', s, assoc.updated(rules=new_rules))
+                return result.evaluate(evaluation)
+        return evaluation.message('AssociateTo', 'rvalue', s)
+
+
+class KeyDropFrom(Builtin):
+    """
+    <dl>
+    <dt>'KeyDropFrom[$a$, $key$]'
+        <dd>drops $key$ from the association $a$.
+    <dt>'KeyDropFrom[$a$, {$key1$, $key2$, ...}]'
+        <dd>drops several keys.
+    </dl>
+
+    >> a = <|x -> 1, y -> 2, z -> 3|>;
+    >> KeyDropFrom[a, y]
+     = <|x -> 1, z -> 3|>
+    >> KeyDropFrom[a, {x, w}]
+     = <|z -> 3|>
+    >> a
+     = <|z -> 3|>
+
+    A key that is added again goes to the end:
+    >> b = <|x -> 1, y -> 2|>; c = b;
+    >> KeyDropFrom[b, x]; AssociateTo[b, x -> 3]
+     = <|y -> 2, x -> 3|>
+    >> c
+     = <|x -> 1, y -> 2|>
+
+    #> KeyDropFrom[d, x]
+     : d is not a variable with an association value, so its value cannot be changed.
+     = KeyDropFrom[d, x]
+    """
+
+    attributes = ('HoldFirst',)
+
+    messages = {
+        'rvalue': (
+            "`1` is not a variable with an association value, so its value "
+            "cannot be changed."),
+    }
+
+    def apply(self, s, keys, evaluation):
+        'KeyDropFrom[s_, keys_]'
+
+        if isinstance(s, Symbol):
+            assoc = s.evaluate(evaluation)
+            if isinstance(assoc, Association):
+                if keys.has_form('List', None):
+                    keys = keys.leaves
+                else:
+                    keys = [keys]
+                keys = [_strip_key(key) for key in keys]
+                result = Expression('Set', s, assoc.updated(dropped=keys))
+                return result.evaluate(evaluation)
+        return evaluation.message('KeyDropFrom', 'rvalue', s)
+
+
+class Merge(Builtin):
+    """
+    <dl>
+    <dt>'Merge[{$assoc1$, $assoc2$, ...}, $f$]'
+        <dd>merges the associations or lists of rules $associ$ into one
+        association, applying $f$ to the list of the values for each key.
+    </dl>
+
+    >> Merge[{<|a -> 1, b -> 2|>, <|a -> 3, c -> 4|>}, Total]
+     = <|a -> 4, b -> 2, c -> 4|>
+    >> Merge[{<|a -> 1|>, {a -> 2, b -> 3}}, Identity]
+     = <|a -> {1, 2}, b -> {3}|>
+
+    #> Merge[{<|a -> 1|>, x}, f]
+     : The argument x is not a valid Association or a list of rules.
+     = Merge[{<|a -> 1|>, x}, f]
+    """
+
+    messages = {
+        'invrl': (
+            "The argument `1` is not a valid Association or a list of "
+            "rules."),
+    }
+
+    def apply(self, assocs, f, evaluation):
+        'Merge[assocs_List, f_]'
+
+        groups = OrderedDict()
+        for leaf in assocs.leaves:
+            assoc = _to_association(leaf)
+            if assoc is None:
+                return evaluation.message('Merge', 'invrl', leaf)
+            for rule in assoc.get_rules():
+                key = rule.leaves[0]
+                group = groups.get(ExpressionKey(key))
+                if group is None:
+                    groups[ExpressionKey(key)] = (key, [rule.leaves[1]])
+                else:
+                    group[1].append(rule.leaves[1])
+        return Association.from_rules([
+            Expression('Rule', key, Expression(
+                f, Expression('List', *values)).evaluate(evaluation))
+            for key, values in groups.values()])
+
+
+class GroupBy(Builtin):
+    """
+    <dl>
+    <dt>'GroupBy[{$e1$, $e2$, ...}, $f$]'
+        <dd>gives an association that maps each value of $f$[$ei$] to the
+        list of the $ei$ with that value.
+    <dt>'GroupBy[{$e1$, $e2$, ...}, $f$ -> $g$]'
+        <dd>lists $g$[$ei$] instead of $ei$.
+    <dt>'GroupBy[{$e1$, $e2$, ...}, $spec$, $red$]'
+        <dd>applies $red$ to each list.
+    </dl>
+
+    >> GroupBy[Range[10], OddQ]
+     = <|True -> {1, 3, 5, 7, 9}, False -> {2, 4, 6, 8, 10}|>
+    >> GroupBy[{{a, 1}, {b, 2}, {a, 3}}, First -> Last]
+     = <|a -> {1, 3}, b -> {2}|>
+    >> GroupBy[{{a, 1}, {b, 2}, {a, 3}}, First -> Last, Total]
+     = <|a -> 4, b -> 2|>
+
+    #> GroupBy[x, f]
+     = GroupBy[x, f]
+    """
+
+    def apply(self, items, spec, evaluation):
+        'GroupBy[items_List, spec_]'
+
+        return self.apply_reduce(items, spec, None, evaluation)
+
+    def apply_reduce(self, items, spec, red, evaluation):
+        'GroupBy[items_List, spec_, red_]'
+
+        if spec.has_form('Rule', 2):
+            f, g = spec.leaves
+        else:
+            f, g = spec, None
+        groups = OrderedDict()
+        for item in items.leaves:
+            key = Expression(f, item).evaluate(evaluation)
+            if g is not None:
+                item = Expression(g, item).evaluate(evaluation)
+            group = groups.get(ExpressionKey(key))
+            if group is None:
+                groups[ExpressionKey(key)] = (key, [item])
+            else:
+                group[1].append(item)
+        rules = []
+        for key, values in groups.values():
+            value = Expression('List', *values)
+            if red is not None:
+                value = Expression(red, value).evaluate(evaluation)
+            rules.append(Expression('Rule', key, value))
+        return Association.from_rules(rules)
+
+
+class Counts(Builtin):
+    """
+    <dl>
+    <dt>'Counts[{$e1$, $e2$, ...}]'
+        <dd>gives an association that maps each distinct $ei$ to the
+        number of times it occurs.
+    </dl>
+
+    >> Counts[{a, b, a, c, a, b}]
+     = <|a -> 3, b -> 2, c -> 1|>
+    >> Counts[{}]
+     = <||>
+    """
+
+    def apply(self, items, evaluation):
+        'Counts[items_List]'
+
+        counts = OrderedDict()
+        for item in items.leaves:
+            key = ExpressionKey(item)
+            counts[key] = counts.get(key, 0) + 1
+        return Association.from_rules([
+            Expression('Rule', key.expr, Integer(count))
+            for key, count in counts.items()])
+
+
+class KeySort(Builtin):
+    """
+    <dl>
+    <dt>'KeySort[$assoc$]'
+        <dd>orders the association $assoc$ by its keys in canonical
+        order.
+    </dl>
+
+    >> KeySort[<|c -> 1, a -> 2, b -> 3|>]
+     = <|a -> 2, b -> 3, c -> 1|>
+    >> KeySort[<|2 -> x, "s" -> y, 1 -> z|>]
+     = <|1 -> z, 2 -> x, s -> y|>
+    """
+
+    def apply(self, assoc, evaluation):
+        'KeySort[assoc_Association]'
+
+        if isinstance(assoc, Association):
+            return Association.from_rules(
+                sorted(assoc.get_rules(), key=lambda rule: rule.leaves[0]))
+
+
+class Normal(Builtin):
+    """
+    <dl>
+    <dt>'Normal[$expr$]'
+        <dd>converts the associations in $expr$ to lists of rules and
+        the sparse arrays to full arrays.
+    </dl>
+
+    >> Normal[<|a -> 1, b -> 2|>]
+     = {a -> 1, b -> 2}
+    >> Normal[f[<|a -> 1|>, x]]
+     = f[{a -> 1}, x]
+    >> Normal[SparseArray[{2 -> x}, 3]]
+     = {0, x, 0}
+    """
+
+    def apply(self, expr, evaluation):
+        'Normal[expr_]'
+
+        def normal(expr):
+            if isinstance(expr, Association):
+                return Expression('List', *expr.get_rules())
+            elif expr.is_atom():
+                array = expr.get_list_expression()
+                return expr if array is None else array
+            return Expression(normal(expr.head),
+                              *[normal(leaf) for leaf in expr.leaves])
+
+        return normal(expr)
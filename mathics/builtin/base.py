@@ -29,6 +29,10 @@ class Builtin(object):
     options = {}
     defaults = {}
 
+    # results of pure, deterministic apply methods may be cached, see
+    # mathics.core.definitions.MemoCache
+    memoize = False
+
     def __new__(cls, *args, **kwargs):
         if kwargs.get('expression', None) is not False:
             return Expression(cls.get_name(), *args)
@@ -49,7 +53,8 @@ class Builtin(object):
         name = self.get_name()
         rules = []
         for pattern, function in self.get_functions():
-            rules.append(BuiltinRule(pattern, function, system=True))
+            rules.append(BuiltinRule(pattern, function, system=True,
+                                     memoize=self.memoize))
         for pattern, replace in self.rules.items():
             if not isinstance(pattern, BaseExpression):
                 pattern = pattern % {'name': name}
@@ -199,6 +204,17 @@ class Builtin(object):
         # variants name the same option. this matches Wolfram Language
         # behaviour.
 
+        # options matched by OptionsPattern resolve these names once
+        get_full_name = getattr(options, 'get_full_name', None)
+        if get_full_name is not None:
+            resolved_name = get_full_name(name, evaluation.definitions)
+            if resolved_name is not None:
+                if pop:
+                    value = options.pop(resolved_name)
+                else:
+                    value = options[resolved_name]
+                return value.evaluate(evaluation)
+
         contexts = (s + '%s' for s in
                     evaluation.definitions.get_context_path())
 
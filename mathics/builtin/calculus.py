@@ -105,6 +105,8 @@ class D(SympyFunction):
      = 0
     """
 
+    memoize = True
+
     sympy_name = 'Derivative'
 
     messages = {
@@ -426,6 +428,8 @@ class Integrate(SympyFunction):
      = f[b] - f[a]
     """
 
+    memoize = True
+
     attributes = ('ReadProtected',)
 
     sympy_name = 'Integral'
@@ -627,6 +631,8 @@ class Solve(Builtin):
      = {{x -> 1}}
     """
 
+    memoize = True
+
     messages = {
         'eqf': "`1` is not a well-formed equation.",
         'svars': 'Equations may not give solutions for all "solve" variables.',
@@ -821,8 +827,16 @@ class Limit(Builtin):
     #> Limit[x, x -> x0, Direction -> x]
      : Value of Direction -> x should be -1 or 1.
      = Limit[x, x -> x0, Direction -> x]
+
+    #> Quiet[Limit[x, x -> 0, Direction -> bar]]
+     = Limit[x, x -> 0, Direction -> bar]
+    #> Limit[x, x -> 0, Direction -> bar]
+     : Value of Direction -> bar should be -1 or 1.
+     = Limit[x, x -> 0, Direction -> bar]
     """
 
+    memoize = True
+
     attributes = ('Listable',)
 
     options = {
@@ -21,6 +21,7 @@ from mathics.core.expression import (Expression, Real, Symbol, String, Integer,
                                      from_python)
 
 from mathics.builtin.base import Builtin, Predefined
+from mathics.core.evaluation import TimeoutInterrupt
 from mathics.settings import TIME_12HOUR
 
 START_TIME = time.time()
@@ -615,10 +616,73 @@ class Pause(Builtin):
             evaluation.message('Pause', 'numnm', Expression('Pause', n))
             return
 
-        time.sleep(sleeptime)
+        # sleep in slices, so that timeouts can interrupt the pause
+        end = time.time() + sleeptime
+        while True:
+            evaluation.check_stopped()
+            remaining = end - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.1))
         return Symbol('Null')
 
 
+class TimeConstrained(Builtin):
+    """
+    <dl>
+    <dt>'TimeConstrained[$expr$, $t$]'
+      <dd>evaluates $expr$, stopping after $t$ seconds.
+    <dt>'TimeConstrained[$expr$, $t$, $failexpr$]'
+      <dd>returns $failexpr$ if the time constraint is not met.
+    </dl>
+
+    >> TimeConstrained[1 + 2, 10]
+     = 3
+    >> TimeConstrained[Pause[2]; 1, 0.1]
+     = $Aborted
+    >> TimeConstrained[Pause[2]; 1, 0.1, "too slow"]
+     = too slow
+
+    #> TimeConstrained[TimeConstrained[Pause[2]; 1, 5], 0.1, 2]
+     = 2
+    #> TimeConstrained[1, -1]
+     : Positive number expected at position 2 in TimeConstrained[1, -1].
+     = TimeConstrained[1, -1]
+    """
+
+    attributes = ('HoldAll',)
+
+    messages = {
+        'timc': 'Positive number expected at position 2 in `1`.',
+    }
+
+    def apply_2(self, expr, t, evaluation):
+        'TimeConstrained[expr_, t_]'
+        return self.apply_3(expr, t, Symbol('$Aborted'), evaluation,
+                            Expression('TimeConstrained', expr, t))
+
+    def apply_3(self, expr, t, failexpr, evaluation, call=None):
+        'TimeConstrained[expr_, t_, failexpr_]'
+        timeout = t.evaluate(evaluation).to_python()
+        if not isinstance(timeout, (int, float)) or timeout <= 0:
+            if call is None:
+                call = Expression('TimeConstrained', expr, t, failexpr)
+            evaluation.message('TimeConstrained', 'timc', call)
+            return
+
+        previous = evaluation.push_deadline(timeout)
+        try:
+            return expr.evaluate(evaluation)
+        except TimeoutInterrupt:
+            pass
+        finally:
+            evaluation.pop_deadline(previous)
+        # an enclosing time constraint is passed on
+        if evaluation.timed_out():
+            raise TimeoutInterrupt
+        return failexpr.evaluate(evaluation)
+
+
 class _Date():
     def __init__(self, datelist=[], absolute=None, datestr=None):
         datelist += [1900, 1, 1, 0, 0, 0.][len(datelist):]
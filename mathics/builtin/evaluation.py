@@ -399,6 +399,10 @@ class In(Builtin):
         'In[k_Integer?Negative]': 'In[$Line + k]',
     }
 
+    def apply(self, k, evaluation):
+        'In[k_Integer]'
+        return evaluation.definitions.history.get_input(k.get_int_value())
+
 
 class Out(Builtin):
     """
@@ -448,3 +452,7 @@ class Out(Builtin):
         '    f:StandardForm|TraditionalForm|InputForm|OutputForm]':
         r'"%%" <> ToString[k]',
     }
+
+    def apply(self, k, evaluation):
+        'Out[k_Integer]'
+        return evaluation.definitions.history.get_output(k.get_int_value())
@@ -11,12 +11,17 @@ from __future__ import absolute_import
 from __future__ import division
 
 import os
+import sys
 import io
 import shutil
 import zlib
+import marshal
+import hashlib
 import base64
+import binascii
 import tempfile
 import time
+import re
 import struct
 import mpmath
 import math
@@ -28,14 +33,17 @@ from six import unichr
 
 from mathics.core.expression import (Expression, Real, Complex, String, Symbol,
                                      from_python, Integer, BoxError,
-                                     MachineReal, Number, valid_context_name)
+                                     MachineReal, Number, valid_context_name,
+                                     strip_context, system_symbols)
 from mathics.core.numbers import dps
+from mathics.core import serialize
 from mathics.builtin.base import (Builtin, Predefined, BinaryOperator,
                                   PrefixOperator)
 from mathics.builtin.numeric import Hash
 from mathics.builtin.strings import to_python_encoding
 from mathics.builtin.base import MessageException
-from mathics.settings import ROOT_DIR
+from mathics.settings import ROOT_DIR, PARSE_CACHE_DIR
+from mathics.version import __version__
 
 
 INITIAL_DIR = os.getcwd()
@@ -171,6 +179,183 @@ class mathics_open:
         if strm is not None:
             strm.close()
             STREAMS[self.n] = None
+        _READ_BUFFERS.pop(self.n, None)
+
+
+class _ReadBuffer(object):
+    """
+    Chunked read-ahead buffer on top of a text stream.
+
+    Tokens are located by matching regular expressions against whole chunks
+    instead of calling stream.read(1) per character. The underlying stream
+    runs ahead of the logical position seen by Read; `sync` moves it back so
+    that stream.tell() and stream.seek() keep their usual meaning.
+    """
+
+    chunk_size = 1 << 16
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.ucdec = False
+        # the underlying position `mark` and the number of characters
+        # between that position and the start of the buffer
+        self.mark = stream.tell() if stream.seekable() else None
+        self.skipped = 0
+
+    def _fill(self):
+        'Appends the next chunk to the buffer. Returns False at EOF.'
+        if self.eof:
+            return False
+        try:
+            chunk = self.stream.read(self.chunk_size)
+        except UnicodeDecodeError:
+            chunk = ' '  # ignore
+            self.ucdec = True
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos:
+            self.skipped += self.pos
+            self.buffer = self.buffer[self.pos:] + chunk
+            self.pos = 0
+        else:
+            self.buffer += chunk
+        return True
+
+    def sync(self):
+        'Moves the underlying stream to the logical position.'
+        if self.mark is None or not (self.buffer or self.eof):
+            return
+        offset = self.skipped + self.pos
+        if isinstance(self.stream, io.StringIO):
+            self.stream.seek(self.mark + offset)
+        else:
+            self.stream.seek(self.mark)
+            while offset > 0:
+                chunk = self.stream.read(min(offset, self.chunk_size))
+                if not chunk:
+                    break
+                offset -= len(chunk)
+
+    def match(self, regex):
+        """
+        Matches `regex` at the logical position and consumes the match.
+
+        A match touching the end of the buffer might continue in the next
+        chunk, so it is only accepted once more input is known to follow.
+        """
+        while True:
+            match = regex.match(self.buffer, self.pos)
+            if ((match is not None and match.end() < len(self.buffer)) or
+                    not self._fill()):
+                break
+        if match is not None:
+            self.pos = match.end()
+        return match
+
+    def read(self, n):
+        while len(self.buffer) - self.pos < n and self._fill():
+            pass
+        result = self.buffer[self.pos:self.pos + n]
+        self.pos += len(result)
+        return result
+
+    def readline(self):
+        while True:
+            end = self.buffer.find('\n', self.pos)
+            if end != -1:
+                end += 1
+                break
+            if not self._fill():
+                end = len(self.buffer)
+                break
+        result = self.buffer[self.pos:end]
+        self.pos = end
+        return result
+
+
+_READ_BUFFERS = {}
+
+
+def _read_buffer(n, stream):
+    buffer = _READ_BUFFERS.get(n)
+    if buffer is None or buffer.stream is not stream:
+        buffer = _READ_BUFFERS[n] = _ReadBuffer(stream)
+    return buffer
+
+
+def _release_read_buffer(n):
+    'Hands the logical position of stream n back to the stream itself.'
+    buffer = _READ_BUFFERS.pop(n, None)
+    if buffer is not None and not buffer.stream.closed:
+        buffer.sync()
+
+
+def _separators_regex(separators):
+    if not separators:
+        return '(?!)'
+    if all(len(sep) == 1 for sep in separators):
+        return '[%s]' % ''.join(re.escape(sep) for sep in separators)
+    return '(?:%s)' % '|'.join(
+        re.escape(sep) for sep in sorted(separators, key=len, reverse=True))
+
+
+_TOKEN_REGEXES = {}
+
+
+def _token_regex(kind, separators):
+    """
+    Compiles the regular expression reading one object of the given kind.
+
+    Leading separators are skipped. Words and records end before the next
+    separator. Numbers consist of the characters allowed for the kind and
+    swallow one trailing character that is not a separator.
+    """
+    key = (kind, tuple(separators))
+    regex = _TOKEN_REGEXES.get(key)
+    if regex is None:
+        sep = _separators_regex(separators)
+        if kind == 'Number':
+            token = r'([+\-.0-9]*)((?!%s).)?' % sep
+        elif kind == 'Real':
+            token = r'([+\-.0-9eE^*]*)((?!%s).)?' % sep
+        elif sep.startswith('['):
+            token = '([^%s+)?' % sep[1:]
+        else:
+            token = '((?:(?!%s).)+)?' % sep
+        regex = _TOKEN_REGEXES[key] = re.compile(
+            '(?:%s)*%s' % (sep, token), re.DOTALL)
+    return regex
+
+
+def _read_token(buffer, kind, separators):
+    """
+    Reads one Word, Record, Number or Real as a string.
+
+    Raises EOFError if only separators are left in the stream.
+    """
+    match = buffer.match(_token_regex(kind, separators))
+    token = match.group(1)
+    if kind in ('Number', 'Real'):
+        if not token and match.group(2) is None and buffer.eof:
+            raise EOFError
+    elif token is None:
+        raise EOFError
+    return token
+
+
+def _number_from_string(s):
+    try:
+        return int(s)
+    except ValueError:
+        return float(s)
+
+
+def _real_from_string(s):
+    return float(s.replace('*^', 'E'))
 
 
 class InitialDirectory(Predefined):
@@ -561,6 +746,10 @@ class Read(Builtin):
 
     attributes = ('Protected')
 
+    read_types = system_symbols(
+        'Byte', 'Character', 'Expression', 'Number', 'Real', 'Record',
+        'String', 'Word')
+
     def check_options(self, options):
         # Options
         # TODO Proper error messages
@@ -624,144 +813,120 @@ class Read(Builtin):
 
         return result
 
-    def apply(self, channel, types, evaluation, options):
-        'Read[channel_, types_, OptionsPattern[Read]]'
-
+    def _open(self, channel, evaluation):
+        """
+        Returns the stream expression and the read buffer of channel or
+        None if channel is not an open input stream.
+        """
         if channel.has_form('OutputStream', 2):
             evaluation.message('General', 'openw', channel)
-            return
+            return None
 
         strm = _channel_to_stream(channel, 'r')
 
         if strm is None:
-            return
-
-        [name, n] = strm.get_leaves()
+            return None
 
-        stream = _lookup_stream(n.get_int_value())
+        n = strm.leaves[1].get_int_value()
+        stream = _lookup_stream(n)
 
         if stream is None or stream.closed:
             evaluation.message('Read', 'openx', strm)
-            return
+            return None
+
+        return strm, _read_buffer(n, stream)
 
+    def _check_types(self, types, evaluation):
         # Wrap types in a list (if it isn't already one)
         if not types.has_form('List', None):
             types = Expression('List', types)
 
-        READ_TYPES = [Symbol(k) for k in
-                      ['Byte', 'Character', 'Expression',
-                       'Number', 'Real', 'Record', 'String', 'Word']]
-
         for typ in types.leaves:
-            if typ not in READ_TYPES:
+            if typ.get_name() not in self.read_types:
                 evaluation.message('Read', 'readf', typ)
-                return Symbol('$Failed')
+                return None
+
+        return [typ.get_name() for typ in types.leaves]
+
+    def _read(self, buffer, strm, types, py_options, evaluation):
+        """
+        Reads one object of each of the given types from buffer.
+
+        Returns the list of Python values, or None after issuing a message
+        if the input is malformed. Raises EOFError at the end of the stream.
+        """
 
-        # Options
         # TODO Implement extra options
-        py_options = self.check_options(options)
         # null_records = py_options['NullRecords']
         # null_words = py_options['NullWords']
-        record_separators = py_options['RecordSeparators']
         # token_words = py_options['TokenWords']
-        word_separators = py_options['WordSeparators']
-
-        name = name.to_python()
+        record_separators = py_options['RecordSeparators']
+        word_separators = py_options['WordSeparators'] + record_separators
 
         result = []
-
-        def reader(stream, word_separators, accepted=None):
-            while True:
-                word = ''
-                while True:
-                    try:
-                        tmp = stream.read(1)
-                    except UnicodeDecodeError:
-                        tmp = ' '  # ignore
-                        evaluation.message('General', 'ucdec')
-
-                    if tmp == '':
-                        if word == '':
-                            raise EOFError
-                        yield word
-
-                    if tmp in word_separators:
-                        if word == '':
-                            break
-                        if stream.seekable():
-                            # stream.seek(-1, 1) #Python3
-                            stream.seek(stream.tell() - 1)
-                        yield word
-
-                    if accepted is not None and tmp not in accepted:
-                        yield word
-
-                    word += tmp
-
-        read_word = reader(stream, word_separators)
-        read_record = reader(stream, record_separators)
-        read_number = reader(stream, word_separators + record_separators,
-                             ['+', '-', '.'] + [str(i) for i in range(10)])
-        read_real = reader(
-            stream, word_separators + record_separators,
-            ['+', '-', '.', 'e', 'E', '^', '*'] + [str(i) for i in range(10)])
-        for typ in types.leaves:
-            try:
-                if typ == Symbol('Byte'):
-                    tmp = stream.read(1)
-                    if tmp == '':
-                        raise EOFError
-                    result.append(ord(tmp))
-                elif typ == Symbol('Character'):
-                    tmp = stream.read(1)
-                    if tmp == '':
-                        raise EOFError
-                    result.append(tmp)
-                elif typ == Symbol('Expression'):
-                    tmp = next(read_record)
-                    expr = evaluation.parse(tmp)
-                    if expr is None:
-                        evaluation.message('Read', 'readt', tmp, Expression(
-                            'InputSteam', name, n))
-                        return Symbol('$Failed')
-                    result.append(tmp)
-                elif typ == Symbol('Number'):
-                    tmp = next(read_number)
-                    try:
-                        tmp = int(tmp)
-                    except ValueError:
-                        try:
-                            tmp = float(tmp)
-                        except ValueError:
-                            evaluation.message('Read', 'readn', Expression(
-                                'InputSteam', name, n))
-                            return Symbol('$Failed')
-                    result.append(tmp)
-
-                elif typ == Symbol('Real'):
-                    tmp = next(read_real)
-                    tmp = tmp.replace('*^', 'E')
-                    try:
-                        tmp = float(tmp)
-                    except ValueError:
-                        evaluation.message('Read', 'readn', Expression(
-                            'InputSteam', name, n))
-                        return Symbol('$Failed')
-                    result.append(tmp)
-                elif typ == Symbol('Record'):
-                    result.append(next(read_record))
-                elif typ == Symbol('String'):
-                    tmp = stream.readline()
-                    if len(tmp) == 0:
-                        raise EOFError
-                    result.append(tmp.rstrip('\n'))
-                elif typ == Symbol('Word'):
-                    result.append(next(read_word))
-
-            except EOFError:
-                return Symbol('EndOfFile')
-            except UnicodeDecodeError:
+        for typ in types:
+            if typ in ('System`Byte', 'System`Character'):
+                tmp = buffer.read(1)
+                if tmp == '':
+                    raise EOFError
+                result.append(ord(tmp) if typ == 'System`Byte' else tmp)
+            elif typ == 'System`Expression':
+                tmp = _read_token(buffer, 'Record', record_separators)
+                expr = evaluation.parse(tmp)
+                if expr is None:
+                    evaluation.message('Read', 'readt', tmp, strm)
+                    return None
+                result.append(tmp)
+            elif typ in ('System`Number', 'System`Real'):
+                kind = strip_context(typ)
+                tmp = _read_token(buffer, kind, word_separators)
+                try:
+                    if kind == 'Number':
+                        tmp = _number_from_string(tmp)
+                    else:
+                        tmp = _real_from_string(tmp)
+                except ValueError:
+                    evaluation.message('Read', 'readn', strm)
+                    return None
+                result.append(tmp)
+            elif typ == 'System`Record':
+                result.append(
+                    _read_token(buffer, 'Record', record_separators))
+            elif typ == 'System`String':
+                tmp = buffer.readline()
+                if len(tmp) == 0:
+                    raise EOFError
+                result.append(tmp.rstrip('\n'))
+            elif typ == 'System`Word':
+                result.append(_read_token(buffer, 'Word', word_separators))
+
+            if buffer.ucdec:
                 evaluation.message('General', 'ucdec')
+                buffer.ucdec = False
+
+        return result
+
+    def apply(self, channel, types, evaluation, options):
+        'Read[channel_, types_, OptionsPattern[Read]]'
+
+        opened = self._open(channel, evaluation)
+        if opened is None:
+            return
+        strm, buffer = opened
+
+        types = self._check_types(types, evaluation)
+        if types is None:
+            return Symbol('$Failed')
+
+        py_options = self.check_options(options)
+
+        try:
+            result = self._read(buffer, strm, types, py_options, evaluation)
+        except EOFError:
+            return Symbol('EndOfFile')
+
+        if result is None:
+            return Symbol('$Failed')
 
         if len(result) == 1:
             return from_python(*result)
@@ -819,6 +984,19 @@ class Write(Builtin):
         return Symbol('Null')
 
 
+def _byte_ordering(value):
+    """
+    Returns the struct byte order character for the option value of
+    ByteOrdering, or None if the value is invalid.
+    """
+    n = value.get_int_value()
+    if n == -1:
+        return '<'
+    elif n == 1:
+        return '>'
+    return None
+
+
 class _BinaryFormat(object):
     """
     Container for BinaryRead readers and BinaryWrite writers
@@ -863,6 +1041,113 @@ class _BinaryFormat(object):
                 writers[funcname[1:-7]] = getattr(cls, funcname)
         return writers
 
+    # Types which are read and written in bulk, with their struct codes.
+    bulk_codes = {
+        'Byte': 'B',
+        'Integer8': 'b',
+        'Integer16': 'h',
+        'Integer32': 'i',
+        'Integer64': 'q',
+        'UnsignedInteger8': 'B',
+        'UnsignedInteger16': 'H',
+        'UnsignedInteger32': 'I',
+        'UnsignedInteger64': 'Q',
+        'Real32': 'f',
+        'Real64': 'd',
+        'Complex64': 'ff',
+        'Complex128': 'dd',
+    }
+
+    # Other types whose values do not depend on the byte ordering
+    bytewise_types = frozenset(['Character8', 'TerminatedString'])
+
+    native_byteorder = '<' if sys.byteorder == 'little' else '>'
+
+    # Number of values read at once by read_bulk
+    bulk_chunk = 1 << 16
+
+    # Compiled formats of single values by type and byte order
+    value_structs = {}
+
+    @classmethod
+    def native_only(cls, types, byteorder):
+        """
+        Returns the first of types that can only be read and written in the
+        native byte order if byteorder is another one, otherwise None.
+        """
+        if byteorder != cls.native_byteorder:
+            for typ in types:
+                if typ not in cls.bulk_codes and typ not in cls.bytewise_types:
+                    return typ
+        return None
+
+    @classmethod
+    def _bulk_format(cls, typ, count, byteorder):
+        code = cls.bulk_codes[typ]
+        return '%s%d%s' % (byteorder, count * len(code), code[0])
+
+    @classmethod
+    def read_bulk(cls, stream, typ, count=None, byteorder='='):
+        """
+        Reads count values of type typ from stream, or all values up to the
+        end of the stream if count is None. Incomplete values at the end of
+        the stream are dropped.
+        """
+        size = struct.calcsize(cls._bulk_format(typ, 1, '='))
+        result = []
+        while count is None or len(result) < count:
+            n = cls.bulk_chunk
+            if count is not None:
+                n = min(n, count - len(result))
+            data = stream.read(n * size)
+            m = len(data) // size
+            if m == 0:
+                break
+            values = struct.unpack(
+                cls._bulk_format(typ, m, byteorder), data[:m * size])
+            result.extend(cls._bulk_leaves(typ, values))
+            if m < n:
+                break
+        return result
+
+    @classmethod
+    def read_value(cls, stream, typ, byteorder='='):
+        """
+        Reads a single value of type typ from stream. Raises struct.error
+        at the end of the stream.
+        """
+        unpacker = cls.value_structs.get((typ, byteorder))
+        if unpacker is None:
+            unpacker = struct.Struct(cls._bulk_format(typ, 1, byteorder))
+            cls.value_structs[typ, byteorder] = unpacker
+        values = unpacker.unpack(stream.read(unpacker.size))
+        return cls._bulk_leaves(typ, values)[0]
+
+    @classmethod
+    def _bulk_leaves(cls, typ, values):
+        if typ.startswith('Real'):
+            return [MachineReal(x) if x - x == 0 else cls._IEEE_real(x)
+                    for x in values]
+        elif typ.startswith('Complex'):
+            return [cls._IEEE_cmplx(re, im)
+                    for re, im in zip(values[::2], values[1::2])]
+        else:
+            return [Integer(x) for x in values]
+
+    @classmethod
+    def write_bulk(cls, stream, typ, values, byteorder='='):
+        """
+        Writes the Python numbers values as type typ in a single call.
+        Raises struct.error if a value does not fit into typ.
+        """
+        if typ.startswith('Complex'):
+            values = [part for x in values for part in (x.real, x.imag)]
+            count = len(values) // 2
+        else:
+            count = len(values)
+        stream.write(struct.pack(
+            cls._bulk_format(typ, count, byteorder), *values))
+
     # Reader Functions
 
     @staticmethod
@@ -1384,6 +1669,21 @@ class BinaryWrite(Builtin):
     #> WRb[253033302833692126095975097811212718901, "UnsignedInteger128"]
      = {53, 83, 116, 79, 81, 100, 60, 126, 202, 52, 241, 48, 5, 113, 92, 190}
 
+    ## ByteOrdering
+    #> strm = OpenWrite[BinaryFormat -> True];
+    #> BinaryWrite[strm, {1, 2}, {"Integer16", "Integer32"}, ByteOrdering -> 1];
+    #> BinaryReadList[Close[strm]]
+     = {0, 1, 0, 0, 0, 2}
+    #> strm = OpenWrite[BinaryFormat -> True];
+    #> BinaryWrite[strm, 1, "Integer24", ByteOrdering -> -$ByteOrdering]
+     : Integer24 can only be written in the native byte ordering.
+     = BinaryWrite[OutputStream[...], 1, Integer24, ByteOrdering -> ...]
+    #> BinaryWrite[strm, 1, "Integer16", ByteOrdering -> 0]
+     : ByteOrdering must be either 1 or -1.
+     = BinaryWrite[OutputStream[...], 1, Integer16, ByteOrdering -> 0]
+    #> BinaryReadList[Close[strm]]
+     = {}
+
     ## Full File
     >> strm = OpenWrite["/dev/full", BinaryFormat -> True]
      = OutputStream[...]
@@ -1397,16 +1697,22 @@ class BinaryWrite(Builtin):
 
     messages = {
         'writex': '`1`.',
+        'byteord': 'ByteOrdering must be either 1 or -1.',
+        'bytenat': '`1` can only be written in the native byte ordering.',
+    }
+
+    options = {
+        'ByteOrdering': '$ByteOrdering',
     }
 
     writers = _BinaryFormat.get_writers()
 
-    def apply_notype(self, name, n, b, evaluation):
-        'BinaryWrite[OutputStream[name_, n_], b_]'
-        return self.apply(name, n, b, None, evaluation)
+    def apply_notype(self, name, n, b, evaluation, options):
+        'BinaryWrite[OutputStream[name_, n_], b_, OptionsPattern[]]'
+        return self.apply(name, n, b, None, evaluation, options)
 
-    def apply(self, name, n, b, typ, evaluation):
-        'BinaryWrite[OutputStream[name_, n_], b_, typ_]'
+    def apply(self, name, n, b, typ, evaluation, options):
+        'BinaryWrite[OutputStream[name_, n_], b_, typ_?NotOptionQ, OptionsPattern[]]'
 
         channel = Expression('OutputStream', name, n)
 
@@ -1448,6 +1754,28 @@ class BinaryWrite(Builtin):
             evaluation.message('BinaryRead', 'format', typ)
             return expr
 
+        byteorder = _byte_ordering(
+            self.get_option(options, 'ByteOrdering', evaluation))
+        if byteorder is None:
+            # expr would be evaluated again without the option
+            evaluation.message('BinaryWrite', 'byteord')
+            return
+        native_only = _BinaryFormat.native_only(types, byteorder)
+        if native_only is not None:
+            evaluation.message('BinaryWrite', 'bytenat', String(native_only))
+            return
+
+        # Homogeneous numeric data is written in one go
+        if len(types) == 1 and types[0] in _BinaryFormat.bulk_codes:
+            values = self._bulk_values(types[0], pyb, evaluation)
+            if values is not None:
+                try:
+                    _BinaryFormat.write_bulk(
+                        stream, types[0], values, byteorder)
+                    pyb = []
+                except struct.error:
+                    pass
+
         # Write to stream
         i = 0
         while i < len(pyb):
@@ -1459,33 +1787,9 @@ class BinaryWrite(Builtin):
             if t == 'TerminatedString':
                 x = x.get_string_value() + '\x00'
             elif t.startswith('Real'):
-                if isinstance(x, Real):
-                    x = x.to_python()
-                elif x.has_form('DirectedInfinity', 1):
-                    if x.leaves[0].get_int_value() == 1:
-                        x = float('+inf')
-                    elif x.leaves[0].get_int_value() == -1:
-                        x = float('-inf')
-                    else:
-                        x = None
-                elif (isinstance(x, Symbol) and x.get_name() == 'System`Indeterminate'):
-                    x = float('nan')
-                else:
-                    x = None
-                assert x is None or isinstance(x, float)
+                x = self._real_value(x)
             elif t.startswith('Complex'):
-                if isinstance(x, (Complex, Real, Integer)):
-                    x = x.to_python()
-                elif x.has_form('DirectedInfinity', 1):
-                    x = x.leaves[0].to_python(n_evaluation=evaluation)
-
-                    # x*float('+inf') creates nan if x.real or x.imag are zero
-                    x = complex(x.real * float('+inf') if x.real != 0 else 0,
-                                x.imag * float('+inf') if x.imag != 0 else 0)
-                elif (isinstance(x, Symbol) and x.get_name() == 'System`Indeterminate'):
-                    x = complex(float('nan'), float('nan'))
-                else:
-                    x = None
+                x = self._complex_value(x, evaluation)
             elif t.startswith('Character'):
                 if isinstance(x, Integer):
                     x = [String(char) for char in str(x.get_int_value())]
@@ -1509,7 +1813,10 @@ class BinaryWrite(Builtin):
                 return evaluation.message('BinaryWrite', 'nocoerce', b)
 
             try:
-                self.writers[t](stream, x)
+                if t in _BinaryFormat.bulk_codes:
+                    _BinaryFormat.write_bulk(stream, t, [x], byteorder)
+                else:
+                    self.writers[t](stream, x)
             except struct.error:
                 return evaluation.message('BinaryWrite', "nocoerce", b)
             i += 1
@@ -1520,6 +1827,57 @@ class BinaryWrite(Builtin):
             evaluation.message('BinaryWrite', 'writex', err.strerror)
         return channel
 
+    @staticmethod
+    def _real_value(x):
+        if isinstance(x, Real):
+            x = x.to_python()
+        elif x.has_form('DirectedInfinity', 1):
+            if x.leaves[0].get_int_value() == 1:
+                x = float('+inf')
+            elif x.leaves[0].get_int_value() == -1:
+                x = float('-inf')
+            else:
+                x = None
+        elif (isinstance(x, Symbol) and x.get_name() == 'System`Indeterminate'):
+            x = float('nan')
+        else:
+            x = None
+        assert x is None or isinstance(x, float)
+        return x
+
+    @staticmethod
+    def _complex_value(x, evaluation):
+        if isinstance(x, (Complex, Real, Integer)):
+            x = x.to_python()
+        elif x.has_form('DirectedInfinity', 1):
+            x = x.leaves[0].to_python(n_evaluation=evaluation)
+
+            # x*float('+inf') creates nan if x.real or x.imag are zero
+            x = complex(x.real * float('+inf') if x.real != 0 else 0,
+                        x.imag * float('+inf') if x.imag != 0 else 0)
+        elif (isinstance(x, Symbol) and x.get_name() == 'System`Indeterminate'):
+            x = complex(float('nan'), float('nan'))
+        else:
+            x = None
+        return x
+
+    def _bulk_values(self, t, leaves, evaluation):
+        """
+        Converts leaves to Python numbers for _BinaryFormat.write_bulk, or
+        returns None if some leaf cannot be converted.
+        """
+        if t.startswith('Real'):
+            values = [self._real_value(x) for x in leaves]
+        elif t.startswith('Complex'):
+            values = [self._complex_value(x, evaluation) for x in leaves]
+        elif all(isinstance(x, Integer) for x in leaves):
+            return [x.get_int_value() for x in leaves]
+        else:
+            return None
+        if any(x is None for x in values):
+            return None
+        return values
+
 
 class BinaryRead(Builtin):
     """
@@ -1791,6 +2149,8 @@ class BinaryRead(Builtin):
             evaluation.message('BinaryRead', 'bfmt', channel)
             return expr
 
+        _release_read_buffer(n.get_int_value())
+
         if typ.has_form('List', None):
             types = typ.get_leaves()
         else:
@@ -1816,6 +2176,221 @@ class BinaryRead(Builtin):
                 return result[0]
 
 
+class BinaryReadList(Builtin):
+    """
+    <dl>
+    <dt>'BinaryReadList["$file$"]'
+      <dd>reads all remaining bytes from $file$ as integers from 0 to 255.
+    <dt>'BinaryReadList["$file$", $type$]'
+      <dd>reads all remaining objects of the specified type.
+    <dt>'BinaryReadList["$file$", {$type1$, $type2$, ...}]'
+      <dd>reads a list of sequences of objects of the specified types.
+    <dt>'BinaryReadList["$file$", $types$, $n$]'
+      <dd>reads at most $n$ objects or sequences.
+    </dl>
+
+    $file$ can also be an input stream opened with 'BinaryFormat -> True',
+    in which case reading starts at the current stream position.
+
+    Sequences of integers, machine reals and machine complex numbers are
+    decoded in bulk. The option 'ByteOrdering' selects little endian ($-1$)
+    or big endian ($1$) data for these types; other types of more than
+    one byte can only be read in the native byte ordering.
+
+    >> strm = OpenWrite[BinaryFormat -> True];
+    >> BinaryWrite[strm, {97, 98, 99, 100}];
+    >> file = Close[strm];
+    >> BinaryReadList[file]
+     = {97, 98, 99, 100}
+    >> BinaryReadList[file, "Integer16"]
+     = {25185, 25699}
+    >> BinaryReadList[file, "Integer16", ByteOrdering -> 1]
+     = {24930, 25444}
+    >> BinaryReadList[file, {"Character8", "Byte"}]
+     = {{a, 98}, {c, 100}}
+    >> BinaryReadList[file, "Byte", 3]
+     = {97, 98, 99}
+    #> BinaryReadList[file, {"Integer16", "Integer16"}, ByteOrdering -> 1]
+     = {{24930, 25444}}
+    #> BinaryReadList[file, {"Byte", "Integer16"}, ByteOrdering -> 1]
+     = {{97, 25187}, {100, EndOfFile}}
+    #> BinaryReadList[file, "Integer24", ByteOrdering -> -$ByteOrdering]
+     : Integer24 can only be read in the native byte ordering.
+     = BinaryReadList[..., Integer24, ByteOrdering -> ...]
+
+    >> strm = OpenWrite[BinaryFormat -> True];
+    >> BinaryWrite[strm, {1.5, -2.25, Indeterminate}, "Real64"];
+    >> file = Close[strm];
+    >> BinaryReadList[file, "Real64"]
+     = {1.5, -2.25, Indeterminate}
+
+    #> strm = OpenRead[file, BinaryFormat -> True];
+    #> BinaryRead[strm, "Real64"]
+     = 1.5
+    #> BinaryReadList[strm, "Real64"]
+     = {-2.25, Indeterminate}
+    #> BinaryReadList[strm, "Real64"]
+     = {}
+    #> Close[strm];
+
+    #> BinaryReadList["ExampleData/numberdata.csv", "Real64", -1]
+     : Non-negative integer or Infinity expected at position 3 in BinaryReadList[ExampleData/numberdata.csv, Real64, -1].
+     = BinaryReadList[ExampleData/numberdata.csv, Real64, -1]
+    #> BinaryReadList[file, "Real65"]
+     : Real65 is not a recognized binary format.
+     = BinaryReadList[..., Real65]
+    #> BinaryReadList[file, "Integer32", ByteOrdering -> 0]
+     : ByteOrdering must be either 1 or -1.
+     = BinaryReadList[..., Integer32, ByteOrdering -> 0]
+    #> BinaryReadList["/nonexistent/file"]
+     : Cannot open /nonexistent/file.
+     = BinaryReadList[/nonexistent/file]
+
+    ## Round trip of all bulk types in both byte orders
+    #> RT[data_, t_, o_] := Module[{s, f}, s = OpenWrite[BinaryFormat -> True]; BinaryWrite[s, data, t, ByteOrdering -> o]; f = Close[s]; BinaryReadList[f, t, ByteOrdering -> o] == data]
+    #> And @@ Flatten[Table[RT[RandomInteger[{-2^(n-1), 2^(n-1)-1}, 100], "Integer" <> ToString[n], o], {n, {8, 16, 32, 64}}, {o, {-1, 1}}]]
+     = True
+    #> And @@ Flatten[Table[RT[RandomInteger[{0, 2^n-1}, 100], "UnsignedInteger" <> ToString[n], o], {n, {8, 16, 32}}, {o, {-1, 1}}]]
+     = True
+    #> And @@ Table[RT[{0, 2^64-1, 2^63}, "UnsignedInteger64", o], {o, {-1, 1}}]
+     = True
+    #> And @@ Flatten[Table[RT[{0.5, -1.25, 1024.}, t, o], {t, {"Real32", "Real64"}}, {o, {-1, 1}}]]
+     = True
+    #> And @@ Flatten[Table[RT[{0.5 + I, -1.25 - 2.5 I}, t, o], {t, {"Complex64", "Complex128"}}, {o, {-1, 1}}]]
+     = True
+    """
+
+    options = {
+        'ByteOrdering': '$ByteOrdering',
+    }
+
+    messages = {
+        'byteord': 'ByteOrdering must be either 1 or -1.',
+        'bytenat': '`1` can only be read in the native byte ordering.',
+        'intnm': ('Non-negative integer or Infinity expected at '
+                  'position `2` in `1`.'),
+    }
+
+    readers = _BinaryFormat.get_readers()
+
+    def apply(self, file, evaluation, options):
+        'BinaryReadList[file_, OptionsPattern[BinaryReadList]]'
+        expr = Expression('BinaryReadList', file)
+        return self._read_list(expr, file, String('Byte'), None,
+                               evaluation, options)
+
+    def apply_type(self, file, typ, evaluation, options):
+        'BinaryReadList[file_, typ_?NotOptionQ, OptionsPattern[BinaryReadList]]'
+        expr = Expression('BinaryReadList', file, typ)
+        return self._read_list(expr, file, typ, None, evaluation, options)
+
+    def apply_n(self, file, typ, n, evaluation, options):
+        'BinaryReadList[file_, typ_?NotOptionQ, n_?NotOptionQ, OptionsPattern[BinaryReadList]]'
+        expr = Expression('BinaryReadList', file, typ, n)
+        if n != Symbol('Infinity'):
+            count = n.get_int_value()
+            if count is None or count < 0:
+                evaluation.message('BinaryReadList', 'intnm', expr, Integer(3))
+                return
+        else:
+            count = None
+        return self._read_list(expr, file, typ, count, evaluation, options)
+
+    def _read_list(self, expr, file, typ, count, evaluation, options):
+        if typ.has_form('List', None):
+            types = [t.get_string_value() for t in typ.leaves]
+        else:
+            types = [typ.get_string_value()]
+        if not types or not all(t in self.readers for t in types):
+            evaluation.message('BinaryRead', 'format', typ)
+            return
+
+        byteorder = _byte_ordering(
+            self.get_option(options, 'ByteOrdering', evaluation))
+        if byteorder is None:
+            evaluation.message('BinaryReadList', 'byteord')
+            return
+        native_only = _BinaryFormat.native_only(types, byteorder)
+        if native_only is not None:
+            evaluation.message(
+                'BinaryReadList', 'bytenat', String(native_only))
+            return
+
+        if isinstance(file, String):
+            try:
+                with mathics_open(file.get_string_value(), 'rb') as f:
+                    result = self._read(f, typ, types, count, byteorder)
+            except IOError:
+                evaluation.message('General', 'noopen', file)
+                return
+        elif file.has_form('InputStream', 2):
+            name, n = file.leaves
+            stream = _lookup_stream(n.get_int_value())
+            if stream is None or stream.closed:
+                evaluation.message('General', 'openx', name)
+                return
+            if stream.mode not in ['rb']:
+                evaluation.message('BinaryRead', 'bfmt', file)
+                return
+            _release_read_buffer(n.get_int_value())
+            result = self._read(stream, typ, types, count, byteorder)
+        else:
+            evaluation.message('General', 'stream', file)
+            return
+
+        return Expression('List', *result)
+
+    def _read(self, stream, typ, types, count, byteorder):
+        if not typ.has_form('List', None):
+            t = types[0]
+            if t in _BinaryFormat.bulk_codes:
+                return _BinaryFormat.read_bulk(stream, t, count, byteorder)
+
+        result = []
+        while count is None or len(result) < count:
+            record = []
+            for t in types:
+                try:
+                    if t in _BinaryFormat.bulk_codes:
+                        record.append(_BinaryFormat.read_value(
+                            stream, t, byteorder))
+                    else:
+                        record.append(self.readers[t](stream))
+                except struct.error:
+                    break
+            if not record:
+                break
+            if typ.has_form('List', None):
+                # Sequences cut off by the end of file are padded
+                record.extend(
+                    [Symbol('EndOfFile')] * (len(types) - len(record)))
+                result.append(Expression('List', *record))
+            else:
+                result.append(record[0])
+        return result
+
+
+class ByteOrdering(Predefined):
+    """
+    <dl>
+    <dt>'$ByteOrdering'
+      <dd>returns the native byte ordering of the computer, $-1$ for
+      little endian and $1$ for big endian.
+    </dl>
+
+    >> $ByteOrdering
+     = ...
+    #> MemberQ[{-1, 1}, $ByteOrdering]
+     = True
+    """
+
+    attributes = ('Locked', 'Protected')
+    name = '$ByteOrdering'
+
+    def evaluate(self, evaluation):
+        return Integer(-1 if sys.byteorder == 'little' else 1)
+
+
 class WriteString(Builtin):
     """
     <dl>
@@ -2063,6 +2638,94 @@ class OpenAppend(_OpenAction):
     stream_type = 'OutputStream'
 
 
+# Files read by Get are parsed without looking up symbols (see
+# parse_generic) and the result is cached in memory and on disk, keyed by
+# the path, modification time and size of the file. Symbols are looked up
+# when the cached expressions are replayed, so they always end up in the
+# contexts current at that time.
+_PARSE_CACHE = {}
+_PARSE_CACHE_FORMAT = 1
+
+
+def _parse_cache_key(path):
+    stat = os.stat(path)
+    return (path, getattr(stat, 'st_mtime_ns', stat.st_mtime), stat.st_size,
+            __version__, _PARSE_CACHE_FORMAT, tuple(sys.version_info[:2]))
+
+
+def _parse_cache_file(path):
+    name = hashlib.sha1(path.encode('utf-8')).hexdigest()
+    return os.path.join(PARSE_CACHE_DIR, name + '.marshal')
+
+
+def _load_parse_cache(key):
+    cached = _PARSE_CACHE.get(key[0])
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    if PARSE_CACHE_DIR is None:
+        return None
+    try:
+        with open(_parse_cache_file(key[0]), 'rb') as f:
+            stored_key, generics = marshal.load(f)
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+    if stored_key != key:
+        return None
+    _PARSE_CACHE[key[0]] = (key, generics)
+    return generics
+
+
+def _store_parse_cache(key, generics):
+    _PARSE_CACHE[key[0]] = (key, generics)
+    if PARSE_CACHE_DIR is None:
+        return
+    filename = _parse_cache_file(key[0])
+    tmp = '%s.%d' % (filename, os.getpid())
+    try:
+        if not os.path.isdir(PARSE_CACHE_DIR):
+            os.makedirs(PARSE_CACHE_DIR)
+        with open(tmp, 'wb') as f:
+            marshal.dump((key, generics), f)
+        os.rename(tmp, filename)
+    except (IOError, OSError, ValueError):
+        pass
+
+
+def _parse_file(path):
+    """
+    Returns the parsed contents of the file at path as a list of generic
+    expressions (see parse_generic), or None if the file could not be
+    parsed cleanly.
+    """
+    from mathics.core.parser import (
+        parse_generic, TranslateError, FileLineFeeder)
+
+    path = os.path.abspath(path)
+    try:
+        key = _parse_cache_key(path)
+    except OSError:
+        return None
+    generics = _load_parse_cache(key)
+    if generics is not None:
+        return generics
+
+    generics = []
+    try:
+        with mathics_open(path, 'r') as f:
+            feeder = FileLineFeeder(f)
+            while not feeder.empty():
+                generic = parse_generic(feeder)
+                if feeder.messages:
+                    return None
+                if generic is not None:
+                    generics.append(generic)
+    except (IOError, MessageException, TranslateError, UnicodeDecodeError):
+        return None
+
+    _store_parse_cache(key, generics)
+    return generics
+
+
 class Get(PrefixOperator):
     r"""
     <dl>
@@ -2094,6 +2757,22 @@ class Get(PrefixOperator):
      : Cannot open SomeTypoPackage`.
      = $Failed
 
+    ## Symbols are looked up in the current context, also for files read
+    ## before
+    #> Put[Hold[getsym], "example_file"]
+    #> Get["example_file"] /. Hold[s_] :> Context[s]
+     = Global`
+    #> Begin["GetTest`"]; Get["example_file"] /. Hold[s_] :> Context[s]
+     = GetTest`
+    #> End[]; DeleteFile["example_file"]
+
+    ## Expressions before a syntax error are evaluated
+    #> strm = OpenWrite["example_file"]; WriteString[strm, "getvar = 1\ngetvar +\n"]; Close[strm];
+    #> Quiet[Get["example_file"]]
+    #> getvar
+     = 1
+    #> DeleteFile["example_file"]
+
     ## Parser Tests
     #> Hold[<< ~/some_example/dir/] // FullForm
      = Hold[Get["~/some_example/dir/"]]
@@ -2107,6 +2786,24 @@ class Get(PrefixOperator):
 
     def apply(self, path, evaluation):
         'Get[path_String]'
+        from mathics.core.parser import convert_generic
+
+        pypath = path.get_string_value()
+        filename = path_search(pypath)
+        if filename is not None and os.path.isfile(filename):
+            generics = _parse_file(filename)
+            if generics is not None:
+                result = None
+                for generic in generics:
+                    query = convert_generic(generic, evaluation.definitions)
+                    result = query.evaluate(evaluation)
+                return result
+
+        # Files with syntax errors are parsed one expression at a time, so
+        # that everything up to the error is evaluated.
+        return self._get(path, evaluation)
+
+    def _get(self, path, evaluation):
         from mathics.core.parser import parse, TranslateError, FileLineFeeder
 
         result = None
@@ -2815,6 +3512,13 @@ class ReadList(Read):
 
     #> ReadList[StringToStream["a 1 b 2"], {Word, Number}, 1]
      = {{a, 1}}
+
+    #> ReadList[StringToStream["1 2\\n-3, 4.5\\r\\n6"], Number]
+     = {1, 2, -3, 4.5, 6}
+    #> ReadList[StringToStream["a b\\r\\nc"], Word]
+     = {a, b, c}
+    #> ReadList[StringToStream["a::b::::c"], Record, RecordSeparators -> {"::"}]
+     = {a, b, c}
     """
 
     # TODO
@@ -2854,43 +3558,10 @@ class ReadList(Read):
 
     def apply(self, channel, types, evaluation, options):
         'ReadList[channel_, types_, OptionsPattern[ReadList]]'
-
-        # Options
-        # TODO: Implement extra options
-        # py_options = self.check_options(options)
-        # null_records = py_options['NullRecords']
-        # null_words = py_options['NullWords']
-        # record_separators = py_options['RecordSeparators']
-        # token_words = py_options['TokenWords']
-        # word_separators = py_options['WordSeparators']
-
-        result = []
-        while True:
-            tmp = super(ReadList, self).apply(
-                channel, types, evaluation, options)
-
-            if tmp is None:
-                return
-
-            if tmp == Symbol('$Failed'):
-                return
-
-            if tmp == Symbol('EndOfFile'):
-                break
-            result.append(tmp)
-        return from_python(result)
+        return self._read_list(channel, types, None, evaluation, options)
 
     def apply_m(self, channel, types, m, evaluation, options):
-        'ReadList[channel_, types_, m_, OptionsPattern[ReadList]]'
-
-        # Options
-        # TODO: Implement extra options
-        # py_options = self.check_options(options)
-        # null_records = py_options['NullRecords']
-        # null_words = py_options['NullWords']
-        # record_separators = py_options['RecordSeparators']
-        # token_words = py_options['TokenWords']
-        # word_separators = py_options['WordSeparators']
+        'ReadList[channel_, types_, m_Integer, OptionsPattern[ReadList]]'
 
         py_m = m.get_int_value()
         if py_m < 0:
@@ -2898,19 +3569,56 @@ class ReadList(Read):
                 'ReadList', 'intnm', Expression('ReadList', channel, types, m))
             return
 
-        result = []
-        for i in range(py_m):
-            tmp = super(ReadList, self).apply(
-                channel, types, evaluation, options)
+        return self._read_list(channel, types, py_m, evaluation, options)
 
-            if tmp == Symbol('$Failed'):
-                return
+    def _read_list(self, channel, types, py_m, evaluation, options):
+        opened = self._open(channel, evaluation)
+        if opened is None:
+            return
+        strm, buffer = opened
 
-            if tmp.to_python() == 'EndOfFile':
-                break
-            result.append(tmp)
+        types = self._check_types(types, evaluation)
+        if types is None:
+            return
+
+        py_options = self.check_options(options)
+
+        if types == ['System`Number']:
+            return self._read_numbers(buffer, strm, py_m, py_options,
+                                      evaluation)
+
+        result = []
+        try:
+            while py_m is None or len(result) < py_m:
+                tmp = self._read(buffer, strm, types, py_options, evaluation)
+                if tmp is None:
+                    return
+                result.append(tmp[0] if len(tmp) == 1 else tmp)
+        except EOFError:
+            pass
         return from_python(result)
 
+    def _read_numbers(self, buffer, strm, py_m, py_options, evaluation):
+        # Collect all the tokens first and convert them in one go.
+        word_separators = (py_options['WordSeparators'] +
+                           py_options['RecordSeparators'])
+        tokens = []
+        try:
+            while py_m is None or len(tokens) < py_m:
+                tokens.append(_read_token(buffer, 'Number', word_separators))
+        except EOFError:
+            pass
+        try:
+            result = [int(token) for token in tokens]
+        except ValueError:
+            try:
+                result = [_number_from_string(token) for token in tokens]
+            except ValueError:
+                evaluation.message('Read', 'readn', strm)
+                return
+        return Expression('List', *[
+            Integer(x) if isinstance(x, int) else Real(x) for x in result])
+
 
 class FilePrint(Builtin):
     """
@@ -3046,6 +3754,7 @@ class Close(Builtin):
             evaluation.message('General', 'openx', channel)
             return
 
+        _READ_BUFFERS.pop(n.get_int_value(), None)
         try:
             stream.close()
         except IOError as err:
@@ -3068,6 +3777,11 @@ class StreamPosition(Builtin):
 
     >> StreamPosition[str]
      = 7
+
+    #> Read[str, Word]; StreamPosition[str]
+     = 10
+    #> Read[str, Word]
+     = cool!
     """
 
     attributes = ('Protected')
@@ -3080,6 +3794,7 @@ class StreamPosition(Builtin):
             evaluation.message('General', 'openx', name)
             return
 
+        _release_read_buffer(n.get_int_value())
         return from_python(stream.tell())
 
     def apply_output(self, name, n, evaluation):
@@ -3149,6 +3864,8 @@ class SetStreamPosition(Builtin):
         if not stream.seekable:
             raise NotImplementedError
 
+        _release_read_buffer(n.get_int_value())
+
         seekpos = m.to_python()
         if not (isinstance(seekpos, int) or seekpos == float('inf')):
             evaluation.message('SetStreamPosition', 'stmrng',
@@ -3231,25 +3948,30 @@ class Skip(Read):
 
         channel = Expression('InputStream', name, n)
 
-        # Options
-        # TODO Implement extra options
-        # py_options = self.check_options(options)
-        # null_records = py_options['NullRecords']
-        # null_words = py_options['NullWords']
-        # record_separators = py_options['RecordSeparators']
-        # token_words = py_options['TokenWords']
-        # word_separators = py_options['WordSeparators']
-
         py_m = m.to_python()
         if not (isinstance(py_m, int) and py_m > 0):
             evaluation.message('Skip', 'intm', Expression(
                 'Skip', Expression('InputStream', name, n), types, m))
             return
-        for i in range(py_m):
-            result = super(Skip, self).apply(
-                channel, types, evaluation, options)
-            if result == Symbol('EndOfFile'):
-                return result
+
+        opened = self._open(channel, evaluation)
+        if opened is None:
+            return
+        strm, buffer = opened
+
+        types = self._check_types(types, evaluation)
+        if types is None:
+            return Symbol('$Failed')
+
+        py_options = self.check_options(options)
+
+        try:
+            for i in range(py_m):
+                if self._read(buffer, strm, types, py_options,
+                              evaluation) is None:
+                    return Symbol('$Failed')
+        except EOFError:
+            return Symbol('EndOfFile')
         return Symbol('Null')
 
 
@@ -3292,12 +4014,12 @@ class Find(Read):
 
         # Options
         # TODO Implement extra options
-        # py_options = self.check_options(options)
         # anchored_search = py_options['AnchoredSearch']
         # ignore_case = py_options['IgnoreCase']
         # word_search = py_options['WordSearch']
-        # record_separators = py_options['RecordSeparators']
         # word_separators = py_options['WordSeparators']
+        py_options = self.check_options(options)
+        record_separators = py_options['RecordSeparators']
 
         py_text = text.to_python()
 
@@ -3314,19 +4036,20 @@ class Find(Read):
 
         py_text = [t[1:-1] for t in py_text]
 
-        while True:
-            tmp = super(Find, self).apply(
-                channel, Symbol('Record'), evaluation, options)
-            py_tmp = tmp.to_python()[1:-1]
-
-            if py_tmp == 'System`EndOfFile':
-                evaluation.message(
-                    'Find', 'notfound', Expression('Find', channel, text))
-                return Symbol("$Failed")
+        opened = self._open(channel, evaluation)
+        if opened is None:
+            return
+        strm, buffer = opened
 
-            for t in py_text:
-                if py_tmp.find(t) != -1:
-                    return from_python(py_tmp)
+        try:
+            while True:
+                record = _read_token(buffer, 'Record', record_separators)
+                if any(t in record for t in py_text):
+                    return String(record)
+        except EOFError:
+            evaluation.message(
+                'Find', 'notfound', Expression('Find', channel, text))
+            return Symbol("$Failed")
 
 
 class FindList(Builtin):
@@ -3419,7 +4142,13 @@ class FindList(Builtin):
         for path in py_name:
             try:
                 with mathics_open(path, 'r') as f:
-                    lines = f.readlines()
+                    buffer = _ReadBuffer(f)
+                    while py_n is None or len(results) < py_n:
+                        line = buffer.readline()
+                        if not line:
+                            break
+                        if any(t in line for t in py_text):
+                            results.append(line.rstrip('\n'))
             except IOError:
                 evaluation.message('General', 'noopen', path)
                 return
@@ -3427,18 +4156,6 @@ class FindList(Builtin):
                 e.message(evaluation)
                 return
 
-            result = []
-            for line in lines:
-                for t in py_text:
-                    if line.find(t) != -1:
-                        result.append(line[:-1])
-            results.append(result)
-
-        results = [r for result in results for r in result]
-
-        if isinstance(py_n, int):
-            results = results[:min(py_n, len(results))]
-
         return from_python(results)
 
 
@@ -3575,14 +4292,22 @@ class Compress(Builtin):
       <dd>gives a compressed string representation of $expr$.
     </dl>
 
+    The expression is stored in a compact binary form, see
+    'mathics.core.serialize', with lists of machine numbers stored raw.
+
     >> Compress[N[Pi, 10]]
-     = eJwz1jM0MTS1NDIzNQEADRsCNw==
+     = eJxj8I0IZgzwXHTlW/tJRk9HTzdVADy0Bo4=
 
     ## Unicode char
     #> Compress["―"]
-     = eJxTetQwVQkABwMCPA==
+     = eJxj8I0IZgxhftQwFQANtQNI
     #> Uncompress[%]
      = ―
+
+    #> Uncompress[Compress[{1, 2, 3, 4, 5, 2^70, -3/7, 1.5 - 2 I, N[E, 30], "s", f[x]}]]
+     = {1, 2, 3, 4, 5, 1180591620717411303424, -3 / 7, 1.5 - 2. I, 2.71828182845904523536028747135, s, f[x]}
+    #> data = RandomReal[1, 1000]; Uncompress[Compress[data]] === data
+     = True
     """
 
     attributes = ('Protected')
@@ -3593,14 +4318,17 @@ class Compress(Builtin):
 
     def apply(self, expr, evaluation, options):
         'Compress[expr_, OptionsPattern[Compress]]'
-        string = expr.format(evaluation, 'System`FullForm')
-        string = string.boxes_to_text(
-            evaluation=evaluation, show_string_characters=True)
-        string = string.encode('utf-8')
-
         # TODO Implement other Methods
-        result = zlib.compress(string)
-        result = base64.encodestring(result).decode('utf8')
+        try:
+            result = serialize.compress(expr)
+        except ValueError:
+            # atoms without a binary form are stored as text
+            string = expr.format(evaluation, 'System`FullForm')
+            string = string.boxes_to_text(
+                evaluation=evaluation, show_string_characters=True)
+            result = zlib.compress(string.encode('utf-8'))
+
+        result = base64.b64encode(result).decode('utf8')
 
         return String(result)
 
@@ -3613,7 +4341,7 @@ class Uncompress(Builtin):
     </dl>
 
     >> Compress["Mathics is cool"]
-     = eJxT8k0sychMLlbILFZIzs/PUQIANFwF1w==
+     = eJxj8I0IZgzh900sychMLlbILFZIzs/PAQBGWwbv
     >> Uncompress[%]
      = Mathics is cool
 
@@ -3621,17 +4349,40 @@ class Uncompress(Builtin):
     >> b = Compress[a];
     >> Uncompress[b]
      = x ^ 2 + y Sin[x] + 10 Log[15]
+
+    Strings generated by earlier versions of Mathics, which compressed
+    the text of the expression, are still understood:
+    >> Uncompress["eJxT8k0sychMLlbILFZIzs/PUQIANFwF1w=="]
+     = Mathics is cool
+    #> Uncompress["eJwz1jM0MTS1NDIzNQEADRsCNw==\\n"]
+     = 3.14159
+
+    #> Uncompress["abc"]
+     : abc is not a valid compressed string.
+     = $Failed
     """
 
     attributes = ('Protected')
 
+    messages = {
+        'string': '`1` is not a valid compressed string.',
+    }
+
     def apply(self, string, evaluation):
         'Uncompress[string_String]'
-        string = string.get_string_value().encode('utf-8')
-        string = base64.decodestring(string)
-        tmp = zlib.decompress(string)
-        tmp = tmp.decode('utf-8')
-        return evaluation.parse(tmp)
+        data = string.get_string_value().encode('utf-8')
+        try:
+            data = base64.b64decode(data)
+            try:
+                return serialize.decompress(data)
+            except ValueError:
+                pass
+            # text compressed by earlier versions
+            text = zlib.decompress(data).decode('utf-8')
+        except (binascii.Error, TypeError, ValueError, zlib.error):
+            evaluation.message('Uncompress', 'string', string)
+            return Symbol('$Failed')
+        return evaluation.parse(text)
 
 
 class FileByteCount(Builtin):
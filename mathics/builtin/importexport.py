@@ -9,14 +9,21 @@ from __future__ import unicode_literals
 from __future__ import absolute_import
 import six
 
-from mathics.core.expression import Expression, from_python, strip_context
-from mathics.builtin.base import Builtin, Predefined, Symbol, String
+from mathics.core.expression import (Expression, Integer, Real, from_python,
+                                     strip_context)
+from mathics.builtin.base import (Builtin, Predefined, Symbol, String,
+                                  MessageException)
 from mathics.builtin.options import options_to_rules
+from mathics.builtin.files import mathics_open
 
 from .pymimesniffer import magic
+import csv
+import math
 import mimetypes
+import re
 import sys
-from itertools import chain
+from itertools import chain, islice
+from six.moves import zip
 
 import urllib
 
@@ -305,6 +312,7 @@ class RegisterImport(Builtin):
         'Encoding': 'False',
         'Extensions': '{}',
         'AlphaChannel': 'False',
+        'PartialAccess': 'False',
     }
 
     rules = {
@@ -480,11 +488,13 @@ class Import(Builtin):
     #> Import["ExampleData/numberdata.csv", "Elements"]
      = {Data, Grid}
     #> Import["ExampleData/numberdata.csv", "Data"]
-    = {{0.88, 0.60, 0.94}, {0.76, 0.19, 0.51}, {0.97, 0.04, 0.26}, {0.33, 0.74, 0.79}, {0.42, 0.64, 0.56}}
+     = {{0.88, 0.6, 0.94}, {0.76, 0.19, 0.51}, {0.97, 0.04, 0.26}, {0.33, 0.74, 0.79}, {0.42, 0.64, 0.56}}
     #> Import["ExampleData/numberdata.csv"]
-    = {{0.88, 0.60, 0.94}, {0.76, 0.19, 0.51}, {0.97, 0.04, 0.26}, {0.33, 0.74, 0.79}, {0.42, 0.64, 0.56}}
+     = {{0.88, 0.6, 0.94}, {0.76, 0.19, 0.51}, {0.97, 0.04, 0.26}, {0.33, 0.74, 0.79}, {0.42, 0.64, 0.56}}
     #> Import["ExampleData/numberdata.csv", "FieldSeparators" -> "."]
-    = {{0, 88,0, 60,0, 94}, {0, 76,0, 19,0, 51}, {0, 97,0, 04,0, 26}, {0, 33,0, 74,0, 79}, {0, 42,0, 64,0, 56}}
+     = {{0, 88,0, 60,0, 94}, {0, 76,0, 19,0, 51}, {0, 97,0, 04,0, 26}, {0, 33,0, 74,0, 79}, {0, 42,0, 64,0, 56}}
+    #> Import["ExampleData/numberdata.csv", {"Data", 1, 3}]
+     = 0.94
 
     ## Text
     >> Import["ExampleData/ExampleData.txt", "Elements"]
@@ -560,6 +570,13 @@ class Import(Builtin):
         else:
             elements = [elements]
 
+        # Part specifications following the element names, as in
+        # {"Data", 1 ;; 10}, select parts of the imported element.
+        parts = []
+        while elements and Import._is_part_spec(elements[-1]):
+            parts.insert(0, elements[-1])
+            elements = elements[:-1]
+
         for el in elements:
             if not isinstance(el, String):
                 evaluation.message('Import', 'noelem', el)
@@ -596,16 +613,25 @@ class Import(Builtin):
             # TODO message
             return Symbol('$Failed')
 
+        # Importers with partial access take the part specifications as
+        # additional arguments and only import what is needed. For all
+        # other importers the parts are taken from the complete result.
+        partial_access = importer_options.get("System`PartialAccess")
+        if partial_access is not None and partial_access.is_true():
+            partial_args, parts = parts, []
+        else:
+            partial_args = []
+
         def get_results(tmp_function):
             if function_channels == Expression('List', String('FileNames')):
                 joined_options = list(chain(stream_options, custom_options))
-                tmp = Expression(tmp_function, findfile, *joined_options).evaluate(evaluation)
+                tmp = Expression(tmp_function, findfile, *(partial_args + joined_options)).evaluate(evaluation)
             elif function_channels == Expression('List', String('Streams')):
                 stream = Expression('OpenRead', findfile, *stream_options).evaluate(evaluation)
                 if stream.get_head_name() != 'System`InputStream':
                     evaluation.message('Import', 'nffil')
                     return None
-                tmp = Expression(tmp_function, stream, *custom_options).evaluate(evaluation)
+                tmp = Expression(tmp_function, stream, *(partial_args + custom_options)).evaluate(evaluation)
                 Expression('Close', stream).evaluate(evaluation)
             else:
                 # TODO message
@@ -620,56 +646,71 @@ class Import(Builtin):
                         for (a, b) in [x.get_leaves() for x in tmp])
 
         # Perform the import
-        defaults = None
+        def import_element():
+            defaults = None
 
-        if not elements:
-            defaults = get_results(default_function)
-            if defaults is None:
-                return Symbol('$Failed')
-            if default_element == Symbol("Automatic"):
-                return Expression('List', *(
-                    Expression('Rule', String(key), defaults[key])
-                    for key in defaults.keys()))
-            else:
-                result = defaults.get(default_element.get_string_value())
-                if result is None:
-                    evaluation.message('Import', 'noelem', default_element,
-                                       from_python(filetype))
-                    return Symbol('$Failed')
-                return result
-        else:
-            assert len(elements) == 1
-            el = elements[0]
-            if el == "Elements":
+            if not elements:
                 defaults = get_results(default_function)
                 if defaults is None:
                     return Symbol('$Failed')
-                # Use set() to remove duplicates
-                return from_python(sorted(set(
-                    list(conditionals.keys()) + list(defaults.keys()) + list(posts.keys()))))
-            else:
-                if el in conditionals.keys():
-                    result = get_results(conditionals[el])
+                if default_element == Symbol("Automatic"):
+                    return Expression('List', *(
+                        Expression('Rule', String(key), defaults[key])
+                        for key in defaults.keys()))
+                else:
+                    result = defaults.get(default_element.get_string_value())
                     if result is None:
+                        evaluation.message('Import', 'noelem', default_element,
+                                           from_python(filetype))
                         return Symbol('$Failed')
-                    if len(list(result.keys())) == 1 and list(result.keys())[0] == el:
-                        return list(result.values())[0]
-                elif el in posts.keys():
-                    # TODO: allow use of conditionals
-                    result = get_results(posts[el])
-                    if result is None:
+                    return result
+            else:
+                assert len(elements) == 1
+                el = elements[0]
+                if el == "Elements":
+                    defaults = get_results(default_function)
+                    if defaults is None:
                         return Symbol('$Failed')
+                    # Use set() to remove duplicates
+                    return from_python(sorted(set(
+                        list(conditionals.keys()) + list(defaults.keys()) + list(posts.keys()))))
                 else:
-                    if defaults is None:
-                        defaults = get_results(default_function)
-                        if defaults is None:
+                    if el in conditionals.keys():
+                        result = get_results(conditionals[el])
+                        if result is None:
+                            return Symbol('$Failed')
+                        if len(list(result.keys())) == 1 and list(result.keys())[0] == el:
+                            return list(result.values())[0]
+                    elif el in posts.keys():
+                        # TODO: allow use of conditionals
+                        result = get_results(posts[el])
+                        if result is None:
                             return Symbol('$Failed')
-                    if el in defaults.keys():
-                        return defaults[el]
                     else:
-                        evaluation.message('Import', 'noelem', from_python(el),
-                                           from_python(filetype))
-                        return Symbol('$Failed')
+                        if defaults is None:
+                            defaults = get_results(default_function)
+                            if defaults is None:
+                                return Symbol('$Failed')
+                        if el in defaults.keys():
+                            return defaults[el]
+                        else:
+                            evaluation.message('Import', 'noelem', from_python(el),
+                                               from_python(filetype))
+                            return Symbol('$Failed')
+
+        result = import_element()
+        if parts and result is not None and result != Symbol('$Failed'):
+            result = Expression('Part', result, *parts).evaluate(evaluation)
+        return result
+
+    @staticmethod
+    def _is_part_spec(expr):
+        if isinstance(expr, Integer) or expr.has_form('Span', 2, 3):
+            return True
+        if expr == Symbol('All'):
+            return True
+        return expr.has_form('List', 1, None) and all(
+            isinstance(leaf, Integer) for leaf in expr.leaves)
 
 
 class Export(Builtin):
@@ -981,3 +1022,204 @@ class FileFormat(Builtin):
             return None
 
         return from_python(result)
+
+
+_integer_field = re.compile(r'\s*[+-]?\d+\s*$')
+_real_field = re.compile(
+    r'\s*[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?\s*$')
+
+
+def _convert_real(field):
+    value = float(field)
+    if math.isinf(value):
+        # too large for a machine real, kept like other non-numbers
+        return String(field)
+    return Real(value)
+
+
+def _convert_field(field):
+    if _integer_field.match(field):
+        return Integer(int(field))
+    elif _real_field.match(field):
+        return _convert_real(field)
+    else:
+        return String(field)
+
+
+def _convert_column(fields):
+    # Whole columns of integers or reals are converted in one go, anything
+    # else (including columns mixing integers and reals) field by field.
+    if all(_integer_field.match(field) for field in fields):
+        return [Integer(int(field)) for field in fields]
+    elif all(_real_field.match(field) and not _integer_field.match(field)
+             for field in fields):
+        return [_convert_real(field) for field in fields]
+    else:
+        return [_convert_field(field) for field in fields]
+
+
+class _TableImport(Builtin):
+    """
+    Imports delimiter-separated tables using Python's csv module.
+
+    Rows are read lazily and converted in chunks: columns consisting of
+    numbers only become lists of Integer or Real, all other fields are kept
+    as strings unless they look like numbers. Additional part arguments
+    restrict the import to the given rows (and columns), so that reading
+    stops after the last row needed.
+    """
+
+    context = 'System`Convert`TableDump`'
+
+    chunk_size = 4096
+
+    options = {
+        'CharacterEncoding': '$CharacterEncoding',
+        'FieldSeparators': '","',
+        'HeaderLines': '0',
+    }
+
+    messages = {
+        'fldsep': 'Field separators `1` should be a string or a list of strings.',
+        'hdrln': 'Value of option "HeaderLines" -> `1` should be a non-negative integer.',
+    }
+
+    def apply(self, filename, evaluation, options):
+        '%(name)s[filename_String, OptionsPattern[]]'
+        return self._import(filename, [], evaluation, options)
+
+    def apply_rows(self, filename, rows, evaluation, options):
+        '%(name)s[filename_String, rows_?NotOptionQ, OptionsPattern[]]'
+        return self._import(filename, [rows], evaluation, options)
+
+    def apply_rows_columns(self, filename, rows, columns, evaluation, options):
+        '%(name)s[filename_String, rows_?NotOptionQ, columns_?NotOptionQ, OptionsPattern[]]'
+        return self._import(filename, [rows, columns], evaluation, options)
+
+    @staticmethod
+    def _last_row(spec):
+        """
+        Returns the number of rows that have to be read for the part
+        specification spec, or None if the whole table is needed.
+        """
+        if spec is None:
+            return None
+        n = spec.get_int_value()
+        if n is not None:
+            return n if n > 0 else None
+        if spec.has_form('Span', 2):
+            # negative indices count from the end of the whole table
+            start, stop = [leaf.get_int_value() for leaf in spec.leaves]
+            if start is not None and start > 0 and stop is not None and stop > 0:
+                return stop
+            return None
+        if spec.has_form('List', None) and spec.leaves:
+            indices = [leaf.get_int_value() for leaf in spec.leaves]
+            if all(i is not None and i > 0 for i in indices):
+                return max(indices)
+        return None
+
+    def _reader(self, f, separators):
+        if len(separators) == 1 and len(separators[0]) == 1:
+            return csv.reader(f, delimiter=str(separators[0]))
+        split = re.compile('|'.join(
+            re.escape(sep) for sep in sorted(separators, key=len, reverse=True)))
+        return (split.split(line.rstrip('\r\n')) if line.strip('\r\n') else []
+                for line in f)
+
+    def _import(self, filename, parts, evaluation, options):
+        separators = self.get_option(options, 'FieldSeparators', evaluation)
+        if isinstance(separators, String):
+            separators = [separators]
+        elif separators is not None and separators.has_form('List', None):
+            separators = separators.leaves
+        else:
+            separators = [None]
+        if not all(isinstance(sep, String) and sep.get_string_value()
+                   for sep in separators):
+            evaluation.message(self.get_name(), 'fldsep',
+                               Expression('List', *separators))
+            return Symbol('$Failed')
+        separators = [sep.get_string_value() for sep in separators]
+
+        header_option = self.get_option(options, 'HeaderLines', evaluation)
+        header_lines = header_option.get_int_value()
+        if header_lines is None or header_lines < 0:
+            evaluation.message(self.get_name(), 'hdrln', header_option)
+            return Symbol('$Failed')
+
+        encoding = self.get_option(options, 'CharacterEncoding', evaluation)
+        if not isinstance(encoding, String):
+            return Symbol('$Failed')
+
+        last_row = self._last_row(parts[0] if parts else None)
+
+        rows = []
+        try:
+            with mathics_open(filename.get_string_value(), 'r',
+                              encoding.get_string_value()) as f:
+                reader = self._reader(f, separators)
+                stop = None if last_row is None else header_lines + last_row
+                reader = islice(reader, header_lines, stop)
+                while True:
+                    chunk = list(islice(reader, self.chunk_size))
+                    if not chunk:
+                        break
+                    rows.extend(self._convert_chunk(chunk))
+        except IOError:
+            evaluation.message('General', 'noopen', filename)
+            return Symbol('$Failed')
+        except MessageException as e:
+            e.message(evaluation)
+            return Symbol('$Failed')
+        except UnicodeDecodeError:
+            evaluation.message('General', 'ucdec')
+            return Symbol('$Failed')
+
+        data = Expression('List', *rows)
+        if parts:
+            data = Expression('Part', data, *parts).evaluate(evaluation)
+
+        return Expression(
+            'List',
+            Expression('Rule', String('Data'), data),
+            Expression('Rule', String('Grid'), Expression('Grid', data)))
+
+    @staticmethod
+    def _convert_chunk(chunk):
+        width = len(chunk[0])
+        if width and all(len(row) == width for row in chunk):
+            columns = [_convert_column(column) for column in zip(*chunk)]
+            return [Expression('List', *row) for row in zip(*columns)]
+        return [Expression('List', *[_convert_field(field) for field in row])
+                for row in chunk]
+
+
+class ImportCSV(_TableImport):
+    """
+    #> Import["ExampleData/numberdata.csv", {"Data", 2}]
+     = {0.76, 0.19, 0.51}
+    #> Import["ExampleData/numberdata.csv", {"Data", 2 ;; 3}]
+     = {{0.76, 0.19, 0.51}, {0.97, 0.04, 0.26}}
+    #> Import["ExampleData/numberdata.csv", {"Data", 2 ;; 3, 2}]
+     = {0.19, 0.04}
+    #> Import["ExampleData/numberdata.csv", {"Data", -2 ;; 3}]
+     = {}
+    #> Import["ExampleData/numberdata.csv", {"Data", -4 ;; 2}]
+     = {{0.76, 0.19, 0.51}}
+    #> Import["ExampleData/numberdata.csv", "HeaderLines" -> 3]
+     = {{0.33, 0.74, 0.79}, {0.42, 0.64, 0.56}}
+    """
+
+
+class ImportTSV(_TableImport):
+    """
+    #> Import["ExampleData/copyright.csv", {"TSV", "Data", 1}]
+     = {File Name, License, Source, Notes / Comments}
+    """
+
+    options = {
+        'CharacterEncoding': '$CharacterEncoding',
+        'FieldSeparators': '"\t"',
+        'HeaderLines': '0',
+    }
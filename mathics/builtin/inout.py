@@ -24,6 +24,7 @@ from mathics.core.expression import (
     from_python, MachineReal, PrecisionReal)
 from mathics.core.numbers import (
     dps, prec, convert_base, machine_precision, reconstruct_digits)
+from mathics.settings import OUTPUT_SIZE_LIMIT
 
 MULTI_NEWLINE_RE = re.compile(r"\n{2,}")
 
@@ -695,14 +696,12 @@ class GridBox(BoxConstruct):
         column_count = 0
         for row in items:
             column_count = max(column_count, len(row))
-        result = r'\begin{array}{%s} ' % (column_alignments * column_count)
-        for index, row in enumerate(items):
-            result += ' & '.join(item.boxes_to_tex(**new_box_options)
-                                 for item in row)
-            if index != len(items) - 1:
-                result += '\\\\ '
-        result += r'\end{array}'
-        return result
+        rows = [' & '.join([item.boxes_to_tex(**new_box_options)
+                            for item in row])
+                for row in items]
+        return ''.join((
+            r'\begin{array}{', column_alignments * column_count, '} ',
+            '\\\\ '.join(rows), r'\end{array}'))
 
     def boxes_to_xml(self, leaves, **box_options):
         evaluation = box_options.get('evaluation')
@@ -720,17 +719,19 @@ class GridBox(BoxConstruct):
             raise BoxConstructError
         attrs = ' '.join('{0}="{1}"'.format(name, value)
                          for name, value in six.iteritems(attrs))
-        result = '<mtable {0}>\n'.format(attrs)
         new_box_options = box_options.copy()
         new_box_options['inside_list'] = True
+        cell_open = '<mtd {0}>'.format(attrs)
+        result = ['<mtable {0}>\n'.format(attrs)]
         for row in items:
-            result += '<mtr>'
+            result.append('<mtr>')
             for item in row:
-                result += '<mtd {0}>{1}</mtd>'.format(
-                    attrs, item.boxes_to_xml(**new_box_options))
-            result += '</mtr>\n'
-        result += '</mtable>'
-        return result
+                result.extend((cell_open,
+                               item.boxes_to_xml(**new_box_options),
+                               '</mtd>'))
+            result.append('</mtr>\n')
+        result.append('</mtable>')
+        return ''.join(result)
 
     def boxes_to_text(self, leaves, **box_options):
         evaluation = box_options.get('evaluation')
@@ -1664,6 +1665,169 @@ class Print(Builtin):
         return Symbol('Null')
 
 
+# heads whose output does not grow with the size of their leaves
+_OPAQUE_OUTPUT_HEADS = ('System`Graphics', 'System`Graphics3D')
+
+
+def _atom_output_size(atom):
+    'Estimates the number of characters in the output of atom.'
+    if isinstance(atom, String):
+        return len(atom.value) + 2
+    elif isinstance(atom, Symbol):
+        return len(atom.name) - atom.name.rfind('`') - 1
+    elif isinstance(atom, Integer):
+        # log10(2) < 0.302
+        return atom.value.bit_length() * 302 // 1000 + 2
+    elif isinstance(atom, Rational):
+        return (atom.value.p.bit_length() + atom.value.q.bit_length()) * 302 // 1000 + 3
+    elif isinstance(atom, PrecisionReal):
+        return dps(atom.get_precision()) + 8
+    elif isinstance(atom, Complex):
+        return _atom_output_size(atom.real) + _atom_output_size(atom.imag) + 4
+    return 12
+
+
+def output_size(expr, max_size, max_atoms=None):
+    '''
+    Estimates the number of characters in the output of expr. Returns None
+    as soon as the estimate exceeds max_size or expr is found to contain more
+    than max_atoms atoms, so that the cost is bounded by the limits rather
+    than by the size of expr.
+    '''
+    if max_atoms is None:
+        max_atoms = max_size
+    size = atoms = 0
+    stack = [expr]
+    while stack:
+        expr = stack.pop()
+        if isinstance(expr, Expression):
+            leaves = expr.leaves
+            size += 2 * len(leaves) + 2
+            if size > max_size or atoms + len(leaves) > max_atoms:
+                return None
+            if expr.get_head_name() in _OPAQUE_OUTPUT_HEADS:
+                atoms += 1
+                continue
+            stack.append(expr.head)
+            stack.extend(leaves)
+        else:
+            atoms += 1
+            size += _atom_output_size(expr)
+            if size > max_size or atoms > max_atoms:
+                return None
+    return size
+
+
+def _elide(expr, budget):
+    if not isinstance(expr, Expression) or output_size(expr, budget) is not None:
+        return expr
+    head = _elide(expr.head, budget // 4)
+    budget -= output_size(head, budget) or budget // 4
+    leaves = expr.leaves
+    front = []
+    back = []
+    i, j = 0, len(leaves)
+    # take leaves alternately from the front and the back, each elided to
+    # at most half of the remaining budget
+    while i < j and budget > 0:
+        from_front = len(front) <= len(back)
+        leaf = leaves[i] if from_front else leaves[j - 1]
+        leaf = _elide(leaf, max(budget // 2, 1))
+        size = output_size(leaf, budget) or budget
+        if size + 2 > budget and (front or back):
+            break
+        budget -= size + 2
+        if from_front:
+            front.append(leaf)
+            i += 1
+        else:
+            back.append(leaf)
+            j -= 1
+    if i < j:
+        front.append(Expression('Skeleton', j - i))
+    back.reverse()
+    return Expression(head, *(front + back))
+
+
+def elide_output(expr, max_size, max_atoms, sample_size):
+    '''
+    Returns expr if its output is estimated to fit into max_size
+    characters and max_atoms atoms. Otherwise returns a sample of expr of
+    about sample_size characters, in which omitted sequences of leaves are
+    replaced by Skeleton[n].
+    '''
+    if output_size(expr, max_size, max_atoms) is not None:
+        return expr
+    return _elide(expr, sample_size)
+
+
+class Skeleton(Builtin):
+    """
+    <dl>
+    <dt>'Skeleton[$n$]'
+        <dd>represents a sequence of $n$ omitted elements in an
+        expression.
+    </dl>
+
+    'Skeleton' is used to shorten results that are larger than
+    '$OutputSizeLimit'.
+    >> {a, b, Skeleton[10], c}
+     = {a, b, «10», c}
+
+    #> Skeleton[10] // InputForm
+     = Skeleton[10]
+    """
+
+    def apply_makeboxes(self, n, f, evaluation):
+        '''MakeBoxes[Skeleton[n_Integer],
+            f:StandardForm|TraditionalForm|OutputForm]'''
+        return String('«%s»' % n.get_int_value())
+
+
+class OutputSizeLimit(Builtin):
+    """
+    <dl>
+    <dt>'$OutputSizeLimit'
+        <dd>specifies the maximum estimated number of characters in the
+        output of a result. Larger results are shown shortened, with
+        omitted parts replaced by 'Skeleton' objects.
+    </dl>
+
+    Results are also shortened if they contain too many atoms. Set
+    '$OutputSizeLimit' to 'Infinity' to always see the full output.
+    The full result is still available through 'Out'.
+
+    >> $OutputSizeLimit = 100;
+    >> Range[1000]
+     : The output has been shortened; set $OutputSizeLimit = Infinity to see all of it.
+     = {1, 2, 3, 4, 5, 6, 7, 8, 9, «983», 993, 994, 995, 996, 997, 998, 999, 1000}
+    >> Length[%]
+     = 1000
+    >> $OutputSizeLimit = Infinity;
+    >> Range[20]
+     = {1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19, 20}
+
+    #> $OutputSizeLimit = x;
+     : Cannot set $OutputSizeLimit to x; value must be a positive integer or Infinity.
+    #> $OutputSizeLimit = 1048576;
+    """
+
+    name = '$OutputSizeLimit'
+
+    rules = {
+        '$OutputSizeLimit': str(OUTPUT_SIZE_LIMIT),
+    }
+
+    messages = {
+        'elided': (
+            'The output has been shortened; '
+            'set $OutputSizeLimit = Infinity to see all of it.'),
+        'limset': (
+            'Cannot set $OutputSizeLimit to `1`; '
+            'value must be a positive integer or Infinity.'),
+    }
+
+
 class FullForm(Builtin):
     """
     <dl>
@@ -16,6 +16,8 @@ import sympy
 from mpmath import mp
 
 from mathics.builtin.base import Builtin
+from mathics.builtin.sparse import (
+    SparseArray, sparse_det, sparse_from_list, sparse_linear_solve)
 from mathics.core.convert import from_sympy
 from mathics.core.expression import Expression, Integer, Symbol, Real
 
@@ -76,6 +78,11 @@ class Det(Builtin):
     def apply(self, m, evaluation):
         'Det[m_]'
 
+        if isinstance(m, SparseArray):
+            det = sparse_det(m)
+            if det is not None:
+                return det
+            m = m.get_list_expression()
         matrix = to_sympy_matrix(m)
         if matrix is None or matrix.cols != matrix.rows or matrix.cols == 0:
             return evaluation.message('Det', 'matsq', m)
@@ -406,6 +413,15 @@ class LinearSolve(Builtin):
     def apply(self, m, b, evaluation):
         'LinearSolve[m_, b_]'
 
+        if isinstance(m, SparseArray):
+            vector = b if isinstance(b, SparseArray) else sparse_from_list(b)
+            if vector is not None:
+                solution = sparse_linear_solve(m, vector, evaluation)
+                if solution is not None:
+                    return solution
+            m = m.get_list_expression()
+        if isinstance(b, SparseArray):
+            b = b.get_list_expression()
         matrix = matrix_data(m)
         if matrix is None:
             return evaluation.message('LinearSolve', 'matrix', m, 1)
@@ -146,6 +146,13 @@ class Length(Builtin):
     def apply(self, expr, evaluation):
         'Length[expr_]'
 
+        from mathics.builtin.associations import Association
+        from mathics.builtin.sparse import SparseArray
+
+        if isinstance(expr, Association):
+            return Integer(expr.get_length())
+        if isinstance(expr, SparseArray):
+            return Integer(expr.dims[0])
         if expr.is_atom():
             return Integer(0)
         else:
@@ -465,34 +472,160 @@ def is_in_level(current, depth, start=1, stop=None):
     return start <= current <= stop
 
 
+class _LevelFrame(object):
+    __slots__ = ('expr', 'level', 'pos', 'parts', 'index', 'new_parts',
+                 'depth')
+
+    def __init__(self, expr, level, pos, parts):
+        self.expr = expr
+        self.level = level
+        self.pos = pos
+        self.parts = parts      # [(position, part)], position 0 is the head
+        self.index = 0
+        self.new_parts = []
+        self.depth = 0
+
+
+def _get_parts(expr, heads):
+    if expr.is_atom():
+        # the parts of an association are its values, at positions Key[key]
+        return [(Expression('Key', rule.leaves[0]), rule.leaves[1])
+                for rule in expr.get_rules()]
+    parts = [(index + 1, leaf) for index, leaf in enumerate(expr.leaves)]
+    if heads:
+        parts.insert(0, (0, expr.head))
+    return parts
+
+
+def _needs_depth(start, stop):
+    'Whether levels start to stop depend on the depth of subexpressions.'
+    return start < 0 or (stop is not None and stop < 0)
+
+
 def walk_levels(expr, start=1, stop=None, current=0, heads=False,
                 callback=lambda l: l, include_pos=False, cur_pos=[]):
-    if expr.is_atom():
-        depth = 0
-        new_expr = expr
+    """
+    Replaces the subexpressions of expr in the levels start to stop by
+    callback(subexpression), or callback(subexpression, position) if
+    include_pos, parts before the expressions containing them. Returns the
+    new expression and its depth. Unless negative levels are asked for,
+    parts below level stop are not visited and do not count for the depth.
+    The values of associations are visited as their parts.
+    """
+
+    from mathics.builtin.associations import Association
+
+    if _needs_depth(start, stop):
+        limit = None
     else:
-        depth = 0
-        if heads:
-            head, head_depth = walk_levels(
-                expr.head, start, stop, current + 1, heads, callback,
-                include_pos, cur_pos + [0])
-        else:
-            head = expr.head
-        leaves = []
-        for index, leaf in enumerate(expr.leaves):
-            leaf, leaf_depth = walk_levels(
-                leaf, start, stop, current + 1, heads, callback, include_pos,
-                cur_pos + [index + 1])
-            if leaf_depth + 1 > depth:
-                depth = leaf_depth + 1
-            leaves.append(leaf)
-        new_expr = Expression(head, *leaves)
-    if is_in_level(current, depth, start, stop):
-        if include_pos:
-            new_expr = callback(new_expr, cur_pos)
-        else:
-            new_expr = callback(new_expr)
-    return new_expr, depth
+        limit = stop
+    root = _LevelFrame(expr, current, cur_pos, None)
+    stack = [root]
+    while True:
+        frame = stack[-1]
+        if frame.parts is None:
+            if (frame.expr.is_atom() and
+                    not isinstance(frame.expr, Association)) or (
+                    limit is not None and frame.level >= limit):
+                frame.parts = []
+            else:
+                frame.parts = _get_parts(frame.expr, heads)
+        if frame.index < len(frame.parts):
+            position, part = frame.parts[frame.index]
+            frame.index += 1
+            stack.append(_LevelFrame(
+                part, frame.level + 1, frame.pos + [position], None))
+            continue
+
+        stack.pop()
+        new_expr = frame.expr
+        if frame.new_parts and isinstance(new_expr, Association):
+            rules = new_expr.get_rules()
+            if any(new is not rule.leaves[1]
+                   for new, rule in zip(frame.new_parts, rules)):
+                new_expr = Expression('Association', *[
+                    Expression(rule.head, rule.leaves[0], new)
+                    for rule, new in zip(rules, frame.new_parts)])
+        elif frame.new_parts:
+            new_parts = frame.new_parts
+            if heads:
+                head = new_parts[0]
+                new_leaves = new_parts[1:]
+            else:
+                head = new_expr.head
+                new_leaves = new_parts
+            if head is not new_expr.head or any(
+                    new is not old for new, old in zip(new_leaves, new_expr.leaves)):
+                new_expr = Expression(head, *new_leaves)
+        if is_in_level(frame.level, frame.depth, start, stop):
+            if include_pos:
+                new_expr = callback(new_expr, frame.pos)
+            else:
+                new_expr = callback(new_expr)
+        if not stack:
+            return new_expr, frame.depth
+        parent = stack[-1]
+        parent.new_parts.append(new_expr)
+        # heads do not count for the depth, association values are at
+        # positions Key[key]
+        position = frame.pos[-1]
+        if (isinstance(position, Expression) or position != 0) and (
+                frame.depth + 1 > parent.depth):
+            parent.depth = frame.depth + 1
+
+
+def iter_levels(expr, start=1, stop=None, heads=False, include_pos=False,
+                prune=None):
+    """
+    Yields the subexpressions of expr in the levels start to stop, or
+    (subexpression, position) pairs if include_pos, in the order in which
+    walk_levels visits them. Unless negative levels are asked for, parts
+    below level stop are not visited, nor are expr and its parts at level
+    1 for which prune(subexpression) is true, with all their parts.
+    """
+
+    if _needs_depth(start, stop):
+        limit = None
+        prune = None    # the depth of every part counts
+    else:
+        limit = stop
+    if prune is not None and prune(expr):
+        return
+    stack = [_LevelFrame(expr, 0, [], None)]
+    while stack:
+        frame = stack[-1]
+        if frame.parts is None:
+            if frame.expr.is_atom() or (
+                    limit is not None and frame.level >= limit):
+                frame.parts = []
+            else:
+                frame.parts = _get_parts(frame.expr, heads)
+        if frame.index < len(frame.parts):
+            position, part = frame.parts[frame.index]
+            frame.index += 1
+            if frame.level == 0 and prune is not None and prune(part):
+                continue
+            stack.append(_LevelFrame(
+                part, frame.level + 1, frame.pos + [position], None))
+            continue
+
+        stack.pop()
+        if is_in_level(frame.level, frame.depth, start, stop):
+            if include_pos:
+                yield frame.expr, frame.pos
+            else:
+                yield frame.expr
+        if stack and frame.pos[-1] != 0:
+            parent = stack[-1]
+            if frame.depth + 1 > parent.depth:
+                parent.depth = frame.depth + 1
+
+
+def _no_match_in(matcher, evaluation):
+    'Returns a prune function for iter_levels skipping parts matcher cannot match.'
+    def prune(expr):
+        return not matcher.may_contain_match(expr, evaluation)
+    return prune
 
 
 def python_levelspec(levelspec):
@@ -585,15 +718,8 @@ class Level(Builtin):
         except InvalidLevelspecError:
             evaluation.message('Level', 'level', ls)
             return
-        result = []
-
-        def callback(level):
-            result.append(level)
-            return level
-
         heads = self.get_option(options, 'Heads', evaluation).is_true()
-        walk_levels(expr, start, stop, heads=heads, callback=callback)
-        return Expression('List', *result)
+        return Expression('List', *iter_levels(expr, start, stop, heads=heads))
 
 
 class LevelQ(Test):
@@ -834,8 +960,24 @@ class Part(Builtin):
     def apply(self, list, i, evaluation):
         'Part[list_, i___]'
 
+        from mathics.builtin.associations import (
+            Association, association_part)
+        from mathics.builtin.sparse import SparseArray, sparse_part
+
         indices = i.get_sequence()
 
+        if isinstance(list, Association) and indices:
+            result = association_part(
+                list, indices[0].evaluate(evaluation), evaluation)
+            if result is not None and len(indices) > 1:
+                return Expression('Part', result, *indices[1:])
+            return result
+
+        if isinstance(list, SparseArray):
+            if all(isinstance(index, Integer) for index in indices):
+                return sparse_part(list, indices, evaluation)
+            list = list.get_list_expression()
+
         result = walk_parts([list], indices, evaluation)
         if result:
             return result
@@ -1524,26 +1666,24 @@ class Cases(Builtin):
 
         if pattern.has_form('Rule', 2) or pattern.has_form('RuleDelayed', 2):
             from mathics.core.rules import Rule
-            match = Matcher(pattern.leaves[0]).match
+            matcher = Matcher(pattern.leaves[0])
             rule = Rule(pattern.leaves[0], pattern.leaves[1])
-            def callback(level):
-                if match(level, evaluation):
-                    result = rule.apply(level, evaluation)
-                    result = result.evaluate(evaluation)
-                    results.append(result)
-                return level
+
+            def add(level):
+                result = rule.apply(level, evaluation)
+                results.append(result.evaluate(evaluation))
         else:
-            match = Matcher(pattern).match
-            def callback(level):
-                if match(level, evaluation):
-                    results.append(level)
-                return level
+            matcher = Matcher(pattern)
+            add = results.append
 
         # TODO
         # heads = self.get_option(options, 'Heads', evaluation).is_true()
         heads = False
 
-        walk_levels(items, start, stop, heads=heads, callback=callback)
+        for level in iter_levels(items, start, stop, heads=heads,
+                                 prune=_no_match_in(matcher, evaluation)):
+            if matcher.match(level, evaluation):
+                add(level)
 
         return Expression('List', *results)
 
@@ -1573,8 +1713,12 @@ class DeleteCases(Builtin):
             return
 
         from mathics.builtin.patterns import Matcher
-        match = Matcher(pattern).match
-        return Expression('List', *[leaf for leaf in items.leaves if not match(leaf, evaluation)])
+        matcher = Matcher(pattern)
+        may_match = matcher.may_contain_match
+        match = matcher.match
+        return Expression('List', *[
+            leaf for leaf in items.leaves
+            if not (may_match(leaf, evaluation) and match(leaf, evaluation))])
 
 
 class Count(Builtin):
@@ -1591,13 +1735,43 @@ class Count(Builtin):
 
     >> Count[{{a, a}, {a, a, a}, a}, a, {2}]
      = 5
+
+    #> Count[f[a, g[a, b], h[c]], _[a, ___], Infinity]
+     = 1
+    #> Count[1, 1]
+     = 0
+    #> Count[x, x, {0}]
+     = 1
+    #> Count[x, x, {0, 1}]
+     = 1
+    #> Count[{1}, 1, x]
+     : Level specification x is not of the form n, {n}, or {m, n}.
+     = Count[{1}, 1, x]
     """
 
     rules = {
         'Count[pattern_][list_]': 'Count[list, pattern]',
-        'Count[list_, arguments__]': 'Length[Cases[list, arguments]]',
     }
 
+    def apply(self, items, pattern, ls, evaluation):
+        'Count[items_, pattern_, ls_:{1}]'
+        try:
+            start, stop = python_levelspec(ls)
+        except InvalidLevelspecError:
+            return evaluation.message('Count', 'level', ls)
+        if items.is_atom() and start > 0:
+            # an atom only has level 0
+            return Integer(0)
+
+        from mathics.builtin.patterns import Matcher
+        matcher = Matcher(pattern)
+        count = 0
+        for level in iter_levels(items, start, stop,
+                                 prune=_no_match_in(matcher, evaluation)):
+            if matcher.match(level, evaluation):
+                count += 1
+        return Integer(count)
+
 
 class Position(Builtin):
     '''
@@ -1622,6 +1796,12 @@ class Position(Builtin):
     Use Position as an operator
     >> Position[_Integer][{1.5, 2, 2.5}]
      = {{2}}
+
+    Give only the first $n$ positions:
+    >> Position[{1, 2, 2, 1, 2, 3, 2}, 2, {1}, 2]
+     = {{2}, {3}}
+    #> Position[{1, 2}, 2, {1}, 0]
+     = {}
     '''
 
     options = {
@@ -1641,6 +1821,16 @@ class Position(Builtin):
         '''Position[expr_, patt_, Optional[Pattern[ls, _?LevelQ], {0, DirectedInfinity[1]}],
                     OptionsPattern[Position]]'''
 
+        return self.get_positions(expr, patt, ls, None, evaluation, options)
+
+    def apply_n(self, expr, patt, ls, n, evaluation, options={}):
+        '''Position[expr_, patt_, ls_?LevelQ, n_Integer?NonNegative,
+                    OptionsPattern[Position]]'''
+
+        return self.get_positions(
+            expr, patt, ls, n.get_int_value(), evaluation, options)
+
+    def get_positions(self, expr, patt, ls, max_count, evaluation, options):
         try:
             start, stop = python_levelspec(ls)
         except InvalidLevelspecError:
@@ -1648,16 +1838,19 @@ class Position(Builtin):
 
         from mathics.builtin.patterns import Matcher
 
-        match = Matcher(patt).match
+        matcher = Matcher(patt)
         result = []
-
-        def callback(level, pos):
-            if match(level, evaluation):
-                result.append(pos)
-            return level
+        if max_count == 0:
+            return from_python(result)
 
         heads = self.get_option(options, 'Heads', evaluation).is_true()
-        walk_levels(expr, start, stop, heads=heads, callback=callback, include_pos=True)
+        for level, pos in iter_levels(
+                expr, start, stop, heads=heads, include_pos=True,
+                prune=_no_match_in(matcher, evaluation)):
+            if matcher.match(level, evaluation):
+                result.append(pos)
+                if len(result) == max_count:
+                    break
         return from_python(result)
 
 
@@ -1677,13 +1870,37 @@ class MemberQ(Builtin):
      = False
     >> MemberQ[_List][{{}}]
      = True
+
+    Test at other levels with a level specification:
+    >> MemberQ[{a, {b, c}}, c, 2]
+     = True
+    #> MemberQ[x, x]
+     = False
+    #> MemberQ[x, x, {0}]
+     = True
     """
     rules = {
-        'MemberQ[list_, pattern_]': (
-            'Length[Select[list, MatchQ[#, pattern]&]] > 0'),
         'MemberQ[pattern_][expr_]': 'MemberQ[expr, pattern]',
     }
 
+    def apply(self, items, pattern, ls, evaluation):
+        'MemberQ[items_, pattern_, ls_:{1}]'
+        try:
+            start, stop = python_levelspec(ls)
+        except InvalidLevelspecError:
+            return evaluation.message('MemberQ', 'level', ls)
+        if items.is_atom() and start > 0:
+            # an atom only has level 0
+            return Symbol('False')
+
+        from mathics.builtin.patterns import Matcher
+        matcher = Matcher(pattern)
+        for level in iter_levels(items, start, stop,
+                                 prune=_no_match_in(matcher, evaluation)):
+            if matcher.match(level, evaluation):
+                return Symbol('True')
+        return Symbol('False')
+
 
 class Range(Builtin):
     """
@@ -3044,12 +3261,27 @@ class Total(Builtin):
     Total over rows instead of columns
     >> Total[{{1, 2, 3}, {4, 5, 6}, {7, 8 ,9}}, {2}]
      = {6, 15, 24}
+
+    #> Total[SparseArray[{{1, 1} -> 1, {2, 1} -> 2, {3, 3} -> x}], 2]
+     = 3 + x
     """
     rules = {
         'Total[head_]': 'Apply[Plus, head]',
         'Total[head_, n_]': 'Apply[Plus, Flatten[head, n]]'
     }
 
+    def apply_sparse(self, array, evaluation):
+        'Total[array_SparseArray?AtomQ]'
+
+        from mathics.builtin.sparse import sparse_total
+
+        return sparse_total(array, evaluation)
+
+    def apply_sparse_level(self, array, n, evaluation):
+        'Total[array_SparseArray?AtomQ, n_]'
+
+        return Expression('Total', array.get_list_expression(), n)
+
 
 class Reverse(Builtin):
     """
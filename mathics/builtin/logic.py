@@ -5,7 +5,7 @@ from __future__ import unicode_literals
 from __future__ import absolute_import
 
 from mathics.builtin.base import BinaryOperator, Predefined, PrefixOperator, Builtin
-from mathics.builtin.lists import InvalidLevelspecError, python_levelspec, walk_levels
+from mathics.builtin.lists import InvalidLevelspecError, python_levelspec, iter_levels
 from mathics.core.expression import Expression, Symbol
 
 
@@ -315,13 +315,10 @@ class _ManyTrue(Builtin):
             evaluation.message('Level', 'level', level)
             return
 
-        def callback(node):
-            self._short_circuit(Expression(
-                test, node).evaluate(evaluation).is_true())
-            return node
-
         try:
-            walk_levels(expr, start, stop, callback=callback)
+            for node in iter_levels(expr, start, stop):
+                self._short_circuit(Expression(
+                    test, node).evaluate(evaluation).is_true())
         except _ShortCircuit as e:
             return e.result
 
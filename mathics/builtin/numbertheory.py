@@ -251,6 +251,8 @@ class FactorInteger(Builtin):
      = {{2, 1}, {3, 1}, {5, 1}, {67, 1}, {2011, -1}}
     """
 
+    memoize = True
+
     # TODO: GausianIntegers option
     # e.g. FactorInteger[5, GaussianIntegers -> True]
 
@@ -422,6 +424,8 @@ class PrimeQ(Builtin):
      = {False, True, True, False, True, False, True, False, False, False, True, False, True, False, False, False, True, False, True, False}
     """
 
+    memoize = True
+
     attributes = ('Listable',)
 
     def apply(self, n, evaluation):
@@ -0,0 +1,663 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Parallel computation
+
+Parallel functions evaluate their parts on subkernels, which are worker
+processes that load the builtin definitions themselves. Every session has
+subkernels of its own. The user definitions an expression depends on are
+sent to the subkernels automatically before it is evaluated there.
+"""
+
+from __future__ import unicode_literals
+from __future__ import absolute_import
+
+import multiprocessing
+import threading
+import time
+import traceback
+import weakref
+
+import six
+import six.moves.cPickle as pickle
+
+from mathics.builtin.base import Builtin, Predefined
+from mathics.core.expression import Expression, Symbol, String, Integer
+from mathics.core.evaluation import (
+    Evaluation, AbortInterrupt, ReturnInterrupt)
+from mathics.core import serialize
+
+
+def _dumps(expr):
+    # the compact serialization where possible, pickle for atoms without one
+    try:
+        return True, serialize.dumps(expr)
+    except ValueError:
+        return False, pickle.dumps(expr, protocol=2)
+
+
+def _loads(data):
+    compact, data = data
+    if compact:
+        return serialize.loads(data)
+    return pickle.loads(data)
+
+
+# whether this process is a subkernel, which evaluates parallel functions
+# sequentially
+_in_subkernel = False
+
+# seconds to wait for a subkernel still busy with a request of an earlier,
+# stopped evaluation before it is closed
+_BUSY_TIMEOUT = 10
+
+
+def _acquire(lock, timeout):
+    'Acquires lock within timeout seconds, returns whether it did.'
+    if not six.PY2:
+        return lock.acquire(timeout=timeout)
+    deadline = time.time() + timeout
+    while not lock.acquire(False):
+        if time.time() >= deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class _SubkernelError(Exception):
+    def __init__(self, subkernel, tag, *args):
+        super(_SubkernelError, self).__init__(tag)
+        self.subkernel = subkernel
+        self.tag = tag                  # the message to issue
+        self.message_args = args        # its arguments after the id
+
+
+def _subkernel_main(conn):
+    from mathics.core.definitions import Definitions
+
+    global _in_subkernel
+    _in_subkernel = True
+
+    definitions = Definitions(add_builtin=True)
+    evaluation = Evaluation(definitions, catch_interrupt=False)
+    while True:
+        try:
+            command, data = conn.recv()
+        except EOFError:
+            break
+        try:
+            if command == 'define':
+                for name, definition in pickle.loads(data).items():
+                    definitions.add_user_definition(name, definition)
+                reply = None
+            elif command == 'remove':
+                for name in data:
+                    if name in definitions.user:
+                        definitions.reset_user_definition(name)
+                reply = None
+            elif command == 'evaluate':
+                results = []
+                for item in data:
+                    evaluation.recursion_depth = 0
+                    try:
+                        result = _loads(item).evaluate(evaluation)
+                    except AbortInterrupt:
+                        result = Symbol('$Aborted')
+                    except ReturnInterrupt as ret:
+                        result = ret.expr
+                    results.append(_dumps(result))
+                reply = (results, pickle.dumps(evaluation.out, protocol=2))
+                evaluation.out = []
+            conn.send(('ok', reply))
+        except Exception:
+            conn.send(('error', traceback.format_exc()))
+
+
+class _Subkernel(object):
+    def __init__(self, id):
+        self.id = id
+        self.lock = threading.Lock()
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_subkernel_main, args=(child_conn,))
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+        # the change times of the user definitions when they were sent
+        self.sent = {}
+
+    def request(self, command, data):
+        if not _acquire(self.lock, _BUSY_TIMEOUT):
+            raise _SubkernelError(self, 'busy')
+        try:
+            self.conn.send((command, data))
+            status, reply = self.conn.recv()
+        except (EOFError, IOError, OSError):
+            raise _SubkernelError(self, 'died')
+        finally:
+            self.lock.release()
+        if status == 'error':
+            # the last line of the traceback names the exception
+            raise _SubkernelError(
+                self, 'error', String(reply.strip().splitlines()[-1]))
+        return reply
+
+    def define(self, user_definitions, definitions):
+        """
+        Sends the definitions not yet on the subkernel in their current
+        state, and removes those sent before that were removed since.
+        """
+        removed = [name for name in self.sent if name not in definitions.user]
+        if removed:
+            self.request('remove', removed)
+            for name in removed:
+                del self.sent[name]
+        missing = {}
+        for name, definition in user_definitions.items():
+            changed = getattr(definition, 'changed', None)
+            if name not in self.sent or self.sent[name] != changed:
+                missing[name] = definition
+        if missing:
+            self.request('define', pickle.dumps(missing, protocol=2))
+            for name, definition in missing.items():
+                self.sent[name] = getattr(definition, 'changed', None)
+
+    def close(self):
+        self.conn.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def get_object(self):
+        return Expression('KernelObject', Integer(self.id), String('local'))
+
+
+_next_subkernel_id = [1]
+
+
+class _Session(object):
+    """
+    The subkernels of a session, which only get its user definitions. They
+    are closed when the user definitions of the session are freed.
+    """
+
+    def __init__(self, user):
+        self.subkernels = []
+        subkernels = self.subkernels
+        key = id(user)
+
+        def ended(ref):
+            if key in _sessions and _sessions[key].subkernels is subkernels:
+                del _sessions[key]
+            for subkernel in subkernels:
+                subkernel.close()
+
+        self.user = weakref.ref(user, ended)
+
+    def launch(self, count):
+        launched = []
+        for i in range(count):
+            subkernel = _Subkernel(_next_subkernel_id[0])
+            _next_subkernel_id[0] += 1
+            self.subkernels.append(subkernel)
+            launched.append(subkernel)
+        return launched
+
+    def get_subkernels(self):
+        if not self.subkernels:
+            self.launch(multiprocessing.cpu_count())
+        return list(self.subkernels)
+
+    def close(self, subkernel):
+        if subkernel in self.subkernels:
+            self.subkernels.remove(subkernel)
+        subkernel.close()
+
+
+# sessions by the id of their user definitions
+_sessions = {}
+
+
+def _get_session(definitions):
+    user = definitions.user
+    session = _sessions.get(id(user))
+    if session is None or session.user() is not user:
+        session = _sessions[id(user)] = _Session(user)
+    return session
+
+
+def _collect_names(expr, names):
+    stack = [expr]
+    while stack:
+        expr = stack.pop()
+        if isinstance(expr, Symbol):
+            names.add(expr.get_name())
+        elif isinstance(expr, Expression):
+            stack.append(expr.head)
+            stack.extend(expr.leaves)
+
+
+def _reachable_definitions(exprs, definitions):
+    '''
+    Returns the user definitions of the symbols in exprs and, recursively,
+    of the symbols in their rules, by name.
+    '''
+    pending = set()
+    for expr in exprs:
+        _collect_names(expr, pending)
+    seen = set()
+    result = {}
+    while pending:
+        name = pending.pop()
+        seen.add(name)
+        definition = definitions.user.get(name)
+        if definition is None:
+            continue
+        result[name] = definition
+        found = set()
+        rules_lists = [definition.ownvalues, definition.downvalues,
+                       definition.subvalues, definition.upvalues,
+                       definition.nvalues, definition.defaultvalues,
+                       definition.messages]
+        rules_lists.extend(definition.formatvalues.values())
+        for rules in rules_lists:
+            for rule in rules:
+                _collect_names(rule.pattern.expr, found)
+                replace = getattr(rule, 'replace', None)
+                if replace is not None:
+                    _collect_names(replace, found)
+        pending.update(found - seen)
+    return result
+
+
+def _forward_out(out, evaluation):
+    for item in out:
+        evaluation.out.append(item)
+        evaluation.output.out(item)
+
+
+def parallel_evaluate(exprs, evaluation):
+    '''
+    Evaluates the expressions exprs on the subkernels, launching them if
+    none are running, and returns the results in order. Each subkernel
+    takes chunks of half its share of the remaining expressions, so that
+    chunks get smaller towards the end and uneven costs even out. Raises
+    _SubkernelError if a subkernel fails.
+    '''
+    if _in_subkernel or not exprs:
+        return [expr.evaluate(evaluation) for expr in exprs]
+
+    subkernels = _get_session(evaluation.definitions).get_subkernels()
+    user_definitions = _reachable_definitions(exprs, evaluation.definitions)
+    data = [_dumps(expr) for expr in exprs]
+    results = [None] * len(data)
+    outs = []
+    lock = threading.Lock()
+    state = {'next': 0, 'stop': False, 'error': None}
+
+    def run(subkernel):
+        try:
+            subkernel.define(user_definitions, evaluation.definitions)
+            while True:
+                with lock:
+                    start = state['next']
+                    if start >= len(data) or state['stop']:
+                        return
+                    size = max(1, (len(data) - start) // (2 * len(subkernels)))
+                    state['next'] = start + size
+                chunk, out = subkernel.request(
+                    'evaluate', data[start:start + size])
+                results[start:start + size] = [_loads(item) for item in chunk]
+                with lock:
+                    outs.append((start, pickle.loads(out)))
+        except Exception as exc:
+            with lock:
+                state['stop'] = True
+                state['error'] = exc
+
+    threads = [threading.Thread(target=run, args=(subkernel,))
+               for subkernel in subkernels]
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.1)
+                evaluation.check_stopped()
+    finally:
+        # after a timeout, the subkernels finish their current chunk
+        state['stop'] = True
+
+    outs.sort(key=lambda item: item[0])
+    for start, out in outs:
+        _forward_out(out, evaluation)
+    if state['error'] is not None:
+        raise state['error']
+    return results
+
+
+class _Parallel(Builtin):
+    messages = {
+        'died': 'Subkernel `1` died.',
+        'busy': ('Subkernel `1` did not finish a stopped evaluation and was '
+                 'closed.'),
+        'error': 'Error in subkernel `1`: `2`',
+    }
+
+    def evaluate_parallel(self, exprs, evaluation):
+        '''
+        Evaluates exprs with parallel_evaluate(). Returns None after a
+        message if a subkernel failed.
+        '''
+        try:
+            return parallel_evaluate(exprs, evaluation)
+        except _SubkernelError as exc:
+            self.subkernel_failed(exc, evaluation)
+
+    def subkernel_failed(self, exc, evaluation):
+        if exc.tag in ('died', 'busy'):
+            # parallel functions launch new ones when none are left
+            _get_session(evaluation.definitions).close(exc.subkernel)
+        evaluation.message(self.get_name(), exc.tag,
+                           Integer(exc.subkernel.id), *exc.message_args)
+
+
+def _table_tasks(expr, iters, evaluation):
+    '''
+    Returns Block[{i = ..., ...}, expr] for each iteration of
+    Table[expr, iters...], together with the table of their indices in this
+    list, or None if the iterators are invalid.
+    '''
+    vars = []
+    for iter in iters:
+        if not iter.has_form('List', 1, 2, 3, 4):
+            return None
+        if len(iter.leaves) > 1:
+            if iter.leaves[0].get_name() == '':
+                return None
+            vars.append(iter.leaves[0])
+    values = Expression('Table', Expression('List', *vars),
+                        *iters).evaluate(evaluation)
+    if not values.has_form('List', None):
+        return None
+
+    tasks = []
+
+    def walk(level, depth):
+        if depth == 0:
+            tasks.append(Expression('Block', Expression('List', *(
+                Expression('Set', var, value)
+                for var, value in zip(vars, level.leaves))), expr))
+            return Integer(len(tasks) - 1)
+        return Expression('List', *(walk(leaf, depth - 1)
+                                    for leaf in level.leaves))
+
+    return tasks, walk(values, len(iters))
+
+
+def _fill(indices, results, depth):
+    if depth == 0:
+        return results[indices.get_int_value()]
+    return Expression('List', *(_fill(leaf, results, depth - 1)
+                                for leaf in indices.leaves))
+
+
+class LaunchKernels(Builtin):
+    """
+    <dl>
+    <dt>'LaunchKernels[]'
+        <dd>launches a subkernel for each processor core.
+    <dt>'LaunchKernels[$n$]'
+        <dd>launches $n$ subkernels.
+    </dl>
+
+    Parallel functions launch the subkernels themselves if none are
+    running.
+    >> LaunchKernels[2];
+    >> $KernelCount
+     = 2
+    >> CloseKernels[];
+    """
+
+    messages = {
+        'nkern': 'The number of kernels `1` is not a positive integer.',
+    }
+
+    def apply(self, evaluation):
+        'LaunchKernels[]'
+        launched = _get_session(evaluation.definitions).launch(
+            multiprocessing.cpu_count())
+        return Expression('List', *(k.get_object() for k in launched))
+
+    def apply_n(self, n, evaluation):
+        'LaunchKernels[n_]'
+        count = n.get_int_value()
+        if count is None or count <= 0:
+            return evaluation.message('LaunchKernels', 'nkern', n)
+        launched = _get_session(evaluation.definitions).launch(count)
+        return Expression('List', *(k.get_object() for k in launched))
+
+
+class CloseKernels(Builtin):
+    """
+    <dl>
+    <dt>'CloseKernels[]'
+        <dd>terminates all subkernels.
+    </dl>
+
+    >> CloseKernels[];
+    >> $KernelCount
+     = 0
+    """
+
+    def apply(self, evaluation):
+        'CloseKernels[]'
+        subkernels = _get_session(evaluation.definitions).subkernels
+        closed = list(subkernels)
+        del subkernels[:]
+        for subkernel in closed:
+            subkernel.close()
+        return Expression('List', *(k.get_object() for k in closed))
+
+
+class KernelCount(Predefined):
+    """
+    <dl>
+    <dt>'$KernelCount'
+        <dd>gives the number of running subkernels of the session.
+    </dl>
+    """
+
+    name = '$KernelCount'
+
+    def evaluate(self, evaluation):
+        return Integer(len(_get_session(evaluation.definitions).subkernels))
+
+
+class DistributeDefinitions(_Parallel):
+    """
+    <dl>
+    <dt>'DistributeDefinitions[$s1$, $s2$, ...]'
+        <dd>sends the definitions of the symbols $si$, and of the symbols
+        they depend on, to all subkernels.
+    </dl>
+
+    Parallel functions send the definitions their arguments depend on
+    automatically, so this is only needed for definitions used
+    indirectly, e.g. through 'ToExpression'.
+    >> f[x_] := x ^ 2
+    >> DistributeDefinitions[f]
+     = {f}
+
+    ## definitions removed since are removed from the subkernels too
+    #> If[$KernelCount == 0, LaunchKernels[2]];
+    #> k = 3; ParallelMap[k + # &, {1, 2}]
+     = {4, 5}
+    #> Quit[]; ParallelMap[k + # &, {1, 2}]
+     = {1 + k, 2 + k}
+    #> CloseKernels[];
+    """
+
+    attributes = ('HoldAll',)
+
+    def apply(self, symbols, evaluation):
+        'DistributeDefinitions[symbols___]'
+        symbols = symbols.get_sequence()
+        if not _in_subkernel:
+            user_definitions = _reachable_definitions(
+                symbols, evaluation.definitions)
+            try:
+                session = _get_session(evaluation.definitions)
+                for subkernel in list(session.subkernels):
+                    subkernel.define(user_definitions, evaluation.definitions)
+            except _SubkernelError as exc:
+                self.subkernel_failed(exc, evaluation)
+                return Symbol('$Failed')
+        return Expression('List', *symbols)
+
+
+class ParallelMap(_Parallel):
+    """
+    <dl>
+    <dt>'ParallelMap[$f$, $expr$]'
+        <dd>applies $f$ to each element of $expr$, in parallel.
+    </dl>
+
+    #> If[$KernelCount == 0, LaunchKernels[2]];
+    >> ParallelMap[#^2 &, {1, 2, 3, 4}]
+     = {1, 4, 9, 16}
+    >> g[x_] := x + 1
+    >> ParallelMap[g, h[1, 2]]
+     = h[2, 3]
+    """
+
+    def apply(self, f, expr, evaluation):
+        'ParallelMap[f_, expr_]'
+        if expr.is_atom():
+            return expr
+        results = self.evaluate_parallel(
+            [Expression(f, leaf) for leaf in expr.leaves], evaluation)
+        if results is None:
+            return Symbol('$Failed')
+        return Expression(expr.head, *results)
+
+
+class _ParallelIteration(_Parallel):
+    attributes = ('HoldAll',)
+
+    def get_result(self, indices, results, depth):
+        pass
+
+    def apply(self, expr, iters, evaluation):
+        '%(name)s[expr_, iters__]'
+        iters = iters.get_sequence()
+        table = _table_tasks(expr, iters, evaluation)
+        if table is None:
+            return
+        tasks, indices = table
+        results = self.evaluate_parallel(tasks, evaluation)
+        if results is None:
+            return Symbol('$Failed')
+        return self.get_result(indices, results, len(iters))
+
+
+class ParallelTable(_ParallelIteration):
+    """
+    <dl>
+    <dt>'ParallelTable[$expr$, {$i$, $imin$, $imax$}, ...]'
+        <dd>builds a table like 'Table', evaluating $expr$ in parallel.
+    </dl>
+
+    #> If[$KernelCount == 0, LaunchKernels[2]];
+    >> ParallelTable[i ^ 2, {i, 5}]
+     = {1, 4, 9, 16, 25}
+    >> ParallelTable[{i, j}, {i, 2}, {j, {a, b}}]
+     = {{{1, a}, {1, b}}, {{2, a}, {2, b}}}
+    >> ParallelTable[x, {3}]
+     = {x, x, x}
+    """
+
+    def get_result(self, indices, results, depth):
+        return _fill(indices, results, depth)
+
+
+class ParallelSum(_ParallelIteration):
+    """
+    <dl>
+    <dt>'ParallelSum[$expr$, {$i$, $imin$, $imax$}, ...]'
+        <dd>sums $expr$ like 'Sum', evaluating the terms in parallel.
+    </dl>
+
+    #> If[$KernelCount == 0, LaunchKernels[2]];
+    >> ParallelSum[i ^ 2, {i, 10}]
+     = 385
+    """
+
+    def get_result(self, indices, results, depth):
+        return Expression('Plus', *results)
+
+
+class ParallelDo(_ParallelIteration):
+    """
+    <dl>
+    <dt>'ParallelDo[$expr$, {$i$, $imin$, $imax$}, ...]'
+        <dd>evaluates $expr$ like 'Do', in parallel.
+    </dl>
+
+    #> If[$KernelCount == 0, LaunchKernels[2]];
+    >> ParallelDo[Print[i], {i, 2}]
+     | 1
+     | 2
+    """
+
+    def get_result(self, indices, results, depth):
+        return Symbol('Null')
+
+
+class ParallelCombine(_Parallel):
+    """
+    <dl>
+    <dt>'ParallelCombine[$f$, $h$[$e1$, $e2$, ...], $comb$]'
+        <dd>splits the elements $ei$ into one part per subkernel, evaluates
+        $f$ applied to each part with head $h$ in parallel, and combines
+        the results with $comb$.
+    <dt>'ParallelCombine[$f$, $h$[$e1$, $e2$, ...]]'
+        <dd>combines the results with $h$ if it has the attribute 'Flat'
+        and with 'Join' otherwise.
+    </dl>
+
+    #> If[$KernelCount == 0, LaunchKernels[2]];
+    >> ParallelCombine[Map[#^2 &, #] &, {1, 2, 3, 4, 5}]
+     = {1, 4, 9, 16, 25}
+    >> ParallelCombine[Total, {1, 2, 3, 4}, Plus]
+     = 10
+    """
+
+    def apply(self, f, expr, evaluation):
+        'ParallelCombine[f_, expr_]'
+        if expr.is_atom():
+            return Expression(f, expr)
+        head = expr.get_head_name()
+        if 'System`Flat' in evaluation.definitions.get_attributes(head):
+            comb = expr.head
+        else:
+            comb = Symbol('Join')
+        return self.apply_comb(f, expr, comb, evaluation)
+
+    def apply_comb(self, f, expr, comb, evaluation):
+        'ParallelCombine[f_, expr_, comb_]'
+        if expr.is_atom():
+            return Expression(f, expr)
+        leaves = expr.leaves
+        subkernels = _get_session(evaluation.definitions).subkernels
+        count = max(1, min(len(leaves), len(subkernels) or
+                           multiprocessing.cpu_count()))
+        parts = [leaves[len(leaves) * i // count:len(leaves) * (i + 1) // count]
+                 for i in range(count)]
+        results = self.evaluate_parallel(
+            [Expression(f, Expression(expr.head, *part)) for part in parts],
+            evaluation)
+        if results is None:
+            return Symbol('$Failed')
+        return Expression(comb, *results)
@@ -31,6 +31,13 @@ Options using 'OptionsPattern' and 'OptionValue':
  = {y, 3, 5}
 
 The attributes 'Flat', 'Orderless', and 'OneIdentity' affect pattern matching.
+
+#> SetAttributes[g, Orderless]
+#> g[b, a, a] /. g[x_, x_, y_] -> {x, y}
+ = {a, b}
+#> g[a, a, b] /. g[x_, x_, x_] -> x
+ = g[a, a, b]
+#> ClearAll[g]
 """
 
 from __future__ import unicode_literals
@@ -39,13 +46,13 @@ from __future__ import absolute_import
 from six.moves import range
 
 from mathics.builtin.base import Builtin, BinaryOperator, PostfixOperator
-from mathics.builtin.base import PatternObject
+from mathics.builtin.base import PatternObject, BoxConstruct
 from mathics.builtin.lists import python_levelspec, InvalidLevelspecError
 
 from mathics.core.expression import (
-    Symbol, Expression, Number, Integer, Rational, Real)
-from mathics.core.rules import Rule
-from mathics.core.pattern import Pattern, StopGenerator
+    Atom, Symbol, Expression, Number, Integer, Rational, Real, Complex)
+from mathics.core.rules import Rule, RuleIndex
+from mathics.core.pattern import Pattern, StopGenerator, get_leaves_with_head
 
 
 class Rule_(BinaryOperator):
@@ -97,7 +104,16 @@ class RuleDelayed(BinaryOperator):
     needs_verbatim = True
 
 
+# rule lists at least this long are indexed by their left-hand sides
+INDEX_RULES_THRESHOLD = 16
+
+
 def create_rules(rules_expr, expr, name, evaluation, extra_args=[]):
+    if rules_expr.has_form('Dispatch', 2):
+        table = rules_expr.leaves[1]
+        if isinstance(table, DispatchTable):
+            return table.get_index(evaluation), False
+        rules_expr = rules_expr.leaves[0]
     if rules_expr.has_form('List', None):
         rules = rules_expr.leaves
     else:
@@ -126,9 +142,133 @@ def create_rules(rules_expr, expr, name, evaluation, extra_args=[]):
                 return None, True
             else:
                 result.append(Rule(rule.leaves[0], rule.leaves[1]))
+        if len(result) >= INDEX_RULES_THRESHOLD:
+            result = RuleIndex(result, evaluation)
         return result, False
 
 
+class DispatchTable(Atom):
+    """
+    The rules of a 'Dispatch' expression, indexed by their left-hand sides
+    when they are first used.
+    """
+
+    def __init__(self, rules, **kwargs):
+        super(DispatchTable, self).__init__(**kwargs)
+        self.rules = rules
+        self.index = None
+
+    def __str__(self):
+        return '-DispatchTables-'
+
+    def __getstate__(self):
+        # the index is rebuilt after unpickling
+        state = self.__dict__.copy()
+        state['index'] = None
+        return state
+
+    def get_index(self, evaluation):
+        # attributes like Orderless change where rules go in the index
+        if self.index is None or not self.index.is_current(evaluation):
+            self.index = RuleIndex(self.rules, evaluation)
+        return self.index
+
+    def do_copy(self):
+        return DispatchTable(self.rules)
+
+    def default_format(self, evaluation, form):
+        return str(self)
+
+    def get_sort_key(self, pattern_sort=False):
+        if pattern_sort:
+            return super(DispatchTable, self).get_sort_key(True)
+        else:
+            return hash(self)
+
+    def same(self, other):
+        return self is other
+
+    def to_python(self, *args, **kwargs):
+        return None
+
+    def __hash__(self):
+        return hash(("DispatchTable", id(self)))
+
+    def atom_to_boxes(self, f, evaluation):
+        return Expression('DispatchTableBox')
+
+
+class DispatchTableBox(BoxConstruct):
+    def boxes_to_text(self, leaves, **options):
+        return '-DispatchTables-'
+
+    def boxes_to_xml(self, leaves, **options):
+        return '-DispatchTables-'
+
+    def boxes_to_tex(self, leaves, **options):
+        return '-DispatchTables-'
+
+
+class Dispatch(Builtin):
+    """
+    <dl>
+    <dt>'Dispatch[{$rule1$, $rule2$, ...}]'
+        <dd>generates an optimized dispatch table representation of a
+        list of rules.
+    </dl>
+
+    A dispatch table tries only the rules whose left-hand sides can
+    match a given expression, looking up literal left-hand sides by hash:
+    >> rules = Dispatch[{a -> 1, b -> 2, f[x_] :> x + 1}]
+     = Dispatch[{a -> 1, b -> 2, f[x_] :> x + 1}, -DispatchTables-]
+    >> {a, b, c, f[10]} /. rules
+     = {1, 2, c, 11}
+    >> Replace[f[a], rules, {1}]
+     = f[1]
+
+    Rules are still tried in order:
+    >> f[2] /. Dispatch[{f[x_] :> x, f[2] -> two}]
+     = 2
+
+    #> Dispatch[{a -> 1, b}]
+     : b is not a valid replacement rule.
+     = Dispatch[{a -> 1, b}]
+    #> Dispatch[x]
+     : x is not a valid replacement rule.
+     = Dispatch[x]
+    #> {a /. Dispatch[{x_ ^ n_. :> {x, n}}], a /. Dispatch[{n_. * x_ :> {n, x}}]}
+     = {{a, 1}, {1, a}}
+    #> {a /. Append[Table[k -> k, {k, 20}], x_ ^ n_. :> {x, n}], a /. Append[Table[k -> k, {k, 20}], n_. * x_ :> {n, x}]}
+     = {{a, 1}, {1, a}}
+    #> d = Dispatch[{g[1, 2] -> yes, g[_, _] -> no}];
+    #> Replace[{g[1, 2], g[2, 1]}, d, {1}]
+     = {yes, no}
+    #> SetAttributes[g, Orderless]; Replace[{g[1, 2], g[2, 1]}, d, {1}]
+     = {yes, yes}
+    #> ClearAttributes[g, Orderless]; Replace[{g[1, 2], g[2, 1]}, d, {1}]
+     = {yes, no}
+    """
+
+    messages = {
+        'reps': "`1` is not a valid replacement rule.",
+    }
+
+    def apply(self, rules, evaluation):
+        'Dispatch[rules_]'
+
+        if rules.has_form('List', None):
+            items = rules.leaves
+        else:
+            items = [rules]
+        result = []
+        for rule in items:
+            if not (rule.has_form('Rule', 2) or rule.has_form('RuleDelayed', 2)):
+                evaluation.message('Dispatch', 'reps', rule)
+                return
+            result.append(Rule(rule.leaves[0], rule.leaves[1]))
+        return Expression('Dispatch', rules, DispatchTable(result))
+
+
 class Replace(Builtin):
     """
     <dl>
@@ -279,6 +419,37 @@ class ReplaceAll(BinaryOperator):
         return result
 
 
+def apply_rules_inert(expr, rules, evaluation, inert):
+    """
+    Applies rules to expr like 'ReplaceAll'. inert maps the ids of subtrees
+    no rule applies to, anywhere in them, to the subtrees; these are skipped.
+    The subtrees found to be unchanged are added to inert and returned as
+    they are, keeping their evaluation timestamps.
+    """
+
+    key = id(expr)
+    if key in inert:
+        return expr, False
+    if expr.is_atom():
+        result, applied = expr.apply_rules(rules, evaluation)
+    else:
+        result, applied = super(Expression, expr).apply_rules(
+            rules, evaluation)
+    if applied:
+        return result, True
+    if not expr.is_atom():
+        head, changed = apply_rules_inert(expr.head, rules, evaluation, inert)
+        leaves = []
+        for leaf in expr.leaves:
+            leaf, applied = apply_rules_inert(leaf, rules, evaluation, inert)
+            changed = changed or applied
+            leaves.append(leaf)
+        if changed:
+            return Expression(head, *leaves), True
+    inert[key] = expr
+    return expr, False
+
+
 class ReplaceRepeated(BinaryOperator):
     """
     <dl>
@@ -298,6 +469,11 @@ class ReplaceRepeated(BinaryOperator):
     'ReplaceAll' just performs a single replacement:
     >> Log[a * (b * c) ^ d ^ e * f] /. logrules
      = Log[a] + Log[f (b c) ^ d ^ e]
+
+    #> {p[p[p[0]]], q[p[1]], p[2]} //. p[x_] :> x
+     = {0, q[1], 2}
+    #> n = 0; {g[1], g[2], h[g[3]]} //. g[x_] /; (n++; x + n > 5) :> x
+     = {1, 2, h[3]}
     """
 
     operator = '//.'
@@ -317,9 +493,17 @@ class ReplaceRepeated(BinaryOperator):
         if ret:
             return rules
 
+        # only the parts changed by the previous pass are rewritten again,
+        # unless a definition a condition might depend on has changed
+        definitions = evaluation.definitions
+        inert = {}
+        now = definitions.now
         while True:
             evaluation.check_stopped()
-            result, applied = expr.apply_rules(rules, evaluation)
+            if definitions.now != now:
+                inert = {}
+                now = definitions.now
+            result, applied = apply_rules_inert(expr, rules, evaluation, inert)
             if applied:
                 result = result.evaluate(evaluation)
             if applied and not result.same(expr):
@@ -519,7 +703,7 @@ class Alternatives(BinaryOperator, PatternObject):
             else:
                 if sub[0] < range[0]:
                     range[0] = sub[0]
-                if range[1] is None or sub[1] > range[1]:
+                if range[1] is not None and (sub[1] is None or sub[1] > range[1]):
                     range[1] = sub[1]
         return range
 
@@ -577,9 +761,42 @@ class _StopGeneratorMatchQ(StopGenerator):
     pass
 
 
+def get_required_atoms(form, definitions):
+    """
+    Returns the atoms that every expression matching the pattern form
+    contains. Atoms in alternatives, defaults, tests and under heads with
+    OneIdentity are left out, as are inexact numbers.
+    """
+
+    from mathics.builtin import pattern_objects
+
+    atoms = set()
+    stack = [form]
+    while stack:
+        expr = stack.pop()
+        if expr.is_atom():
+            if not isinstance(expr, (Real, Complex)):
+                atoms.add(expr)
+            continue
+        head_name = expr.get_head_name()
+        if expr.has_form(('Pattern', 'Condition', 'PatternTest'), 2):
+            stack.append(expr.leaves[1 if head_name == 'System`Pattern' else 0])
+        elif expr.has_form(('HoldPattern', 'Verbatim'), 1):
+            stack.append(expr.leaves[0])
+        elif head_name in pattern_objects:
+            continue
+        elif head_name and 'System`OneIdentity' in definitions.get_attributes(head_name):
+            continue
+        else:
+            stack.append(expr.head)
+            stack.extend(expr.leaves)
+    return frozenset(atoms)
+
+
 class Matcher(object):
     def __init__(self, form):
-        self.form = Pattern.create(form)
+        self.form = Pattern.create_cached(form)
+        self.required_atoms = None
 
     def match(self, expr, evaluation):
         def yield_func(vars, rest):
@@ -591,6 +808,20 @@ class Matcher(object):
             return True
         return False
 
+    def may_contain_match(self, expr, evaluation):
+        """
+        Whether expr or one of its parts may match, as far as can be told
+        from the atoms in it.
+        """
+
+        if self.required_atoms is None:
+            self.required_atoms = get_required_atoms(
+                self.form.expr, evaluation.definitions)
+        if not self.required_atoms:
+            return True
+        atoms = expr.get_atom_set()
+        return atoms is None or self.required_atoms <= atoms
+
 
 def match(expr, form, evaluation):
     return Matcher(form).match(expr, evaluation)
@@ -609,6 +840,13 @@ class MatchQ(Builtin):
      = False
     >> MatchQ[_Integer][123]
      = True
+
+    #> SetAttributes[f, Orderless]; MatchQ[f[1, 2], HoldPattern[f[y_, 1]]]
+     = True
+    #> ClearAttributes[f, Orderless]; MatchQ[f[2, 1], HoldPattern[f[y_, 1]]]
+     = True
+    #> MatchQ[f[1, 2], HoldPattern[f[y_, 1]]]
+     = False
     """
 
     rules = {
@@ -772,6 +1010,14 @@ class Pattern_(PatternObject):
             if existing.same(expression):
                 yield_func(vars, None)
 
+    def does_match(self, expression, evaluation, vars=None, fully=True):
+        existing = vars.get(self.varname, None) if vars else None
+        if existing is None:
+            new_vars = vars.copy() if vars else {}
+            new_vars[self.varname] = expression
+            return self.pattern.does_match(expression, evaluation, new_vars)
+        return existing.same(expression)
+
     def get_match_candidates(self, leaves, expression, attributes, evaluation,
                              vars={}):
         existing = vars.get(self.varname, None)
@@ -910,6 +1156,22 @@ class _Blank(PatternObject):
         else:
             self.head = None
 
+    def get_attributes(self, definitions):
+        # a blank head stands for any head
+        return set()
+
+    def get_match_candidates(self, leaves, expression, attributes, evaluation,
+                             vars={}):
+        if self.head is None:
+            return leaves
+        head_name = self.head.get_name()
+        if not head_name:
+            return leaves
+        if 'System`Flat' in attributes and expression.get_head_name() == head_name:
+            # several leaves wrapped in the head match as well
+            return leaves
+        return get_leaves_with_head(leaves, expression, head_name)
+
 
 class Blank(_Blank):
     """
@@ -954,6 +1216,11 @@ class Blank(_Blank):
             else:
                 yield_func(vars, None)
 
+    def does_match(self, expression, evaluation, vars=None, fully=True):
+        if expression.has_form('Sequence', 0):
+            return False
+        return self.head is None or expression.get_head().same(self.head)
+
 
 class BlankSequence(_Blank):
     """
@@ -1296,6 +1563,11 @@ class OptionsPattern(PatternObject):
     #> f[10, Power -> 3]
      = 1000
     #> Clear[f]
+
+    #> Options[g] = {opt -> 1}; Options[h] = {opt -> 2};
+    #> {g[], h[]} /. (g | h)[OptionsPattern[]] :> OptionValue[opt]
+     = {1, 2}
+    #> Clear[g, h]
     """
 
     arg_counts = [0, 1]
@@ -1306,19 +1578,21 @@ class OptionsPattern(PatternObject):
             self.defaults = expr.leaves[0]
         except IndexError:
             # OptionsPattern[] takes default options of the nearest enclosing
-            # function. Set to not None in self.match
+            # function, which self.match looks up on every match, as
+            # patterns are shared
             self.defaults = None
 
     def match(self, yield_func, expression, vars, evaluation, **kwargs):
-        if self.defaults is None:
-            self.defaults = kwargs.get('head')
-            if self.defaults is None:
+        defaults = self.defaults
+        if defaults is None:
+            defaults = kwargs.get('head')
+            if defaults is None:
                 # we end up here with OptionsPattern that do not have any
                 # default options defined, e.g. with this code:
                 # f[x:OptionsPattern[]] := x; f["Test" -> 1]
-                # set self.defaults to an empty List, so we don't crash.
-                self.defaults = Expression('List')
-        values = self.defaults.get_option_values(
+                # use an empty List, so we don't crash.
+                defaults = Expression('List')
+        values = defaults.get_option_values(
             evaluation, allow_symbols=True, stop_on_error=False)
         sequence = expression.get_sequence()
         for options in sequence:
@@ -1352,13 +1626,22 @@ def item_is_free(item, form, evaluation):
         raise _StopGeneratorBaseExpressionIsFree(False)
         # return False
 
-    try:
-        form.match(yield_match, item, {}, evaluation, fully=False)
-    except _StopGeneratorBaseExpressionIsFree as exc:
-        return exc.value
-
-    if item.is_atom():
-        return True
-    else:
-        return item_is_free(item.head, form, evaluation) and all(
-            item_is_free(leaf, form, evaluation) for leaf in item.leaves)
+    # item and its parts at level 1 are skipped with all their parts when
+    # they lack atoms a match needs
+    required = get_required_atoms(form.expr, evaluation.definitions)
+    stack = [(item, 0)]
+    while stack:
+        item, level = stack.pop()
+        if required and level <= 1:
+            atoms = item.get_atom_set()
+            if atoms is not None and not required <= atoms:
+                continue
+        try:
+            form.match(yield_match, item, {}, evaluation, fully=False)
+        except _StopGeneratorBaseExpressionIsFree as exc:
+            return exc.value
+
+        if not item.is_atom():
+            stack.extend((leaf, level + 1) for leaf in reversed(item.leaves))
+            stack.append((item.head, level + 1))
+    return True
@@ -0,0 +1,870 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Sparse arrays
+
+A sparse array stores only the positions and values of the elements that
+differ from its default element, so that memory and time are
+proportional to the number of such elements rather than to the size of
+the array.
+"""
+
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from collections import defaultdict
+from fractions import Fraction
+
+import six
+from six.moves import range
+
+from mathics.builtin.base import Builtin, AtomBuiltin
+from mathics.builtin.lists import list_boxes
+from mathics.core.expression import (
+    Atom, Expression, Symbol, String, Integer, Rational, MachineReal,
+    KeyComparable)
+from mathics.core.rules import BuiltinRule
+
+try:
+    import numpy
+    import scipy.sparse
+    import scipy.sparse.linalg
+    _scipy = True
+except ImportError:
+    _scipy = False
+
+
+class SparseArray(Atom):
+    def __init__(self, dims, data, default, **kwargs):
+        super(SparseArray, self).__init__(**kwargs)
+        self.dims = tuple(dims)
+        self.data = data            # position (0-based tuple) -> value
+        self.default = default
+        self.positions = None
+        self.sort_key = None
+        self.hash = None
+
+    def get_positions(self):
+        if self.positions is None:
+            self.positions = sorted(self.data)
+        return self.positions
+
+    def get_rules(self):
+        return [Expression('Rule', Expression('List', *[
+            Integer(index + 1) for index in position]), self.data[position])
+            for position in self.get_positions()]
+
+    def get_rows(self):
+        """
+        Returns the elements grouped by their first index, as a dict from
+        the first index to lists of (remaining position, value).
+        """
+
+        rows = defaultdict(list)
+        for position, value in six.iteritems(self.data):
+            rows[position[0]].append((position[1:], value))
+        return rows
+
+    def get_list_expression(self):
+        def build(position, dims):
+            if not dims:
+                return self.data.get(position, self.default)
+            return Expression('List', *[
+                build(position + (index,), dims[1:])
+                for index in range(dims[0])])
+
+        if len(self.data) == 0:
+            # every row is the same
+            result = self.default
+            for dim in reversed(self.dims):
+                result = Expression('List', *([result] * dim))
+            return result
+        return build((), self.dims)
+
+    def get_expression(self):
+        return Expression(
+            'SparseArray', Expression('List', *self.get_rules()),
+            Expression('List', *[Integer(dim) for dim in self.dims]),
+            self.default)
+
+    def get_lookup_name(self):
+        # f[..., sparse, ...] looks up up values of SparseArray
+        return 'System`SparseArray'
+
+    def __str__(self):
+        return 'SparseArray[<%d>, {%s}]' % (
+            len(self.data), ', '.join(str(dim) for dim in self.dims))
+
+    def do_copy(self):
+        return SparseArray(self.dims, self.data, self.default)
+
+    def default_format(self, evaluation, form):
+        return self.get_expression().default_format(evaluation, form)
+
+    def get_sort_key(self, pattern_sort=False):
+        if pattern_sort:
+            return super(SparseArray, self).get_sort_key(True)
+        if self.sort_key is None:
+            # shaped like the key of an expression, the elements are only
+            # compared if the dimensions and default elements are the same
+            self.sort_key = [2, 3, Symbol('SparseArray'), [
+                Expression('List', *[Integer(dim) for dim in self.dims]),
+                self.default, _ElementsKey(self)], 1]
+        return self.sort_key
+
+    def same(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, SparseArray):
+            return False
+        if self.dims != other.dims or not self.default.same(other.default):
+            return False
+        if len(self.data) != len(other.data):
+            return False
+        for position, value in six.iteritems(self.data):
+            other_value = other.data.get(position)
+            if other_value is None or not value.same(other_value):
+                return False
+        return True
+
+    def to_python(self, *args, **kwargs):
+        return self.get_list_expression().to_python(*args, **kwargs)
+
+    def __hash__(self):
+        if self.hash is None:
+            self.hash = hash(('SparseArray', self.dims, self.default) +
+                             tuple(self.data[position]
+                                   for position in self.get_positions()))
+        return self.hash
+
+    def user_hash(self, update):
+        update(('System`SparseArray>%s>' % (self.dims,)).encode('utf8'))
+        self.default.user_hash(update)
+        for rule in self.get_rules():
+            rule.user_hash(update)
+
+    def atom_to_boxes(self, f, evaluation):
+        if f.get_name() in ('System`InputForm', 'System`FullForm'):
+            leaves = self.get_expression().leaves
+        else:
+            leaves = [String('<%d>' % len(self.data)), Expression(
+                'List', *[Integer(dim) for dim in self.dims])]
+            if not self.default.same(Integer(0)):
+                leaves.append(self.default)
+        boxes = [String('SparseArray')] + list_boxes(leaves, f, '[', ']')
+        return Expression('RowBox', Expression('List', *boxes))
+
+
+class _ElementsKey(KeyComparable):
+    def __init__(self, array):
+        self.array = array
+
+    def get_sort_key(self):
+        positions = self.array.get_positions()
+        return [positions, [self.array.data[position]
+                            for position in positions]]
+
+
+def _to_number(expr):
+    """
+    Returns an exact or machine precision real number as a Python int,
+    Fraction or float, and None for anything else.
+    """
+
+    if isinstance(expr, Integer):
+        return expr.value
+    if isinstance(expr, Rational):
+        return Fraction(int(expr.value.p), int(expr.value.q))
+    if isinstance(expr, MachineReal):
+        return expr.value
+
+
+def _from_number(value):
+    if isinstance(value, float):
+        return MachineReal(value)
+    if isinstance(value, Fraction):
+        if value.denominator == 1:
+            return Integer(value.numerator)
+        return Rational(value.numerator, value.denominator)
+    return Integer(value)
+
+
+def _number_data(array):
+    """
+    Returns the elements and the default element of array as numbers, or
+    None if any of them is not a number.
+    """
+
+    default = _to_number(array.default)
+    if default is None:
+        return None
+    data = {}
+    for position, value in six.iteritems(array.data):
+        value = _to_number(value)
+        if value is None:
+            return None
+        data[position] = value
+    return data, default
+
+
+def _has_zero_default(array):
+    return _to_number(array.default) == 0
+
+
+def _from_data(dims, data, default):
+    # elements that are the default element are not stored
+    return SparseArray(dims, dict(
+        (position, value) for position, value in six.iteritems(data)
+        if not value.same(default)), default)
+
+
+def _from_number_data(dims, data, default):
+    default = _from_number(default)
+    try:
+        return _from_data(dims, dict(
+            (position, _from_number(value))
+            for position, value in six.iteritems(data)), default)
+    except OverflowError:
+        return None
+
+
+def _position(expr):
+    """
+    Returns the 0-based position tuple for a position {i1, i2, ...} or
+    i1, or None if it is not a position of positive integers.
+    """
+
+    if isinstance(expr, Integer):
+        indices = [expr]
+    elif expr.has_form('List', 1, None):
+        indices = expr.leaves
+    else:
+        return None
+    position = []
+    for index in indices:
+        index = index.get_int_value()
+        if index is None or index < 1:
+            return None
+        position.append(index - 1)
+    return tuple(position)
+
+
+def sparse_from_rules(rules, dims, default, evaluation):
+    """
+    Creates a sparse array from rules for positions, lists of positions
+    and bands of a matrix. Earlier rules take precedence. The dimensions
+    are the smallest that hold all positions if dims is None. Returns
+    None after a message if the rules or the dimensions are invalid.
+    """
+
+    items = []      # (0-based positions, values, whether to clip them)
+    for rule in rules:
+        if not rule.has_form(('Rule', 'RuleDelayed'), 2):
+            return evaluation.message('SparseArray', 'rule', rule)
+        lhs, rhs = rule.leaves
+        if rule.get_head_name() == 'System`RuleDelayed':
+            rhs = rhs.evaluate(evaluation)
+        clip = False
+        if lhs.has_form('Band', 1):
+            # the diagonal from a position on, cut off at the edges
+            start = _position(lhs.leaves[0])
+            if start is None or len(start) != 2:
+                return evaluation.message('SparseArray', 'band', lhs)
+            if rhs.has_form('List', None):
+                values = rhs.leaves
+            elif dims is None:
+                return evaluation.message('SparseArray', 'bdims', lhs)
+            else:
+                values = [rhs] * max(0, min(
+                    dims[0] - start[0], dims[1] - start[1]))
+            positions = [(start[0] + k, start[1] + k)
+                         for k in range(len(values))]
+            clip = dims is not None
+        elif lhs.has_form('List', 1, None) and all(
+                leaf.has_form('List', None) for leaf in lhs.leaves):
+            positions = [_position(leaf) for leaf in lhs.leaves]
+            if not rhs.has_form('List', len(positions)):
+                return evaluation.message('SparseArray', 'rule', rule)
+            values = rhs.leaves
+        else:
+            positions = [_position(lhs)]
+            values = [rhs]
+        if any(position is None for position in positions):
+            return evaluation.message('SparseArray', 'pos', rule)
+        items.append((positions, values, clip))
+
+    if dims is None:
+        ranks = set(len(position)
+                    for positions, values, clip in items
+                    for position in positions)
+        if len(ranks) != 1:
+            return evaluation.message('SparseArray', 'rank')
+        dims = [1 + max(position[axis]
+                        for positions, values, clip in items
+                        for position in positions)
+                for axis in range(ranks.pop())]
+
+    data = {}
+    for positions, values, clip in items:
+        for position, value in zip(positions, values):
+            if len(position) != len(dims) or any(
+                    index >= dim for index, dim in zip(position, dims)):
+                if clip:
+                    continue
+                return evaluation.message(
+                    'SparseArray', 'posr', Expression('List', *[
+                        Integer(index + 1) for index in position]),
+                    Expression('List', *[Integer(dim) for dim in dims]))
+            if position not in data:
+                data[position] = value
+    return _from_data(dims, data, default)
+
+
+def sparse_from_list(expr, default=None):
+    """
+    Creates a sparse array from a full array, or returns None if expr is
+    not a non-empty list.
+    """
+
+    from mathics.builtin.tensors import get_dimensions
+
+    if default is None:
+        default = Integer(0)
+    dims = get_dimensions(expr)
+    if not expr.has_form('List', None) or 0 in dims:
+        return None
+    data = {}
+
+    def walk(position, expr, depth):
+        if depth == len(dims):
+            if not expr.same(default):
+                data[position] = expr
+        else:
+            for index, leaf in enumerate(expr.leaves):
+                walk(position + (index,), leaf, depth + 1)
+
+    walk((), expr, 0)
+    return SparseArray(dims, data, default)
+
+
+def sparse_elementwise(head, args, evaluation):
+    """
+    Applies the listable function head to arguments some of which are
+    sparse arrays and the others scalars. Returns None after a message if
+    the dimensions of the sparse arrays differ.
+    """
+
+    arrays = [arg for arg in args if isinstance(arg, SparseArray)]
+    dims = arrays[0].dims
+    if any(array.dims != dims for array in arrays):
+        return evaluation.message('Thread', 'tdlen')
+    positions = set()
+    for array in arrays:
+        positions.update(array.data)
+
+    if head.get_name() in ('System`Plus', 'System`Times'):
+        numbers = []
+        for arg in args:
+            if isinstance(arg, SparseArray):
+                number = _number_data(arg)
+            else:
+                number = _to_number(arg)
+                number = None if number is None else ({}, number)
+            if number is None:
+                break
+            numbers.append(number)
+        else:
+            if head.get_name() == 'System`Plus':
+                def combine(values):
+                    return sum(values)
+            else:
+                def combine(values):
+                    result = 1
+                    for value in values:
+                        result *= value
+                    return result
+            default = combine([number[1] for number in numbers])
+            data = dict((position, combine([
+                number[0].get(position, number[1]) for number in numbers]))
+                for position in positions)
+            result = _from_number_data(dims, data, default)
+            if result is not None:
+                return result
+
+    def leaves_at(position):
+        return [arg.data.get(position, arg.default)
+                if isinstance(arg, SparseArray) else arg for arg in args]
+
+    default = Expression(head, *[
+        arg.default if isinstance(arg, SparseArray) else arg
+        for arg in args]).evaluate(evaluation)
+    data = dict(
+        (position, Expression(head, *leaves_at(position)).evaluate(evaluation))
+        for position in positions)
+    return _from_data(dims, data, default)
+
+
+def sparse_part(array, indices, evaluation):
+    """
+    Gives the part of a sparse array for Integer indices: an element, or
+    a sparse array if there are fewer indices than dimensions. Returns
+    None after a message if an index is out of range.
+    """
+
+    position = []
+    for index, dim in zip(indices, array.dims):
+        value = index.get_int_value()
+        if 1 <= value <= dim:
+            position.append(value - 1)
+        elif -dim <= value <= -1:
+            position.append(value + dim)
+        else:
+            return evaluation.message('Part', 'partw', index, array)
+    position = tuple(position)
+    rank = len(position)
+    if rank == len(array.dims):
+        result = array.data.get(position, array.default)
+        if len(indices) > rank:
+            return Expression('Part', result, *indices[rank:])
+        return result
+    return SparseArray(array.dims[rank:], dict(
+        (key[rank:], value) for key, value in six.iteritems(array.data)
+        if key[:rank] == position), array.default)
+
+
+def sparse_transpose(array):
+    return SparseArray((array.dims[1], array.dims[0]), dict(
+        ((j, i), value) for (i, j), value in six.iteritems(array.data)),
+        array.default)
+
+
+def sparse_total(array, evaluation):
+    """
+    Gives the sum of the elements of a sparse array at the first level.
+    """
+
+    count = array.dims[0]
+    rest = array.dims[1:]
+    result = None
+    numbers = _number_data(array)
+    if numbers is not None:
+        data, default = numbers
+        sums = defaultdict(int)
+        counts = defaultdict(int)
+        for position, value in six.iteritems(data):
+            sums[position[1:]] += value
+            counts[position[1:]] += 1
+        result = _from_number_data(rest, dict(
+            (position, value + default * (count - counts[position]))
+            for position, value in six.iteritems(sums)), default * count)
+    if result is None:
+        groups = defaultdict(list)
+        for position, value in six.iteritems(array.data):
+            groups[position[1:]].append(value)
+
+        def total(values):
+            return Expression('Plus', Expression(
+                'Times', Integer(count - len(values)), array.default),
+                *values).evaluate(evaluation)
+
+        result = _from_data(rest, dict(
+            (position, total(values))
+            for position, values in six.iteritems(groups)), total([]))
+    if not rest:
+        return result.data.get((), result.default)
+    return result
+
+
+def sparse_dot(a, b, evaluation):
+    """
+    Gives the product of two sparse arrays that contracts the last index
+    of a with the first index of b: a scalar for two vectors and a sparse
+    array otherwise. Returns None unless both default elements are zero
+    and the dimensions fit.
+    """
+
+    if not (_has_zero_default(a) and _has_zero_default(b)):
+        return None
+    if a.dims[-1] != b.dims[0]:
+        return None
+    dims = a.dims[:-1] + b.dims[1:]
+
+    result = None
+    a_numbers = _number_data(a)
+    b_numbers = _number_data(b)
+    if a_numbers is not None and b_numbers is not None:
+        rows = defaultdict(list)
+        for position, value in six.iteritems(b_numbers[0]):
+            rows[position[0]].append((position[1:], value))
+        sums = defaultdict(int)
+        for position, value in six.iteritems(a_numbers[0]):
+            prefix = position[:-1]
+            for rest, other in rows.get(position[-1], ()):
+                sums[prefix + rest] += value * other
+        result = _from_number_data(dims, sums, a_numbers[1] * b_numbers[1])
+    if result is None:
+        rows = b.get_rows()
+        terms = defaultdict(list)
+        for position, value in six.iteritems(a.data):
+            prefix = position[:-1]
+            for rest, other in rows.get(position[-1], ()):
+                terms[prefix + rest].append(Expression('Times', value, other))
+        result = _from_data(dims, dict(
+            (position, Expression('Plus', *leaves).evaluate(evaluation))
+            for position, leaves in six.iteritems(terms)),
+            Expression('Times', a.default, b.default).evaluate(evaluation))
+    if not dims:
+        return result.data.get((), result.default)
+    return result
+
+
+def _number_rows(data, n, machine):
+    rows = [{} for i in range(n)]
+    convert = float if machine else Fraction
+    for (i, j), value in six.iteritems(data):
+        rows[i][j] = convert(value)
+    return rows
+
+
+def _eliminate(rows, rhs, machine):
+    """
+    Gaussian elimination on a square matrix, given as a dict from column
+    to value for each row, and on the right-hand sides rhs unless it is
+    None. Modifies both and returns the pivot row for each column, or
+    None if the matrix is singular.
+
+    The pivot for a column is the shortest row with an element in the
+    column, among those whose element is not much smaller than the
+    largest one for machine numbers, which keeps the fill-in of banded
+    and other sparse matrices low.
+    """
+
+    columns = [set() for row in rows]
+    for i, row in enumerate(rows):
+        for j in row:
+            columns[j].add(i)
+    pivots = []
+    for k, candidates in enumerate(columns):
+        if not candidates:
+            return None
+        if machine:
+            largest = max(abs(rows[i][k]) for i in candidates)
+            candidates = [i for i in candidates
+                          if abs(rows[i][k]) >= 0.1 * largest]
+        p = min(candidates, key=lambda i: (len(rows[i]), i))
+        pivot_row = rows[p]
+        for j in pivot_row:
+            columns[j].discard(p)
+        pivot = pivot_row[k]
+        for i in list(columns[k]):
+            row = rows[i]
+            factor = row.pop(k) / pivot
+            for j, value in six.iteritems(pivot_row):
+                if j == k:
+                    continue
+                new = row.get(j, 0) - factor * value
+                if new != 0:
+                    if j not in row:
+                        columns[j].add(i)
+                    row[j] = new
+                elif j in row:
+                    del row[j]
+                    columns[j].discard(i)
+            if rhs is not None:
+                rhs[i] -= factor * rhs[p]
+        columns[k] = set()
+        pivots.append(p)
+    return pivots
+
+
+def _scipy_solve(data, rhs, n):
+    import warnings
+
+    positions = list(data)
+    matrix = scipy.sparse.csc_matrix((
+        [float(data[position]) for position in positions],
+        ([i for i, j in positions], [j for i, j in positions])),
+        shape=(n, n))
+    with warnings.catch_warnings():
+        # singular matrices give a warning and no finite solution
+        warnings.simplefilter('ignore')
+        x = scipy.sparse.linalg.spsolve(matrix, numpy.array(rhs, dtype=float))
+    if not numpy.all(numpy.isfinite(x)):
+        return None
+    return [float(value) for value in x]
+
+
+def sparse_linear_solve(matrix, vector, evaluation):
+    """
+    Solves matrix . x == vector for a square sparse matrix and a sparse
+    vector with numbers for elements. Returns x as a list, or None if the
+    matrix is singular or the system is of another kind.
+
+    Machine precision systems are solved by scipy if it is installed.
+    """
+
+    n = matrix.dims[0]
+    if matrix.dims != (n, n) or vector.dims != (n,):
+        return None
+    if not _has_zero_default(matrix):
+        return None
+    numbers = _number_data(matrix)
+    rhs_numbers = _number_data(vector)
+    if numbers is None or rhs_numbers is None:
+        return None
+    data = numbers[0]
+    rhs = [rhs_numbers[0].get((i,), rhs_numbers[1]) for i in range(n)]
+    machine = any(isinstance(value, float)
+                  for value in list(six.itervalues(data)) + rhs)
+
+    if machine and _scipy:
+        x = _scipy_solve(data, rhs, n)
+    else:
+        rows = _number_rows(data, n, machine)
+        rhs = [float(value) if machine else Fraction(value) for value in rhs]
+        pivots = _eliminate(rows, rhs, machine)
+        if pivots is None:
+            return None
+        x = [None] * n
+        for k in range(n - 1, -1, -1):
+            row = rows[pivots[k]]
+            value = rhs[pivots[k]]
+            for j, element in six.iteritems(row):
+                if j != k:
+                    value -= element * x[j]
+            x[k] = value / row[k]
+    if x is None:
+        return None
+    try:
+        return Expression('List', *[_from_number(value) for value in x])
+    except OverflowError:
+        return None
+
+
+def sparse_det(matrix):
+    """
+    Gives the determinant of a square sparse matrix with numbers for
+    elements, or None for other matrices.
+    """
+
+    n = matrix.dims[0]
+    if matrix.dims != (n, n) or not _has_zero_default(matrix):
+        return None
+    numbers = _number_data(matrix)
+    if numbers is None:
+        return None
+    machine = any(isinstance(value, float)
+                  for value in six.itervalues(numbers[0]))
+    rows = _number_rows(numbers[0], n, machine)
+    pivots = _eliminate(rows, None, machine)
+    if pivots is None:
+        return _from_number(0. if machine else 0)
+
+    det = 1
+    for k, i in enumerate(pivots):
+        det *= rows[i][k]
+    # the sign of the permutation of the rows
+    seen = [False] * n
+    for start in range(n):
+        length = 0
+        k = start
+        while not seen[k]:
+            seen[k] = True
+            k = pivots[k]
+            length += 1
+        if length and length % 2 == 0:
+            det = -det
+    try:
+        return _from_number(det)
+    except OverflowError:
+        return None
+
+
+def _dimensions(expr):
+    if isinstance(expr, Integer):
+        expr = Expression('List', expr)
+    if not expr.has_form('List', 1, None):
+        return None
+    dims = [leaf.get_int_value() for leaf in expr.leaves]
+    if any(dim is None or dim < 1 for dim in dims):
+        return None
+    return dims
+
+
+class SparseArrayAtom(AtomBuiltin):
+    """
+    <dl>
+    <dt>'SparseArray[{$pos1$ -> $val1$, $pos2$ -> $val2$, ...}]'
+        <dd>represents an array with the elements $vali$ at the
+        positions $posi$ and 0 elsewhere.
+    <dt>'SparseArray[$rules$, $dims$]'
+        <dd>represents an array of dimensions $dims$.
+    <dt>'SparseArray[$rules$, $dims$, $val$]'
+        <dd>uses $val$ as the default element.
+    <dt>'SparseArray[$list$]'
+        <dd>represents the full array $list$ as a sparse array.
+    </dl>
+
+    Only the elements that differ from the default element are stored:
+    >> s = SparseArray[{{1, 1} -> a, {2, 3} -> b, {2, 1} -> 0}]
+     = SparseArray[<2>, {2, 3}]
+    >> Normal[s]
+     = {{a, 0, 0}, {0, 0, b}}
+    >> {Dimensions[s], Length[s], s[[2, 3]], s[[2]]}
+     = {{2, 3}, 2, b, SparseArray[<1>, {3}]}
+
+    Earlier rules take precedence over later ones:
+    >> Normal[SparseArray[{2 -> x, 2 -> y}, 3, d]]
+     = {d, x, d}
+
+    'Band' gives the diagonals of a matrix:
+    >> m = SparseArray[{Band[{1, 1}] -> 2, Band[{2, 1}] -> -1, Band[{1, 2}] -> -1}, {4, 4}];
+    >> Normal[m]
+     = {{2, -1, 0, 0}, {-1, 2, -1, 0}, {0, -1, 2, -1}, {0, 0, -1, 2}}
+
+    Listable functions apply to the elements and the default element:
+    >> Normal[3 m + 1]
+     = {{7, -2, 1, 1}, {-2, 7, -2, 1}, {1, -2, 7, -2}, {1, 1, -2, 7}}
+    >> SetAttributes[f, Listable]; Normal[f[s, 2]]
+     = {{f[a, 2], f[0, 2], f[0, 2]}, {f[0, 2], f[0, 2], f[b, 2]}}
+    >> s + {{1, 2, 3}, {4, 5, 6}}
+     = {{1 + a, 2, 3}, {4, 5, 6 + b}}
+
+    'Dot', 'Transpose', 'Total', 'LinearSolve' and 'Det' work on the
+    stored elements only:
+    >> m . {1, 2, 3, 4}
+     = {0, 0, 0, 5}
+    >> Normal[m . m]
+     = {{5, -4, 1, 0}, {-4, 6, -4, 1}, {1, -4, 6, -4}, {0, 1, -4, 5}}
+    >> Normal[Transpose[s]]
+     = {{a, 0}, {0, 0}, {0, b}}
+    >> Normal[Total[m]]
+     = {1, 0, 0, 1}
+    >> LinearSolve[m, {1, 0, 0, 0}]
+     = {4 / 5, 3 / 5, 2 / 5, 1 / 5}
+    >> Det[m]
+     = 5
+
+    #> SparseArray[{{1, 1} -> 1, {2} -> 2}]
+     : The positions do not all have the same length.
+     = SparseArray[{{1, 1} -> 1, {2} -> 2}]
+    #> SparseArray[{{0, 1} -> 1}]
+     : The left-hand side of {0, 1} -> 1 is not a position of positive integers.
+     = SparseArray[{{0, 1} -> 1}]
+    #> SparseArray[{{3, 1} -> 1}, {2, 2}]
+     : The position {3, 1} is not within the dimensions {2, 2}.
+     = SparseArray[{{3, 1} -> 1}, {2, 2}]
+    #> SparseArray[{Band[{1, 1}] -> 1}]
+     : The dimensions of an array with Band[{1, 1}] must be given.
+     = SparseArray[{Band[{1, 1}] -> 1}]
+    #> SparseArray[{1 -> 1}, {0}]
+     : {0} is not a list of positive integers.
+     = SparseArray[{1 -> 1}, {0}]
+    #> SparseArray[{{1, 2}, {0, 3}}] + 1
+     = SparseArray[<3>, {2, 2}, 1]
+    #> InputForm[SparseArray[{0, x}]]
+     = SparseArray[{{2} -> x}, {2}, 0]
+    #> SparseArray[{{1, 2}, {0, 3}}] === SparseArray[{{1, 1} -> 1, {1, 2} -> 2, {2, 2} -> 3}]
+     = True
+    """
+
+    messages = {
+        'rule': "`1` is not a rule for positions of the array.",
+        'pos': ("The left-hand side of `1` is not a position of "
+                "positive integers."),
+        'posr': "The position `1` is not within the dimensions `2`.",
+        'band': "`1` does not give the start of a diagonal of a matrix.",
+        'bdims': "The dimensions of an array with `1` must be given.",
+        'rank': "The positions do not all have the same length.",
+        'dims': "`1` is not a list of positive integers.",
+    }
+
+    def apply(self, rules, evaluation):
+        'SparseArray[rules_]'
+
+        if isinstance(rules, SparseArray):
+            return rules
+        if rules.has_form('List', 1, None) and not all(
+                leaf.has_form(('Rule', 'RuleDelayed'), 2)
+                for leaf in rules.leaves):
+            return sparse_from_list(rules)
+        return self.apply_default(rules, None, Integer(0), evaluation)
+
+    def apply_dims(self, rules, dims, evaluation):
+        'SparseArray[rules_, dims_]'
+
+        return self.apply_default(rules, dims, Integer(0), evaluation)
+
+    def apply_default(self, rules, dims, default, evaluation):
+        'SparseArray[rules_, dims_, default_]'
+
+        if dims is not None:
+            expr = dims
+            dims = _dimensions(dims)
+            if dims is None:
+                return evaluation.message('SparseArray', 'dims', expr)
+        if rules.has_form('List', None):
+            rules = rules.leaves
+        else:
+            rules = [rules]
+        return sparse_from_rules(rules, dims, default, evaluation)
+
+    def elementwise(self, f, args, evaluation):
+        return sparse_elementwise(f, args.get_sequence(), evaluation)
+
+    def contribute(self, definitions):
+        from mathics.core.parser import parse_builtin_rule
+
+        super(SparseArrayAtom, self).contribute(definitions)
+        # a listable function applies to the elements of a sparse array,
+        # which is an up value of SparseArray
+        definitions.builtin[self.get_name()].add_rule_at(BuiltinRule(
+            parse_builtin_rule(
+                '(f_Symbol)[args___] /; MemberQ[Attributes[f], Listable] && '
+                'MemberQ[{args}, _SparseArray?AtomQ]'),
+            self.elementwise, system=True), 'up')
+
+
+class Band(Builtin):
+    """
+    <dl>
+    <dt>'Band[{$i$, $j$}]'
+        <dd>stands for the diagonal of a matrix that starts at the
+        position {$i$, $j$} in the rules of 'SparseArray'.
+    </dl>
+
+    >> Normal[SparseArray[Band[{1, 2}] -> x, {3, 3}]]
+     = {{0, x, 0}, {0, 0, x}, {0, 0, 0}}
+    >> Normal[SparseArray[{Band[{1, 1}] -> {a, b, c}}]]
+     = {{a, 0, 0}, {0, b, 0}, {0, 0, c}}
+    """
+
+
+class ArrayRules(Builtin):
+    """
+    <dl>
+    <dt>'ArrayRules[$a$]'
+        <dd>gives the rules for the positions and values of the elements
+        of the sparse or full array $a$ that are not the default element,
+        followed by a rule for the default element.
+    </dl>
+
+    >> ArrayRules[SparseArray[{{1, 2} -> x, {3, 1} -> y}]]
+     = {{1, 2} -> x, {3, 1} -> y, {_, _} -> 0}
+    >> ArrayRules[{0, a, 0, b}]
+     = {{2} -> a, {4} -> b, {_} -> 0}
+    """
+
+    def apply(self, array, evaluation):
+        'ArrayRules[array:_List|_SparseArray]'
+
+        if not isinstance(array, SparseArray):
+            array = sparse_from_list(array)
+            if array is None:
+                return
+        rules = array.get_rules()
+        rules.append(Expression('Rule', Expression('List', *[
+            Expression('Blank')] * len(array.dims)), array.default))
+        return Expression('List', *rules)
@@ -619,8 +619,10 @@ class MapIndexed(Builtin):
             return
 
         def callback(level, pos):
+            # the values of associations are at positions Key[key]
             return Expression(f, level, Expression('List', *[
-                Integer(p) for p in pos]))
+                p if isinstance(p, Expression) else Integer(p)
+                for p in pos]))
 
         heads = self.get_option(options, 'Heads', evaluation).is_true()
         result, depth = walk_levels(expr, start, stop, heads=heads,
@@ -790,7 +792,7 @@ class FreeQ(Builtin):
     def apply(self, expr, form, evaluation):
         'FreeQ[expr_, form_]'
 
-        form = Pattern.create(form)
+        form = Pattern.create_cached(form)
         if expr.is_free(form, evaluation):
             return Symbol('True')
         else:
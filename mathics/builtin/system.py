@@ -10,8 +10,10 @@ from __future__ import absolute_import
 
 import sys
 
-from mathics.core.expression import Expression, String, strip_context
+from mathics.core.expression import (
+    Expression, String, Symbol, Integer, strip_context)
 from mathics.builtin.base import Builtin, Predefined
+from mathics.core.pattern import pattern_cache
 from mathics import version_string
 
 
@@ -141,3 +143,48 @@ class ScriptCommandLine(Predefined):
             return Expression('List')
 
         return Expression('List', *(String(arg) for arg in sys.argv[dash_index + 1:]))
+
+
+class ClearSystemCache(Builtin):
+    '''
+    <dl>
+    <dt>'ClearSystemCache[]'
+      <dd>clears the cached results of builtins such as 'Simplify',
+      'Factor' and 'Integrate', and the cached compiled patterns.
+    </dl>
+    >> Factor[x ^ 2 - 1];
+    >> ClearSystemCache[]
+    >> "Entries" /. SystemCacheInfo[]
+     = 0
+    '''
+
+    def apply(self, evaluation):
+        'ClearSystemCache[]'
+        evaluation.definitions.memo_cache.clear()
+        pattern_cache.clear()
+        return Symbol('Null')
+
+
+class SystemCacheInfo(Builtin):
+    '''
+    <dl>
+    <dt>'SystemCacheInfo[]'
+      <dd>gives the number of cached results of builtins such as
+      'Simplify', 'Factor' and 'Integrate', the maximum number kept, and
+      the numbers of cache hits and misses.
+    </dl>
+    >> ClearSystemCache[]
+    >> Factor[x ^ 2 - 1]; Factor[x ^ 2 - 1];
+    >> SystemCacheInfo[]
+     = {Entries -> 1, MaxEntries -> 1000, Hits -> 1, Misses -> 1}
+    '''
+
+    def apply(self, evaluation):
+        'SystemCacheInfo[]'
+        cache = evaluation.definitions.memo_cache
+        return Expression('List', *(
+            Expression('Rule', String(name), Integer(value))
+            for name, value in (('Entries', len(cache.entries)),
+                                ('MaxEntries', cache.max_size),
+                                ('Hits', cache.hits),
+                                ('Misses', cache.misses))))
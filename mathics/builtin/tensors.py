@@ -14,6 +14,8 @@ from mathics.core.expression import Expression, Symbol, Integer, String
 from mathics.core.rules import Pattern
 
 from mathics.builtin.lists import get_part
+from mathics.builtin.sparse import (
+    SparseArray, sparse_dot, sparse_from_list, sparse_transpose)
 
 
 class ArrayQ(Builtin):
@@ -48,13 +50,35 @@ class ArrayQ(Builtin):
 
         pattern = Pattern.create(pattern)
 
+        # no need to test the elements for ArrayQ[expr] and MatrixQ[expr]
+        any_element = test.same(Expression('Function', Symbol('True')))
+
+        if isinstance(expr, SparseArray):
+            if not pattern.does_match(Integer(len(expr.dims)), evaluation):
+                return Symbol('False')
+            if any_element:
+                return Symbol('True')
+            # the default element is only tested if the array has one
+            elements = list(expr.data.values())
+            size = 1
+            for dim in expr.dims:
+                size *= dim
+            if len(elements) < size:
+                elements.append(expr.default)
+            for element in elements:
+                test_expr = Expression(test, element)
+                if test_expr.evaluate(evaluation) != Symbol('True'):
+                    return Symbol('False')
+            return Symbol('True')
+
         dims = [len(expr.get_leaves())]  # to ensure an atom is not an array
 
         def check(level, expr):
             if not expr.has_form('List', None):
-                test_expr = Expression(test, expr)
-                if test_expr.evaluate(evaluation) != Symbol('True'):
-                    return False
+                if not any_element:
+                    test_expr = Expression(test, expr)
+                    if test_expr.evaluate(evaluation) != Symbol('True'):
+                        return False
                 level_dim = None
             else:
                 level_dim = len(expr.leaves)
@@ -122,6 +146,9 @@ class MatrixQ(Builtin):
 
 def get_dimensions(expr, head=None):
     if expr.is_atom():
+        if isinstance(expr, SparseArray) and (
+                head is None or head.get_name() == 'System`List'):
+            return list(expr.dims)
         return []
     else:
         if head is not None and not expr.head.same(head):
@@ -223,6 +250,32 @@ class Dot(BinaryOperator):
         'Dot[a_List, b_List]': 'Inner[Times, a, b, Plus]',
     }
 
+    def apply_sparse(self, a, b, evaluation):
+        'Dot[a_SparseArray, b:_SparseArray|_List]'
+
+        return self.sparse_dot(a, b, evaluation)
+
+    def apply_list_sparse(self, a, b, evaluation):
+        'Dot[a_List, b_SparseArray]'
+
+        return self.sparse_dot(a, b, evaluation)
+
+    def sparse_dot(self, a, b, evaluation):
+        # the product is a full array if either factor is one
+        arrays = [x if isinstance(x, SparseArray) else sparse_from_list(x)
+                  for x in (a, b)]
+        result = None
+        if all(array is not None for array in arrays):
+            result = sparse_dot(arrays[0], arrays[1], evaluation)
+        if result is None:
+            return Expression('Dot', *[
+                x.get_list_expression() if isinstance(x, SparseArray) else x
+                for x in (a, b)])
+        if isinstance(result, SparseArray) and not (
+                isinstance(a, SparseArray) and isinstance(b, SparseArray)):
+            return result.get_list_expression()
+        return result
+
 
 class Inner(Builtin):
     """
@@ -401,6 +454,8 @@ class Transpose(Builtin):
     def apply(self, m, evaluation):
         'Transpose[m_?MatrixQ]'
 
+        if isinstance(m, SparseArray):
+            return sparse_transpose(m)
         result = []
         for row_index, row in enumerate(m.leaves):
             for col_index, item in enumerate(row.leaves):
@@ -12,7 +12,7 @@ import base64
 import re
 import bisect
 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 
 from mathics.core.expression import Expression, Symbol, String, fully_qualified_symbol_name, strip_context
 from mathics.core.characters import letters, letterlikes
@@ -44,12 +44,19 @@ class Definitions(object):
     def __init__(self, add_builtin=False, builtin_filename=None):
         super(Definitions, self).__init__()
         self.builtin = {}
-        self.user = {}
+        self.user = UserDefinitions()
 
         self.definitions_cache = {}
         self.lookup_cache = {}
+        self.formats_cache = {}
         self.proxy = defaultdict(set)
+        self.history = History()
         self.now = 0    # increments whenever something is updated
+        # the names of the changed definitions, most recently changed
+        # last, and when they changed; changes before changes_start are
+        # not known
+        self.changes = OrderedDict()
+        self.changes_start = 0
 
         if add_builtin:
             from mathics.builtin import modules, contribute
@@ -86,8 +93,8 @@ class Definitions(object):
             for name in self.user:
                 if name.startswith('Global`'):
                     raise ValueError("autoload defined %s." % name)
-            self.builtin.update(self.user)
-            self.user = {}
+            self.builtin.update(self.user.items())
+            self.user = UserDefinitions()
             self.clear_cache()
 
     def clear_cache(self, name=None):
@@ -97,6 +104,9 @@ class Definitions(object):
         # user definition is updated) or if the lookup rules change and we could end up at a completely different
         # Definition.
 
+        # the formats cache (self.formats_cache) caches the sorted format rules get_formats() computes from a
+        # Definition(), so it has to be cleared whenever the definitions cache is.
+
         # the lookup cache (self.lookup_cache) caches what lookup_name() does. we only need to update this if some
         # change happens that might change the result lookup_name() calculates. we do not need to change it if a
         # Definition() changes.
@@ -109,20 +119,31 @@ class Definitions(object):
         if name is None:
             self.definitions_cache = {}
             self.lookup_cache = {}
+            self.formats_cache = {}
             self.proxy = defaultdict(set)
         else:
             definitions_cache = self.definitions_cache
             lookup_cache = self.lookup_cache
+            formats_cache = self.formats_cache
             tail = strip_context(name)
             for k in self.proxy.pop(tail, []):
                 definitions_cache.pop(k, None)
                 lookup_cache.pop(k, None)
+                formats_cache.pop(k, None)
 
     def clear_definitions_cache(self, name):
         definitions_cache = self.definitions_cache
+        formats_cache = self.formats_cache
         tail = strip_context(name)
         for k in self.proxy.pop(tail, []):
             definitions_cache.pop(k, None)
+            formats_cache.pop(k, None)
+
+    @property
+    def memo_cache(self):
+        # results may depend on user definitions, so that every session
+        # has a cache of its own
+        return self.user.memo_cache
 
     def last_changed(self, expr):
         # timestamp for the most recently changed part of a given expression.
@@ -137,6 +158,9 @@ class Definitions(object):
                 # must be system symbol
                 symb.changed = 0
                 return 0
+        if expr.is_atom() and hasattr(expr, 'get_last_changed'):
+            # atoms holding expressions, like associations
+            return expr.get_last_changed(self)
         result = 0
         head = expr.get_head()
         head_changed = self.last_changed(head)
@@ -368,9 +392,29 @@ class Definitions(object):
         return self.get_definition(name).upvalues
 
     def get_formats(self, name, format=''):
+        '''
+        Returns the sorted format rules of name for the given format,
+        including the rules for all formats. The result is cached until the
+        definition of name changes and must not be modified.
+        '''
+        cached = self.formats_cache.get(name)
+        if cached is None:
+            cached = self.formats_cache[name] = {}
+            # name need not have a definition yet, so register it here for
+            # clear_cache() and clear_definitions_cache()
+            self.proxy[strip_context(name)].add(name)
+        else:
+            result = cached.get(format)
+            if result is not None:
+                return result
         formats = self.get_definition(name).formatvalues
         result = formats.get(format, []) + formats.get('', [])
-        result.sort()
+        if result:
+            result.sort()
+        else:
+            # most symbols, e.g. List, have no format rules at all
+            result = ()
+        cached[format] = result
         return result
 
     def get_nvalues(self, name):
@@ -409,6 +453,25 @@ class Definitions(object):
     def mark_changed(self, definition):
         self.now += 1
         definition.changed = self.now
+        self.user.mark_changed(definition.name)
+        changes = self.changes
+        changes.pop(definition.name, None)
+        changes[definition.name] = self.now
+
+    def get_changed_names(self, since):
+        '''
+        The names of the definitions changed after the time since, or None
+        if they are not known. Takes time in the number of these names.
+        '''
+        if since < self.changes_start:
+            return None
+        changes = self.changes
+        names = []
+        for name in reversed(changes):
+            if changes[name] <= since:
+                break
+            names.append(name)
+        return names
 
     def reset_user_definition(self, name):
         assert not isinstance(name, Symbol)
@@ -495,26 +558,71 @@ class Definitions(object):
         return self.get_definition(self.lookup_name(name)).options
 
     def reset_user_definitions(self):
-        self.user = {}
+        # keep the store, so that the definitions are removed from it too
+        self.user.clear()
+        self.history.clear()
         self.clear_cache()
         # TODO changed
 
     def get_user_definitions(self):
+        data = (dict(self.user.items()), self.history)
         if six.PY2:
-            return base64.encodestring(pickle.dumps(self.user, protocol=2)).decode('ascii')
+            return base64.encodestring(pickle.dumps(data, protocol=2)).decode('ascii')
         else:
-            return base64.encodebytes(pickle.dumps(self.user, protocol=2)).decode('ascii')
+            return base64.encodebytes(pickle.dumps(data, protocol=2)).decode('ascii')
 
     def set_user_definitions(self, definitions):
         if definitions:
             if six.PY2:
-                self.user = pickle.loads(base64.decodestring(definitions.encode('ascii')))
+                data = pickle.loads(base64.decodestring(definitions.encode('ascii')))
             else:
-                self.user = pickle.loads(base64.decodebytes(definitions.encode('ascii')))
+                data = pickle.loads(base64.decodebytes(definitions.encode('ascii')))
+            if isinstance(data, tuple):
+                user, self.history = data
+            else:
+                # stored without history
+                user, self.history = data, History()
+            self.user = UserDefinitions(definitions=user)
         else:
-            self.user = {}
+            self.user = UserDefinitions()
+            self.history = History()
         self.clear_cache()
 
+    def set_user(self, user, history):
+        '''
+        Uses the user definitions user and the history history. Only the
+        caches for the names defined by the old or the new user definitions
+        are cleared, those of the builtins stay.
+        '''
+        names = set(self.user.keys())
+        names.update(user.keys())
+        self.user = user
+        self.history = history
+        for name in names:
+            self.clear_cache(name)
+        self.now += 1
+        self.changes = OrderedDict()
+        self.changes_start = self.now
+
+    def set_user_store(self, store):
+        '''
+        Uses the user definitions and history in store. Definitions are
+        only loaded from store when they are first used.
+        '''
+        self.set_user(UserDefinitions(store=store),
+                      store.load_history() or History())
+
+    def save_user_definitions(self):
+        '''
+        Writes the user definitions changed since set_user_store() and the
+        history, if it changed, back to the store.
+        '''
+        store = self.user.store
+        self.user.save()
+        if self.history.dirty:
+            self.history.dirty = False
+            store.save_history(self.history)
+
     def get_ownvalue(self, name):
         ownvalues = self.get_definition(self.lookup_name(name)).ownvalues
         if ownvalues:
@@ -573,6 +681,235 @@ class Definitions(object):
             history_length = 100
         return history_length
 
+    def get_output_size_limit(self):
+        from mathics.settings import OUTPUT_SIZE_LIMIT
+        return self.get_config_value('$OutputSizeLimit', OUTPUT_SIZE_LIMIT)
+
+
+class UserDefinitions(object):
+    """
+    The user definitions by full name. Definitions in store are loaded on
+    first access, and the names of definitions changed or removed since
+    are remembered, so that save() only writes these back to store.
+
+    A store provides get_names(), load(name) and save(changes), where
+    changes maps names to the new definition or to None for removed ones.
+    """
+
+    def __init__(self, store=None, definitions=None):
+        self.store = store
+        self.loaded = dict(definitions) if definitions else {}
+        self.names = set(self.loaded)
+        if store is not None:
+            self.names.update(store.get_names())
+        self.dirty = set()
+        self.memo_cache = MemoCache()
+
+    def get(self, name, default=None):
+        definition = self.loaded.get(name)
+        if definition is None:
+            if name not in self.names:
+                return default
+            definition = self.store.load(name)
+            if definition is None:
+                # removed from store in the meantime
+                self.names.discard(name)
+                return default
+            self.loaded[name] = definition
+        return definition
+
+    def __getitem__(self, name):
+        definition = self.get(name)
+        if definition is None:
+            raise KeyError(name)
+        return definition
+
+    def __setitem__(self, name, definition):
+        self.loaded[name] = definition
+        self.names.add(name)
+        self.dirty.add(name)
+
+    def __delitem__(self, name):
+        if name not in self.names:
+            raise KeyError(name)
+        self.loaded.pop(name, None)
+        self.names.discard(name)
+        self.dirty.add(name)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __iter__(self):
+        return iter(list(self.names))
+
+    def __len__(self):
+        return len(self.names)
+
+    def keys(self):
+        return list(self.names)
+
+    def items(self):
+        return [(name, self[name]) for name in self.keys()]
+
+    def clear(self):
+        self.dirty.update(self.names)
+        self.loaded = {}
+        self.names = set()
+
+    def mark_changed(self, name):
+        if name in self.names:
+            self.dirty.add(name)
+
+    def save(self):
+        if self.store is None:
+            return
+        changes = {}
+        for name in self.dirty:
+            if name not in self.names:
+                changes[name] = None
+            elif name in self.loaded:
+                changes[name] = self.loaded[name]
+        self.store.save(changes)
+        self.dirty = set()
+
+    def __getstate__(self):
+        # cached results are not kept with saved sessions
+        state = self.__dict__.copy()
+        del state['memo_cache']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.memo_cache = MemoCache()
+
+
+class History(object):
+    """
+    The In/Out history, as input and output expressions by line number.
+    Entries are kept in the order they were added, so that adding, looking
+    up and evicting an entry all take constant time.
+    """
+
+    dirty = False   # changed since it was last saved
+
+    def __init__(self):
+        self.entries = OrderedDict()    # line -> [input, output]
+
+    def add_input(self, line, expr):
+        # a line evaluated again (e.g. by Manipulate) becomes the newest one
+        self.entries.pop(line, None)
+        self.entries[line] = [expr, None]
+        self.dirty = True
+
+    def add_output(self, line, expr):
+        entry = self.entries.get(line)
+        if entry is None:
+            entry = self.entries[line] = [None, None]
+        entry[1] = expr
+        self.dirty = True
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.dirty = True
+
+    def get_input(self, line):
+        entry = self.entries.get(line)
+        return entry[0] if entry is not None else None
+
+    def get_output(self, line):
+        entry = self.entries.get(line)
+        return entry[1] if entry is not None else None
+
+    def trim(self, length):
+        'Removes the oldest entries until at most length are left.'
+        entries = self.entries
+        while len(entries) > length:
+            entries.popitem(last=False)
+            self.dirty = True
+
+    def get_rules(self, name):
+        'Returns the entries of In or Out as rules, latest line first.'
+        from mathics.core.expression import Integer
+        from mathics.core.rules import Rule
+
+        if name == 'System`In':
+            index = 0
+        elif name == 'System`Out':
+            index = 1
+        else:
+            return []
+        rules = []
+        for line in sorted(self.entries, reverse=True):
+            expr = self.entries[line][index]
+            if expr is not None:
+                rules.append(Rule(Expression(name, Integer(line)), expr))
+        return rules
+
+
+class _MemoKey(object):
+    __slots__ = ('name', 'expr', 'hash')
+
+    def __init__(self, name, expr):
+        self.name = name
+        self.expr = expr
+        self.hash = hash((name, expr))
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        # same() tells apart e.g. 1 and 1.0, which compare equal
+        return self.name == other.name and self.expr.same(other.expr)
+
+
+class MemoCache(object):
+    """
+    The results of builtins declared with Builtin.memoize, least recently
+    used ones evicted first. A result is used only as long as no symbol in
+    its expression has changed since it was computed, as told by
+    Definitions.now and Definitions.last_changed(). Every UserDefinitions
+    has a cache of its own.
+    """
+
+    def __init__(self, max_size=None):
+        if max_size is None:
+            from mathics.settings import MEMOIZE_CACHE_SIZE
+            max_size = MEMOIZE_CACHE_SIZE
+        self.max_size = max_size
+        self.entries = OrderedDict()    # key -> (result, now)
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, name, expr):
+        'Returns the key for expr evaluated by name, or None if expr cannot be cached.'
+        try:
+            return _MemoKey(name, expr)
+        except (NotImplementedError, TypeError):
+            return None
+
+    def get(self, key, definitions):
+        'Returns (True, result) for a valid cached result and (False, None) otherwise.'
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            if definitions.last_changed(key.expr) <= entry[1]:
+                self.entries[key] = entry
+                self.hits += 1
+                return True, entry[0]
+        self.misses += 1
+        return False, None
+
+    def put(self, key, result, now):
+        entries = self.entries
+        entries.pop(key, None)
+        entries[key] = (result, now)
+        while len(entries) > self.max_size:
+            entries.popitem(last=False)
+
+    def clear(self):
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
 
 def get_tag_position(pattern, name):
     if pattern.get_name() == name:
@@ -6,13 +6,17 @@ from __future__ import print_function
 from __future__ import absolute_import
 
 import six
-import six.moves.cPickle as pickle
 from six.moves.queue import Queue
 
 import os
 import sys
 from threading import Thread, stack_size as set_thread_stack_size
 
+try:
+    from time import monotonic as clock
+except ImportError:     # Python 2
+    from time import time as clock
+
 from mathics import settings
 from mathics.core.expression import ensure_context, KeyComparable
 
@@ -83,33 +87,37 @@ def set_python_recursion_limit(n):
         raise OverflowError
 
 
-def run_with_timeout_and_stack(request, timeout):
+def run_with_timeout_and_stack(request, timeout, evaluation):
     '''
     interrupts evaluation after a given time period. provides a suitable stack environment.
     '''
 
-    # only use set_thread_stack_size if max recursion depth was changed via the environment variable
-    # MATHICS_MAX_RECURSION_DEPTH. if it is set, we always use a thread, even if timeout is None, in
-    # order to be able to set the thread stack size.
+    # the timeout is cooperative: once the deadline has passed,
+    # evaluation.check_stopped() raises TimeoutInterrupt. so no watchdog
+    # thread is needed, and nothing keeps running after the timeout.
+    if timeout is not None:
+        previous = evaluation.push_deadline(timeout)
+    try:
+        # only use set_thread_stack_size if max recursion depth was changed via the environment variable
+        # MATHICS_MAX_RECURSION_DEPTH. if it is set, we always use a thread in order to be able to set the
+        # thread stack size.
+        if MAX_RECURSION_DEPTH <= settings.DEFAULT_MAX_RECURSION_DEPTH:
+            return request()
 
-    if MAX_RECURSION_DEPTH > settings.DEFAULT_MAX_RECURSION_DEPTH:
         set_thread_stack_size(python_stack_size(MAX_RECURSION_DEPTH))
-    elif timeout is None:
-        return request()
-
-    queue = Queue(maxsize=1)   # stores the result or exception
-    thread = Thread(target=_thread_target, args=(request, queue))
-    thread.start()
-
-    thread.join(timeout)
-    if thread.is_alive():
-        raise TimeoutInterrupt()
-
-    success, result = queue.get()
-    if success:
-        return result
-    else:
-        six.reraise(*result)
+        queue = Queue(maxsize=1)   # stores the result or exception
+        thread = Thread(target=_thread_target, args=(request, queue))
+        thread.start()
+        thread.join()
+
+        success, result = queue.get()
+        if success:
+            return result
+        else:
+            six.reraise(*result)
+    finally:
+        if timeout is not None:
+            evaluation.pop_deadline(previous)
 
 
 class Out(KeyComparable):
@@ -204,13 +212,20 @@ class Evaluation(object):
         self.recursion_depth = 0
         self.timeout = False
         self.stopped = False
+        self.deadline = None    # clock() value at which to time out
         self.out = []
+        # messages issued so far, including those suppressed by Quiet
+        self.message_count = 0
         self.output = output if output else Output()
         self.listeners = {}
         self.options = None
         self.predetermined_out = None
 
         self.quiet_all = False
+        # (symbol, tag) pairs of Internal`$QuietMessages, rebuilt only when
+        # its ownvalue changes
+        self._quiet_messages_key = None
+        self._quiet_messages_index = frozenset()
         self.format = format
         self.catch_interrupt = catch_interrupt
 
@@ -239,7 +254,6 @@ class Evaluation(object):
     def evaluate(self, query, timeout=None):
         'Evaluate an expression.'
         from mathics.core.expression import Symbol, Expression
-        from mathics.core.rules import Rule
 
         self.recursion_depth = 0
         self.timeout = False
@@ -256,8 +270,7 @@ class Evaluation(object):
 
         def evaluate():
             if history_length > 0:
-                self.definitions.add_rule('In', Rule(
-                    Expression('In', line_no), query))
+                self.definitions.history.add_input(line_no, query)
             result = query.evaluate(self)
             if history_length > 0:
                 if self.predetermined_out is not None:
@@ -267,15 +280,15 @@ class Evaluation(object):
                     out_result = result
 
                 stored_result = self.get_stored_result(out_result)
-                self.definitions.add_rule('Out', Rule(
-                    Expression('Out', line_no), stored_result))
+                self.definitions.history.add_output(line_no, stored_result)
             if result != Symbol('Null'):
-                return self.format_output(result, self.format)
+                return self.format_output(
+                    self.limit_output_size(result), self.format)
             else:
                 return None
         try:
             try:
-                result = run_with_timeout_and_stack(evaluate, timeout)
+                result = run_with_timeout_and_stack(evaluate, timeout, self)
             except KeyboardInterrupt:
                 if self.catch_interrupt:
                     exc_result = Symbol('$Aborted')
@@ -317,15 +330,9 @@ class Evaluation(object):
         finally:
             self.stop()
 
-        history_length = self.definitions.get_history_length()
-
-        line = line_no - history_length
-        while line > 0:
-            unset_in = self.definitions.unset('In', Expression('In', line))
-            unset_out = self.definitions.unset('Out', Expression('Out', line))
-            if not (unset_in or unset_out):
-                break
-            line -= 1
+        # $HistoryLength or Quit[] may have changed during the evaluation
+        self.definitions.history.trim(
+            self.definitions.get_history_length())
         return result
 
     def get_stored_result(self, result):
@@ -336,17 +343,33 @@ class Evaluation(object):
             result = result.leaves[0]
 
         # Prevent too large results from being stored, as this can exceed the
-        # DB's max_allowed_packet size
+        # DB's max_allowed_packet size. output_size() stops counting at the
+        # limit, so this does not depend on the size of result.
         max_stored_size = self.output.max_stored_size(settings)
         if max_stored_size is not None:
-            try:
-                data = pickle.dumps(result)
-                if len(data) > max_stored_size:
-                    return Symbol('Null')
-            except (ValueError, pickle.PicklingError):
+            from mathics.builtin.inout import output_size
+
+            if output_size(result, max_stored_size) is None:
                 return Symbol('Null')
         return result
 
+    def limit_output_size(self, result):
+        '''
+        Shortens result if its output would be larger than $OutputSizeLimit
+        or settings.MAX_OUTPUT_LEAVES, before any formatting is done.
+        '''
+        from mathics.builtin.inout import elide_output
+
+        max_size = self.definitions.get_output_size_limit()
+        if max_size is None:
+            return result
+        elided = elide_output(
+            result, max_size, settings.MAX_OUTPUT_LEAVES,
+            min(max_size, settings.OUTPUT_SAMPLE_SIZE))
+        if elided is not result:
+            self.message('$OutputSizeLimit', 'elided')
+        return elided
+
     def stop(self):
         self.stopped = True
 
@@ -395,6 +418,26 @@ class Evaluation(object):
             return []
         return value.leaves
 
+    def is_quiet(self, symbol, tag):
+        '''
+        Returns whether the message symbol::tag is currently suppressed.
+        symbol must be fully qualified.
+        '''
+        if self.quiet_all:
+            return True
+        ownvalues = self.definitions.get_definition(
+            'Internal`$QuietMessages').ownvalues
+        key = ownvalues[0] if ownvalues else None
+        if key is not self._quiet_messages_key:
+            index = set()
+            for leaf in self.get_quiet_messages():
+                if leaf.has_form('MessageName', 2):
+                    index.add((leaf.leaves[0].get_name(),
+                               leaf.leaves[1].get_string_value()))
+            self._quiet_messages_index = frozenset(index)
+            self._quiet_messages_key = key
+        return (symbol, tag) in self._quiet_messages_index
+
     def message(self, symbol, tag, *args):
         from mathics.core.expression import (String, Symbol, Expression,
                                              from_python)
@@ -402,13 +445,15 @@ class Evaluation(object):
         # Allow evaluation.message('MyBuiltin', ...) (assume
         # System`MyBuiltin)
         symbol = ensure_context(symbol)
-        quiet_messages = set(self.get_quiet_messages())
-
-        pattern = Expression('MessageName', Symbol(symbol), String(tag))
+        self.message_count += 1
 
-        if pattern in quiet_messages or self.quiet_all:
+        # check suppression before building or formatting anything, as
+        # Quiet[] inside numerical loops can discard thousands of messages
+        if self.is_quiet(symbol, tag):
             return
 
+        pattern = Expression('MessageName', Symbol(symbol), String(tag))
+
         # Shorten the symbol's name according to the current context
         # settings. This makes sure we print the context, if it would
         # be necessary to find the symbol that this message is
@@ -480,6 +525,29 @@ class Evaluation(object):
     def check_stopped(self):
         if self.stopped:
             raise TimeoutInterrupt
+        deadline = self.deadline
+        if deadline is not None and clock() > deadline:
+            raise TimeoutInterrupt
+
+    def push_deadline(self, timeout):
+        '''
+        Makes check_stopped() time out after timeout seconds, unless an
+        earlier deadline is set. Returns the previous deadline, which has to
+        be restored with pop_deadline().
+        '''
+        previous = self.deadline
+        deadline = clock() + timeout
+        if previous is None or deadline < previous:
+            self.deadline = deadline
+        return previous
+
+    def pop_deadline(self, previous):
+        self.deadline = previous
+
+    def timed_out(self):
+        'Returns whether the evaluation was stopped or its deadline passed.'
+        return self.stopped or (
+            self.deadline is not None and clock() > self.deadline)
 
     def inc_recursion_depth(self):
         self.check_stopped()
@@ -165,6 +165,17 @@ class BaseExpression(KeyComparable):
     def get_atoms(self, include_heads=True):
         return []
 
+    def get_atom_set(self):
+        """
+        Returns the set of atoms in self, heads included, or None if they
+        cannot be hashed.
+        """
+
+        try:
+            return frozenset(self.get_atoms())
+        except (NotImplementedError, TypeError):
+            return None
+
     def get_name(self):
         " Returns symbol's name if Symbol instance "
 
@@ -190,6 +201,11 @@ class BaseExpression(KeyComparable):
     def get_leaves(self):
         return []
 
+    def get_list_expression(self):
+        " Returns the List an array atom like SparseArray stands for "
+
+        return None
+
     def get_int_value(self):
         return None
 
@@ -246,6 +262,11 @@ class BaseExpression(KeyComparable):
             elif l2 is not None and level > l2:
                 return self, False
 
+        # rule indices only hand out the rules that can match self
+        get_rules = getattr(rules, 'get_rules', None)
+        if get_rules is not None:
+            rules = get_rules(self)
+
         for rule in rules:
             result = rule.apply(self, evaluation, fully=False)
             if result is not None:
@@ -511,6 +532,8 @@ class Expression(BaseExpression):
         self.head = head
         self.leaves = [from_python(leaf) for leaf in leaves]
         self._sequences = None
+        self._head_index = None
+        self._atom_set = None
         return self
 
     def sequences(self):
@@ -520,6 +543,25 @@ class Expression(BaseExpression):
             self._sequences = seq
         return seq
 
+    def get_leaves_by_head(self):
+        """
+        Returns a dictionary from head names to the leaves with that head,
+        in order. Leaves with non-symbol heads are found under ''.
+        """
+
+        leaves = self.leaves
+        index = self._head_index
+        if index is None or index[0] is not leaves:
+            by_head = {}
+            for leaf in leaves:
+                head_name = leaf.get_head_name()
+                if head_name in by_head:
+                    by_head[head_name].append(leaf)
+                else:
+                    by_head[head_name] = [leaf]
+            index = self._head_index = (leaves, by_head)
+        return index[1]
+
     def _flatten_sequence(self, sequence):
         indices = self.sequences()
         if not indices:
@@ -1093,46 +1135,23 @@ class Expression(BaseExpression):
 
             for leaf in self.leaves[0].get_leaves():
                 result.append(leaf.boxes_to_xml(**options))
-            return '<mrow>%s</mrow>' % ' '.join(result)
+            return ''.join(('<mrow>', ' '.join(result), '</mrow>'))
         else:
+            tag, count = MATHML_BOX_TAGS.get(name, (None, None))
+            if tag is None or len(self.leaves) != count:
+                raise BoxError(self, 'xml')
             options = options.copy()
             options['inside_row'] = True
-            if name == 'System`SuperscriptBox' and len(self.leaves) == 2:
-                return '<msup>%s %s</msup>' % (
-                    self.leaves[0].boxes_to_xml(**options),
-                    self.leaves[1].boxes_to_xml(**options))
-            if name == 'System`SubscriptBox' and len(self.leaves) == 2:
-                return '<msub>%s %s</msub>' % (
-                    self.leaves[0].boxes_to_xml(**options),
-                    self.leaves[1].boxes_to_xml(**options))
-            if name == 'System`SubsuperscriptBox' and len(self.leaves) == 3:
-                return '<msubsup>%s %s %s</msubsup>' % (
-                    self.leaves[0].boxes_to_xml(**options),
-                    self.leaves[1].boxes_to_xml(**options),
-                    self.leaves[2].boxes_to_xml(**options))
-            elif name == 'System`FractionBox' and len(self.leaves) == 2:
-                return '<mfrac>%s %s</mfrac>' % (
-                    self.leaves[0].boxes_to_xml(**options),
-                    self.leaves[1].boxes_to_xml(**options))
-            elif name == 'System`SqrtBox' and len(self.leaves) == 1:
-                return '<msqrt>%s</msqrt>' % (
-                    self.leaves[0].boxes_to_xml(**options))
-            else:
-                raise BoxError(self, 'xml')
+            return ''.join((
+                '<', tag, '>',
+                ' '.join([leaf.boxes_to_xml(**options)
+                          for leaf in self.leaves]),
+                '</', tag, '>'))
 
     def boxes_to_tex(self, **options):
         from mathics.builtin import box_constructs
         from mathics.builtin.base import BoxConstructError
 
-        def block(tex, only_subsup=False):
-            if len(tex) == 1:
-                return tex
-            else:
-                if not only_subsup or '_' in tex or '^' in tex:
-                    return '{%s}' % tex
-                else:
-                    return tex
-
         is_style, options = self.process_style_box(options)
         if is_style:
             return self.leaves[0].boxes_to_tex(**options)
@@ -1148,34 +1167,10 @@ class Expression(BaseExpression):
             self.leaves[0].get_head_name() == 'System`List'):
             return ''.join([leaf.boxes_to_tex(**options)
                             for leaf in self.leaves[0].get_leaves()])
-        elif name == 'System`SuperscriptBox' and len(self.leaves) == 2:
-            tex1 = self.leaves[0].boxes_to_tex(**options)
-            sup_string = self.leaves[1].get_string_value()
-            if sup_string == '\u2032':
-                return "%s'" % tex1
-            elif sup_string == '\u2032\u2032':
-                return "%s''" % tex1
-            else:
-                return '%s^%s' % (
-                    block(tex1, True),
-                    block(self.leaves[1].boxes_to_tex(**options)))
-        elif name == 'System`SubscriptBox' and len(self.leaves) == 2:
-            return '%s_%s' % (
-                block(self.leaves[0].boxes_to_tex(**options), True),
-                block(self.leaves[1].boxes_to_tex(**options)))
-        elif name == 'System`SubsuperscriptBox' and len(self.leaves) == 3:
-            return '%s_%s^%s' % (
-                block(self.leaves[0].boxes_to_tex(**options), True),
-                block(self.leaves[1].boxes_to_tex(**options)),
-                block(self.leaves[2].boxes_to_tex(**options)))
-        elif name == 'System`FractionBox' and len(self.leaves) == 2:
-            return '\\frac{%s}{%s}' % (
-                self.leaves[0].boxes_to_tex(**options),
-                self.leaves[1].boxes_to_tex(**options))
-        elif name == 'System`SqrtBox' and len(self.leaves) == 1:
-            return '\\sqrt{%s}' % self.leaves[0].boxes_to_tex(**options)
-        else:
+        render, count = TEX_BOX_RENDERERS.get(name, (None, None))
+        if render is None or len(self.leaves) != count:
             raise BoxError(self, 'tex')
+        return render(self.leaves, options)
 
     def default_format(self, evaluation, form):
         return '%s[%s]' % (self.head.default_format(evaluation, form),
@@ -1270,15 +1265,29 @@ class Expression(BaseExpression):
                     leaves = [Expression('List', *func_params), body] + \
                         self.leaves[2:]
 
-        if not vars:  # might just be a symbol set via Set[] we looked up here
+        # might just be a symbol set via Set[] we looked up here
+        if not vars and not options:
             return self.shallow_copy()
 
-        return Expression(
+        expr = Expression(
             self.head.replace_vars(
                 vars, options=options, in_scoping=in_scoping),
             *[leaf.replace_vars(vars, options=options, in_scoping=in_scoping)
               for leaf in leaves])
 
+        # substitute the values of options matched by OptionsPattern
+        if options and expr.has_form('OptionValue', 1):
+            name = expr.leaves[0].get_name()
+            if not name:
+                name = expr.leaves[0].get_string_value()
+                if name:
+                    name = ensure_context(name)
+            if name:
+                value = options.get(name)
+                if value is not None:
+                    return value
+        return expr
+
     def replace_slots(self, slots, evaluation):
         if self.head.get_name() == 'System`Slot':
             if len(self.leaves) != 1:
@@ -1332,9 +1341,17 @@ class Expression(BaseExpression):
                         item.append(leaf)
         if dim is None:
             return False, self
-        else:
-            leaves = [Expression(self.head, *item) for item in items]
-            return True, Expression(head, *leaves)
+        if head.get_name() == 'System`List':
+            # array atoms thread along with lists like the lists they
+            # stand for
+            arrays = [leaf.get_list_expression() for leaf in self.leaves]
+            if any(array is not None for array in arrays):
+                return Expression(self.head, *[
+                    leaf if array is None else array
+                    for leaf, array in zip(self.leaves, arrays)]).thread(
+                        evaluation, head)
+        leaves = [Expression(self.head, *item) for item in items]
+        return True, Expression(head, *leaves)
 
     def is_numeric(self):
         return (self.head.get_name() in system_symbols(
@@ -1376,6 +1393,13 @@ class Expression(BaseExpression):
             atoms.extend(leaf.get_atoms())
         return atoms
 
+    def get_atom_set(self):
+        cached = self._atom_set
+        if cached is None or cached[0] is not self.leaves:
+            cached = self._atom_set = (
+                self.leaves, super(Expression, self).get_atom_set())
+        return cached[1]
+
     def __hash__(self):
         return hash(('Expression', self.head) + tuple(self.leaves))
 
@@ -2138,6 +2162,90 @@ extra_operators = set((',', '(', ')', '[', ']', '{', '}',
                        '\u301a', '\u301b', '\u00d7', '\u2032',
                        '\u2032\u2032', ' ', '\u2062', '\u222b', '\u2146'))
 
+# MathML elements and number of leaves of the basic boxes
+MATHML_BOX_TAGS = {
+    'System`SuperscriptBox': ('msup', 2),
+    'System`SubscriptBox': ('msub', 2),
+    'System`SubsuperscriptBox': ('msubsup', 3),
+    'System`FractionBox': ('mfrac', 2),
+    'System`SqrtBox': ('msqrt', 1),
+}
+
+
+def _tex_block(tex, only_subsup=False):
+    if len(tex) == 1:
+        return tex
+    else:
+        if not only_subsup or '_' in tex or '^' in tex:
+            return ''.join(('{', tex, '}'))
+        else:
+            return tex
+
+
+def _superscript_to_tex(leaves, options):
+    base = leaves[0].boxes_to_tex(**options)
+    if leaves[1].get_string_value() in ('\u2032', '\u2032\u2032'):
+        return base + leaves[1].boxes_to_tex(**options)
+    return ''.join((_tex_block(base, True), '^',
+                    _tex_block(leaves[1].boxes_to_tex(**options))))
+
+
+def _subscript_to_tex(leaves, options):
+    return ''.join((_tex_block(leaves[0].boxes_to_tex(**options), True), '_',
+                    _tex_block(leaves[1].boxes_to_tex(**options))))
+
+
+def _subsuperscript_to_tex(leaves, options):
+    return ''.join((_tex_block(leaves[0].boxes_to_tex(**options), True), '_',
+                    _tex_block(leaves[1].boxes_to_tex(**options)), '^',
+                    _tex_block(leaves[2].boxes_to_tex(**options))))
+
+
+def _fraction_to_tex(leaves, options):
+    return ''.join(('\\frac{', leaves[0].boxes_to_tex(**options), '}{',
+                    leaves[1].boxes_to_tex(**options), '}'))
+
+
+def _sqrt_to_tex(leaves, options):
+    return ''.join(('\\sqrt{', leaves[0].boxes_to_tex(**options), '}'))
+
+
+# TeX renderers and number of leaves of the basic boxes
+TEX_BOX_RENDERERS = {
+    'System`SuperscriptBox': (_superscript_to_tex, 2),
+    'System`SubscriptBox': (_subscript_to_tex, 2),
+    'System`SubsuperscriptBox': (_subsuperscript_to_tex, 3),
+    'System`FractionBox': (_fraction_to_tex, 2),
+    'System`SqrtBox': (_sqrt_to_tex, 1),
+}
+
+# Opening tags of operators with special spacing in MathML
+MATHML_OPERATOR_TAGS = {
+    '\u2146': '<mo form="prefix" lspace="0.2em" rspace="0">',
+    '\u2062': '<mo form="prefix" lspace="0" rspace="0.2em">',
+}
+
+# TeX for strings with a fixed rendering
+TEX_STRINGS = {
+    '\u2032': "'",
+    '\u2032\u2032': "''",
+    '\u2062': ' ',
+    '\u221e': r'\infty ',
+    '\u00d7': r'\times ',
+    '\u301a': r'\left[\left[',
+    '\u301b': r'\right]\right]',
+    ',': ',',
+    ', ': ', ',
+    '\u222b': r'\int',
+    '\u2146': r'\, d',
+    '\u2211': r'\sum',
+    '\u220f': r'\prod',
+}
+TEX_STRINGS.update(
+    (bracket, r'\left' + encode_tex(bracket)) for bracket in '([{')
+TEX_STRINGS.update(
+    (bracket, r'\right' + encode_tex(bracket)) for bracket in ')]}')
+
 
 class String(Atom):
     def __new__(cls, value):
@@ -2157,94 +2265,45 @@ class String(Atom):
 
     def boxes_to_xml(self, show_string_characters=False, **options):
         from mathics.core.parser import is_symbol_name
-        from mathics.builtin import builtins
-
-        operators = set()
-        for name, builtin in six.iteritems(builtins):
-            operator = builtin.get_operator_display()
-            if operator is not None:
-                operators.add(operator)
+        from mathics.builtin import display_operators
 
         text = self.value
 
-        def render(format, string):
-            return format % encode_mathml(string)
-
         if text.startswith('"') and text.endswith('"'):
             if show_string_characters:
-                return render('<ms>%s</ms>', text[1:-1])
+                tags = ('<ms>', '</ms>')
             else:
-                return render('<mtext>%s</mtext>', text[1:-1])
+                tags = ('<mtext>', '</mtext>')
+            text = text[1:-1]
         elif text and ('0' <= text[0] <= '9' or text[0] == '.'):
-            return render('<mn>%s</mn>', text)
+            tags = ('<mn>', '</mn>')
+        elif text in display_operators or text in extra_operators:
+            tags = (MATHML_OPERATOR_TAGS.get(text, '<mo>'), '</mo>')
+        elif is_symbol_name(text):
+            tags = ('<mi>', '</mi>')
         else:
-            if text in operators or text in extra_operators:
-                if text == '\u2146':
-                    return render(
-                        '<mo form="prefix" lspace="0.2em" rspace="0">%s</mo>', text)
-                if text == '\u2062':
-                    return render(
-                        '<mo form="prefix" lspace="0" rspace="0.2em">%s</mo>', text)
-                return render('<mo>%s</mo>', text)
-            elif is_symbol_name(text):
-                return render('<mi>%s</mi>', text)
-            else:
-                return render('<mtext>%s</mtext>', text)
+            tags = ('<mtext>', '</mtext>')
+        return ''.join((tags[0], encode_mathml(text), tags[1]))
 
     def boxes_to_tex(self, show_string_characters=False, **options):
-        from mathics.builtin import builtins
-
-        operators = set()
-        for name, builtin in six.iteritems(builtins):
-            operator = builtin.get_operator_display()
-            if operator is not None:
-                operators.add(operator)
-
         text = self.value
 
-        def render(format, string, in_text=False):
-            return format % encode_tex(string, in_text)
-
         if text.startswith('"') and text.endswith('"'):
             if show_string_characters:
-                return render(r'\text{"%s"}', text[1:-1], in_text=True)
+                tags = ('\\text{"', '"}')
             else:
-                return render(r'\text{%s}', text[1:-1], in_text=True)
+                tags = ('\\text{', '}')
+            return ''.join((tags[0], encode_tex(text[1:-1], True), tags[1]))
         elif text and text[0] in '0123456789-.':
-            return render('%s', text)
+            return encode_tex(text)
+
+        result = TEX_STRINGS.get(text)
+        if result is not None:
+            return result
+        elif len(text) > 1:
+            return ''.join(('\\text{', encode_tex(text, True), '}'))
         else:
-            if text == '\u2032':
-                return "'"
-            elif text == '\u2032\u2032':
-                return "''"
-            elif text == '\u2062':
-                return ' '
-            elif text == '\u221e':
-                return r'\infty '
-            elif text == '\u00d7':
-                return r'\times '
-            elif text in ('(', '[', '{'):
-                return render(r'\left%s', text)
-            elif text in (')', ']', '}'):
-                return render(r'\right%s', text)
-            elif text == '\u301a':
-                return r'\left[\left['
-            elif text == '\u301b':
-                return r'\right]\right]'
-            elif text == ',' or text == ', ':
-                return text
-            elif text == '\u222b':
-                return r'\int'
-            elif text == '\u2146':
-                return r'\, d'
-            elif text == '\u2211':
-                return r'\sum'
-            elif text == '\u220f':
-                return r'\prod'
-            elif len(text) > 1:
-                return render(r'\text{%s}', text, in_text=True)
-            else:
-                return render('%s', text)
+            return encode_tex(text)
 
     def atom_to_boxes(self, f, evaluation):
         return String('"' + six.text_type(self.value) + '"')
@@ -4,7 +4,8 @@
 from __future__ import absolute_import
 
 from mathics.core.parser.util import (
-    parse, parse_builtin_rule)
+    parse, parse_builtin_rule, parse_generic)
+from mathics.core.parser.convert import convert_generic
 from mathics.core.parser.tokeniser import is_symbol_name
 from mathics.core.parser.errors import (
     InvalidSyntaxError, IncompleteSyntaxError, ScanError, TranslateError)
@@ -158,6 +158,23 @@ class Converter(GenericConverter):
         result = GenericConverter.do_convert(self, node)
         return getattr(self, '_make_' + result[0])(*result[1:])
 
+    def convert_generic(self, generic, definitions):
+        '''
+        Builds the expression for the output of GenericConverter.do_convert,
+        looking up symbols in definitions.
+        '''
+        self.definitions = definitions
+        result = self._build(generic)
+        self.definitions = None
+        return result
+
+    def _build(self, generic):
+        if generic[0] == 'Expression':
+            head = self._build(generic[1])
+            return ma.Expression(head, *[self._build(child)
+                                         for child in generic[2]])
+        return getattr(self, '_make_' + generic[0])(*generic[1:])
+
     def _make_Symbol(self, s):
         return ma.Symbol(s)
 
@@ -194,3 +211,5 @@ class Converter(GenericConverter):
 
 converter = Converter()
 convert = converter.convert
+convert_generic = converter.convert_generic
+generic_converter = GenericConverter()
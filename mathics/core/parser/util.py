@@ -7,7 +7,7 @@ from __future__ import unicode_literals
 import six
 
 from mathics.core.parser.parser import Parser
-from mathics.core.parser.convert import convert
+from mathics.core.parser.convert import convert, generic_converter
 from mathics.core.parser.feed import SingleLineFeeder
 from mathics.core.expression import ensure_context
 
@@ -29,6 +29,20 @@ def parse(definitions, feeder):
         return None
 
 
+def parse_generic(feeder):
+    '''
+    Parse input without looking up symbols. The result is made of tuples,
+    lists, strings and numbers only and can be turned into an expression
+    with convert_generic, using the definitions (and $Context) current at
+    that time.
+    '''
+    ast = parser.parse(feeder)
+    if ast is not None:
+        return generic_converter.do_convert(ast)
+    else:
+        return None
+
+
 class SystemDefinitions(object):
     """
     Dummy Definitions object that puts every unqualified symbol in
@@ -5,6 +5,9 @@
 from __future__ import unicode_literals
 from __future__ import absolute_import
 
+import weakref
+from collections import OrderedDict
+
 from mathics.core.expression import (Expression, system_symbols,
                                      ensure_context)
 from mathics.core.util import subsets, subranges, permutations
@@ -29,6 +32,64 @@ def Pattern_create(expr):
         return ExpressionPattern(expr)
 
 
+class _PatternKey(object):
+    __slots__ = ('expr', 'hash')
+
+    def __init__(self, expr):
+        self.expr = expr
+        self.hash = hash(expr)
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        # same() tells apart e.g. 1 and 1.0, which compare equal
+        return self.expr.same(other.expr)
+
+
+class PatternCache(object):
+    """
+    Compiled patterns by the structure of their expressions. Compiling a
+    pattern does not depend on any definitions, so the cache is shared by
+    all of them; matching must therefore not change a pattern, as
+    attributes such as Orderless may differ between uses. Patterns in use
+    are found through weak references, the most recently created ones are
+    also kept alive, up to max_size.
+    """
+
+    def __init__(self, max_size=None):
+        if max_size is None:
+            from mathics.settings import PATTERN_CACHE_SIZE
+            max_size = PATTERN_CACHE_SIZE
+        self.max_size = max_size
+        self.recent = OrderedDict()     # key -> pattern
+        self.live = weakref.WeakValueDictionary()
+
+    def get(self, expr):
+        try:
+            key = _PatternKey(expr)
+        except (NotImplementedError, TypeError):
+            return Pattern_create(expr)
+        recent = self.recent
+        pattern = recent.pop(key, None)
+        if pattern is None:
+            pattern = self.live.get(key)
+            if pattern is None:
+                pattern = Pattern_create(expr)
+                self.live[key] = pattern
+        recent[key] = pattern
+        while len(recent) > self.max_size:
+            recent.popitem(last=False)
+        return pattern
+
+    def clear(self):
+        self.recent = OrderedDict()
+        self.live = weakref.WeakValueDictionary()
+
+
+pattern_cache = PatternCache()
+
+
 class StopGenerator(Exception):
     def __init__(self, value=None):
         self.value = value
@@ -45,6 +106,11 @@ class StopGenerator_Pattern(StopGenerator):
 class Pattern(object):
     create = staticmethod(Pattern_create)
 
+    @staticmethod
+    def create_cached(expr):
+        'Like create, but reuses the pattern compiled for the same expr.'
+        return pattern_cache.get(expr)
+
     def match(self, yield_func, expression, vars, evaluation, head=None,
               leaf_index=None, leaf_count=None, fully=True, wrap_oneid=True):
         raise NotImplementedError
@@ -116,7 +182,12 @@ class Pattern(object):
         return []
 
     def get_match_candidates_count(
-            self, leaves, expression, attributes, evaluation, vars={}):
+            self, leaves, expression, attributes, evaluation, vars={},
+            limit=None):
+        """
+        Counts the possible leaves that could match the pattern. Counting
+        may stop once limit candidates were found.
+        """
         return len(self.get_match_candidates(leaves, expression, attributes, evaluation, vars))
 
 
@@ -134,6 +205,9 @@ class AtomPattern(Pattern):
             # yield vars, None
             yield_func(vars, None)
 
+    def does_match(self, expression, evaluation, vars=None, fully=True):
+        return expression.same(self.atom)
+
     def get_match_candidates(self, leaves, expression, attributes, evaluation, vars={}):
         return [leaf for leaf in leaves if leaf.same(self.atom)]
 
@@ -141,6 +215,27 @@ class AtomPattern(Pattern):
         return (1, 1)
 
 
+def get_leaves_with_head(leaves, expression, head_name):
+    """
+    Returns those of leaves, a list of leaves of expression, that have the
+    head head_name. All leaves of expression are looked up in its index.
+    """
+
+    if not expression.is_atom() and leaves is expression.leaves:
+        return expression.get_leaves_by_head().get(head_name, [])
+    return [leaf for leaf in leaves if leaf.get_head_name() == head_name]
+
+
+# patterns matching sequences without looking at the order of their leaves
+_ORDER_BLIND_HEADS = system_symbols(
+    'Blank', 'BlankSequence', 'BlankNullSequence')
+
+
+# heads for which leaves may match out of order, grouped or wrapped
+_LEAFWISE_EXCLUDED_ATTRIBUTES = system_symbols(
+    'Flat', 'Orderless', 'OneIdentity')
+
+
 # class StopGenerator_ExpressionPattern_match(StopGenerator):
 #    pass
 
@@ -155,21 +250,17 @@ class ExpressionPattern(Pattern):
         attributes = self.head.get_attributes(evaluation.definitions)
         if 'System`Flat' not in attributes:
             fully = True
+        # patterns are shared, so the leaves are not sorted in place
+        leaves = self.get_ordered_leaves(attributes)
         if not expression.is_atom():
-            # don't do this here, as self.get_pre_choices changes the
-            # ordering of the leaves!
-            # if self.leaves:
-            #    next_leaf = self.leaves[0]
-            #    next_leaves = self.leaves[1:]
-
             def yield_choice(pre_vars):
-                next_leaf = self.leaves[0]
-                next_leaves = self.leaves[1:]
-                for leaf in self.leaves:
+                next_leaf = leaves[0]
+                next_leaves = leaves[1:]
+                for leaf in leaves:
                     match_count = leaf.get_match_count()
                     candidates = leaf.get_match_candidates_count(
                         expression.leaves, expression, attributes, evaluation,
-                        pre_vars)
+                        pre_vars, limit=match_count[0])
                     if candidates < match_count[0]:
                         raise StopGenerator_ExpressionPattern_match()
                 # for new_vars, rest in self.match_leaf(    # nopep8
@@ -183,7 +274,7 @@ class ExpressionPattern(Pattern):
                     yield_func, next_leaf, next_leaves,
                     ([], expression.leaves), pre_vars, expression, attributes,
                     evaluation, first=True, fully=fully,
-                    leaf_count=len(self.leaves),
+                    leaf_count=len(leaves),
                     wrap_oneid=expression.get_head_name() != 'System`MakeBoxes')
 
             # for head_vars, _ in self.head.match(expression.get_head(), vars,
@@ -212,7 +303,7 @@ class ExpressionPattern(Pattern):
             # (expression.get_attributes(evaluation.definitions) |
             # expression.get_head().get_attributes(evaluation.definitions)):
             new_expression = Expression(self.head, expression)
-            for leaf in self.leaves:
+            for leaf in leaves:
                 leaf.match_count = leaf.get_match_count()
                 leaf.candidates = [expression]
                 # leaf.get_match_candidates(
@@ -228,15 +319,15 @@ class ExpressionPattern(Pattern):
             # def yield_leaf(new_vars, rest):
             #    yield_func(new_vars, rest)
             self.match_leaf(
-                yield_func, self.leaves[0], self.leaves[1:],
+                yield_func, leaves[0], leaves[1:],
                 ([], [expression]), vars, new_expression, attributes,
                 evaluation, first=True, fully=fully,
-                leaf_count=len(self.leaves), wrap_oneid=True)
+                leaf_count=len(leaves), wrap_oneid=True)
 
     def get_pre_choices(self, yield_func, expression, attributes, vars):
         if 'System`Orderless' in attributes:
-            self.sort()
-            patterns = self.filter_leaves('Pattern')
+            patterns = [leaf for leaf in self.get_ordered_leaves(attributes)
+                        if leaf.get_head_name() == 'System`Pattern']
             groups = {}
             prev_pattern = prev_name = None
             for pattern in patterns:
@@ -254,10 +345,16 @@ class ExpressionPattern(Pattern):
                     prev_name = name
             # prev_leaf = None
 
-            # count duplicate leaves
-            expr_groups = {}
+            # count duplicate leaves, keeping their order
+            expr_groups = []
+            expr_indices = {}
             for leaf in expression.leaves:
-                expr_groups[leaf] = expr_groups.get(leaf, 0) + 1
+                index = expr_indices.get(leaf)
+                if index is None:
+                    expr_indices[leaf] = len(expr_groups)
+                    expr_groups.append([leaf, 1])
+                else:
+                    expr_groups[index][1] += 1
 
             def per_name(yield_name, groups, vars):
                 """
@@ -277,45 +374,46 @@ class ExpressionPattern(Pattern):
                             (sub_match_count[1] is not None and
                              sub_match_count[1] < match_count[1])):
                             match_count[1] = sub_match_count[1]
-                    # possibilities = [{}]
-                    # sum = 0
 
                     def per_expr(yield_expr, expr_groups, sum=0):
                         """
                         Yields possible values (sequence lists) for the current
                         variable (name) taking into account the
-                        (expression, count)'s in expr_groups
+                        (expression, count)'s in expr_groups: every one of
+                        the patterns takes the same number of copies of each
+                        distinct leaf
                         """
 
+                        if match_count[1] is not None and sum > match_count[1]:
+                            return
                         if expr_groups:
-                            expr, count = expr_groups.popitem()
-                            max_per_pattern = count / len(patterns)
+                            expr, count = expr_groups[0]
+                            max_per_pattern = count // len(patterns)
                             for per_pattern in range(max_per_pattern, -1, -1):
-                                for next in per_expr(   # nopep8
-                                    expr_groups, sum + per_pattern):
+                                def yield_next(next):
                                     yield_expr([expr] * per_pattern + next)
+                                per_expr(yield_next, expr_groups[1:],
+                                         sum + per_pattern)
                         else:
                             if sum >= match_count[0]:
                                 yield_expr([])
 
-                    # for sequence in per_expr(expr_groups.items()):
                     def yield_expr(sequence):
-                        wrappings = self.get_wrappings(
-                            sequence, match_count[1], expression, attributes)
-                        for wrapping in wrappings:
-                            # for next in per_name(groups[1:], vars):
+                        # the leaves are identical for all patterns, so
+                        # their order is irrelevant
+                        def yield_wrapping(wrapping):
                             def yield_next(next):
                                 setting = next.copy()
                                 setting[name] = wrapping
                                 yield_name(setting)
                             per_name(yield_next, groups[1:], vars)
+                        self.get_wrappings(
+                            yield_wrapping, sequence, match_count[1],
+                            expression, attributes, permute=False)
                     per_expr(yield_expr, expr_groups)
                 else:  # no groups left
                     yield_name(vars)
 
-            # for setting in per_name(groups.items(), vars):
-            # def yield_name(setting):
-            #    yield_func(setting)
             per_name(yield_func, list(groups.items()), vars)
         else:
             yield_func(vars)
@@ -324,6 +422,16 @@ class ExpressionPattern(Pattern):
         self.head = Pattern.create(expr.head)
         self.leaves = [Pattern.create(leaf) for leaf in expr.leaves]
         self.expr = expr
+        self.sorted_leaves = None
+
+    def get_ordered_leaves(self, attributes):
+        'The leaves in the order in which they are matched.'
+        if 'System`Orderless' not in attributes:
+            return self.leaves
+        if self.sorted_leaves is None:
+            self.sorted_leaves = sorted(
+                self.leaves, key=lambda e: e.get_sort_key(pattern_sort=True))
+        return self.sorted_leaves
 
     def filter_leaves(self, head_name):
         head_name = ensure_context(head_name)
@@ -337,12 +445,13 @@ class ExpressionPattern(Pattern):
         return (1, 1)
 
     def get_wrappings(self, yield_func, items, max_count,
-                      expression, attributes, include_flattened=True):
+                      expression, attributes, include_flattened=True,
+                      permute=True):
         if len(items) == 1:
             yield_func(items[0])
         else:
             if max_count is None or len(items) <= max_count:
-                if 'System`Orderless' in attributes:
+                if permute and 'System`Orderless' in attributes:
                     for perm in permutations(items):
                         sequence = Expression('Sequence', *perm)
                         sequence.pattern_sequence = True
@@ -388,6 +497,20 @@ class ExpressionPattern(Pattern):
         else:
             set_lengths = match_count
 
+        # the leaves left over must suffice for the remaining patterns, and
+        # without Flat they must not be more than those can take
+        rest_min, rest_max = self.get_rest_counts(rest_leaves, vars)
+        if 'System`Flat' in attributes or not fully:
+            rest_max = None
+        min_length, max_length = set_lengths
+        if max_length is None or max_length > len(candidates) - rest_min:
+            max_length = len(candidates) - rest_min
+        if rest_max is not None and min_length < len(candidates) - rest_max:
+            min_length = len(candidates) - rest_max
+        if min_length > max_length:
+            return
+        set_lengths = (min_length, max_length)
+
         # try_flattened is used later to decide whether wrapping of leaves
         # into one operand may occur.
         # This can of course also be when flat and same head.
@@ -432,6 +555,10 @@ class ExpressionPattern(Pattern):
                              included=leaf_candidates, less_first=less_first,
                              *set_lengths)
 
+        # the leaves of an Orderless expression are in canonical order, so
+        # sequences need not be permuted unless the pattern looks at them
+        permute = self.sees_order(leaf)
+
         if rest_leaves:
             next_leaf = rest_leaves[0]
             next_rest_leaves = rest_leaves[1:]
@@ -479,7 +606,104 @@ class ExpressionPattern(Pattern):
 
             self.get_wrappings(
                 yield_wrapping, items, match_count[1], expression, attributes,
-                include_flattened=include_flattened)
+                include_flattened=include_flattened, permute=permute)
+
+    def get_rest_counts(self, leaves, vars):
+        """
+        Returns the minimal and maximal (None for no limit) total number of
+        expression leaves matched by the patterns leaves.
+        """
+
+        rest_min = 0
+        rest_max = 0
+        for leaf in leaves:
+            leaf_min, leaf_max = leaf.get_match_count(vars)
+            rest_min += leaf_min
+            if rest_max is not None:
+                rest_max = None if leaf_max is None else rest_max + leaf_max
+        return rest_min, rest_max
+
+    def sees_order(self, leaf):
+        """
+        Whether the leaf pattern can tell apart different orders of the
+        leaves of a sequence it matches: it tests them, or its variable
+        also occurs elsewhere in this pattern.
+        """
+
+        expr = getattr(leaf, 'expr', None)
+        if expr is None:
+            return True
+        if expr.has_form('Pattern', 2):
+            if expr.leaves[0].get_name() in self.get_repeated_names():
+                return True
+            expr = expr.leaves[1]
+        return expr.get_head_name() not in _ORDER_BLIND_HEADS
+
+    def does_match(self, expression, evaluation, vars=None, fully=True):
+        # the leaves are matched one by one, returning instead of raising
+        # StopGenerator_Pattern, where they match one leaf each and do not
+        # depend on each other
+        if not self.is_leafwise():
+            return super(ExpressionPattern, self).does_match(
+                expression, evaluation, vars, fully)
+        attributes = self.head.get_attributes(evaluation.definitions)
+        if any(a in attributes for a in _LEAFWISE_EXCLUDED_ATTRIBUTES):
+            return super(ExpressionPattern, self).does_match(
+                expression, evaluation, vars, fully)
+        if expression.is_atom() or len(expression.leaves) != len(self.leaves):
+            return False
+        if vars is None:
+            vars = {}
+        if not self.head.does_match(expression.head, evaluation, vars):
+            return False
+        for leaf, expr_leaf in zip(self.leaves, expression.leaves):
+            if not leaf.does_match(expr_leaf, evaluation, vars):
+                return False
+        return True
+
+    def is_leafwise(self):
+        leafwise = getattr(self, '_leafwise', None)
+        if leafwise is None:
+            leafwise = (isinstance(self.head, AtomPattern) and
+                        all(leaf.get_match_count() == (1, 1)
+                            for leaf in self.leaves))
+            names = set()
+            stack = [self.expr]
+            while leafwise and stack:
+                expr = stack.pop()
+                if expr.is_atom():
+                    continue
+                head_name = expr.get_head_name()
+                if head_name == 'System`Condition':
+                    # conditions may refer to variables of other leaves
+                    leafwise = False
+                elif head_name == 'System`Pattern' and expr.leaves:
+                    name = expr.leaves[0].get_name()
+                    if name in names:
+                        leafwise = False
+                    names.add(name)
+                stack.append(expr.head)
+                stack.extend(expr.leaves)
+            self._leafwise = leafwise
+        return leafwise
+
+    def get_repeated_names(self):
+        repeated = getattr(self, '_repeated_names', None)
+        if repeated is None:
+            counts = {}
+            stack = [self.expr]
+            while stack:
+                expr = stack.pop()
+                if expr.is_atom():
+                    name = expr.get_name()
+                    if name:
+                        counts[name] = counts.get(name, 0) + 1
+                else:
+                    stack.append(expr.head)
+                    stack.extend(expr.leaves)
+            repeated = self._repeated_names = frozenset(
+                name for name, count in counts.items() if count > 1)
+        return repeated
 
     def get_match_candidates(self, leaves, expression, attributes, evaluation,
                              vars={}):
@@ -490,10 +714,11 @@ class ExpressionPattern(Pattern):
         """
         # TODO: fixed_vars!
 
+        leaves = self.filter_candidates(leaves, expression, evaluation)
         return [leaf for leaf in leaves if self.does_match(leaf, evaluation, vars)]
 
     def get_match_candidates_count(self, leaves, expression, attributes,
-                                   evaluation, vars={}):
+                                   evaluation, vars={}, limit=None):
         """
         Finds possible leaves that could match the pattern, ignoring future
         pattern variable definitions, but taking into account already fixed
@@ -501,11 +726,42 @@ class ExpressionPattern(Pattern):
         """
         # TODO: fixed_vars!
 
+        leaves = self.filter_candidates(leaves, expression, evaluation)
+        if limit == 0:
+            return 0
+        if limit is not None and len(leaves) < limit:
+            return len(leaves)
         count = 0
         for leaf in leaves:
             if self.does_match(leaf, evaluation, vars):
                 count += 1
+                if count == limit:
+                    break
         return count
 
-    def sort(self):
-        self.leaves.sort(key=lambda e: e.get_sort_key(pattern_sort=True))
+    def filter_candidates(self, leaves, expression, evaluation):
+        """
+        Discards the leaves that cannot match for their head or number of
+        leaves, without running the matcher on them.
+        """
+
+        if not isinstance(self.head, AtomPattern):
+            return leaves
+        head_name = self.head.get_name()
+        if not head_name:
+            return leaves
+        attributes = evaluation.definitions.get_attributes(head_name)
+        if 'System`OneIdentity' in attributes:
+            # atoms and other heads may match as the only leaf
+            return leaves
+        leaves = get_leaves_with_head(leaves, expression, head_name)
+
+        min_count, max_count = self.get_rest_counts(self.leaves, {})
+        if 'System`Flat' in attributes:
+            max_count = None
+        if min_count == 0 and max_count is None:
+            return leaves
+        return [leaf for leaf in leaves
+                if not leaf.is_atom() and min_count <= len(leaf.leaves) and (
+                    max_count is None or len(leaf.leaves) <= max_count)]
+
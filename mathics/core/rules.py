@@ -4,7 +4,8 @@
 from __future__ import unicode_literals
 from __future__ import absolute_import
 
-from mathics.core.expression import Expression, strip_context, KeyComparable
+from mathics.core.expression import (
+    Expression, Real, strip_context, KeyComparable)
 from mathics.core.pattern import Pattern, StopGenerator
 
 from mathics.core.util import function_arguments
@@ -14,9 +15,43 @@ class StopGenerator_BaseRule(StopGenerator):
     pass
 
 
+class MatchedOptions(dict):
+    """
+    The values of the options matched by OptionsPattern, by their full
+    names. Like Builtin.get_option, options can also be found by their
+    names without context, where the contexts in $ContextPath are tried in
+    order. These names are resolved once, on the first lookup.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(MatchedOptions, self).__init__(*args, **kwargs)
+        self.names = None
+
+    def get_full_name(self, name, definitions):
+        if self.names is None:
+            ranks = {}
+            for context in definitions.get_context_path():
+                ranks.setdefault(context, len(ranks))
+            names = {}
+            for full_name in self:
+                context, mark, short_name = full_name.rpartition('`')
+                rank = ranks.get(context + mark)
+                if rank is None:
+                    continue
+                other = names.get(short_name)
+                if other is None or rank < other[0]:
+                    names[short_name] = (rank, full_name)
+            self.names = dict((short_name, full_name) for short_name, (
+                rank, full_name) in names.items())
+        full_name = self.names.get(name)
+        if full_name in self:
+            return full_name
+        return None
+
+
 class BaseRule(KeyComparable):
     def __init__(self, pattern, system=False):
-        self.pattern = Pattern.create(pattern)
+        self.pattern = Pattern.create_cached(pattern)
         self.system = system
 
     def apply(self, expression, evaluation, fully=True, return_list=False,
@@ -33,7 +68,7 @@ class BaseRule(KeyComparable):
             if 0 < len(rest[0]) + len(rest[1]) == len(expression.get_leaves()):
                 # continue
                 return
-            options = {}
+            options = MatchedOptions()
             for name, value in list(vars.items()):
                 if name.startswith('_option_'):
                     options[name[len('_option_'):]] = value
@@ -81,25 +116,15 @@ class Rule(BaseRule):
         self.replace = replace
 
     def do_replace(self, expression, vars, options, evaluation):
-        new = self.replace.replace_vars(vars)
+        # replace_vars substitutes the values of the options for
+        # OptionValue[name]. OptionValue with a name that is not known
+        # before evaluation, like OptionValue[Symbol["n"]], looks the
+        # option up in evaluation.options, which Expression.evaluate()
+        # takes from new.options. as replace_vars builds new nodes for all
+        # of self.replace when there are options, none of them is skipped
+        # by Expression.evaluate() as being evaluated already.
+        new = self.replace.replace_vars(vars, options=options)
         new.options = options
-
-        # if options is a non-empty dict, we need to ensure reevaluation of the whole expression, since 'new' will
-        # usually contain one or more matching OptionValue[symbol_] patterns that need to get replaced with the
-        # options' values. this is achieved through Expression.evaluate(), which then triggers OptionValue.apply,
-        # which in turn consults evaluation.options to return an option value.
-
-        # in order to get there, our expression 'new' (or parts of it) must have last_evaluated None, since this
-        # would make Expression.evaluate() quit early. doing a clean deep copy here, will reset
-        # Expression.last_evaluated for all nodes in the tree.
-
-        # if the expression contains OptionValue[] patterns, but options is empty here, we don't need to act, as the
-        # expression won't change in that case. the Expression.options would be None anyway, so OptionValue.apply
-        # would just return the unchanged expression (which is what we have already).
-
-        if options:
-            new = new.copy()
-
         return new
 
     def __repr__(self):
@@ -107,23 +132,114 @@ class Rule(BaseRule):
 
 
 class BuiltinRule(BaseRule):
-    def __init__(self, pattern, function, system=False):
+    memoize = False
+
+    def __init__(self, pattern, function, system=False, memoize=False):
         super(BuiltinRule, self).__init__(pattern, system=system)
         self.function = function
         self.pass_expression = 'expression' in function_arguments(function)
-
-    def do_replace(self, expression, vars, options, evaluation):
+        self.memoize = memoize
+        if memoize:
+            # names of the builtin and the function, as functions of
+            # different builtins may have the same name
+            self.memo_name = (
+                function.__self__.get_name(), function.__name__)
         # The Python function implementing this builtin expects
         # argument names corresponding to the symbol names without
         # context marks.
-        vars_noctx = dict(((strip_context(s), vars[s]) for s in vars))
+        self.arg_names = dict((name, strip_context(name))
+                              for name in _get_pattern_names(pattern))
+        self.positional = _get_positional_pattern(pattern)
+
+    def apply(self, expression, evaluation, fully=True, return_list=False,
+              max_list=None):
+        positional = self.positional
+        if positional is not None and not return_list:
+            # leaves may match out of order or grouped for these heads
+            attributes = evaluation.definitions.get_attributes(positional[0])
+            if any(a in attributes for a in _MATCHING_ATTRIBUTES):
+                positional = None
+        if positional is None:
+            return super(BuiltinRule, self).apply(
+                expression, evaluation, fully, return_list, max_list)
+        args = self.match_positional(expression, evaluation)
+        if args is None:
+            return None
+        result = self.call(expression, args, {}, evaluation)
+        if result is None:
+            result = expression
+        return result.flatten_pattern_sequence()
+
+    def match_positional(self, expression, evaluation):
+        """
+        Matches expression against a pattern of the form head[leaf, ...]
+        without sequence patterns, leaf by leaf. Returns the arguments of
+        the function or None.
+        """
+
+        evaluation.check_stopped()
+        head_name, leaf_patterns = self.positional
+        if expression.is_atom() or expression.get_head_name() != head_name:
+            return None
+        leaves = expression.leaves
+        if len(leaves) != len(leaf_patterns):
+            return None
+        args = {}
+        for leaf, (arg_name, blank_head, atom) in zip(leaves, leaf_patterns):
+            if atom is not None:
+                if not leaf.same(atom):
+                    return None
+                continue
+            if blank_head is None:
+                if leaf.has_form('Sequence', 0):
+                    return None
+            elif leaf.get_head_name() != blank_head:
+                return None
+            if arg_name is not None:
+                args[arg_name] = leaf
+        return args
+
+    def get_args(self, vars):
+        arg_names = self.arg_names
+        return dict((arg_names.get(name) or strip_context(name), value)
+                    for name, value in vars.items())
+
+    def do_replace(self, expression, vars, options, evaluation):
+        return self.call(expression, self.get_args(vars), options, evaluation)
+
+    def call(self, expression, args, options, evaluation):
+        if self.memoize:
+            return self.call_memoized(expression, args, options, evaluation)
+        return self.call_function(expression, args, options, evaluation)
+
+    def call_function(self, expression, args, options, evaluation):
         if self.pass_expression:
-            vars_noctx['expression'] = expression
+            args['expression'] = expression
         if options:
             return self.function(
-                evaluation=evaluation, options=options, **vars_noctx)
+                evaluation=evaluation, options=options, **args)
         else:
-            return self.function(evaluation=evaluation, **vars_noctx)
+            return self.function(evaluation=evaluation, **args)
+
+    def call_memoized(self, expression, args, options, evaluation):
+        definitions = evaluation.definitions
+        cache = definitions.memo_cache
+        key = cache.make_key(self.memo_name, expression)
+        if key is not None:
+            found, result = cache.get(key, definitions)
+            if found:
+                return result.copy() if result is not None else None
+        now = definitions.now
+        out_count = len(evaluation.out)
+        message_count = evaluation.message_count
+        result = self.call_function(expression, args, options, evaluation)
+        # results that came with messages are not cached, so that the
+        # messages are shown again. this includes messages suppressed by
+        # Quiet, which are not added to evaluation.out
+        if (key is not None and len(evaluation.out) == out_count and
+                evaluation.message_count == message_count):
+            cache.put(key, result, now)
+        return result
 
     def __repr__(self):
         return '<BuiltinRule: %s -> %s>' % (self.pattern, self.function)
@@ -142,3 +258,230 @@ class BuiltinRule(BaseRule):
         cls, name = dict['function_']
 
         self.function = getattr(builtins[cls], name)
+
+
+# heads that make a left-hand side a pattern rather than a literal
+_PATTERN_HEADS = frozenset('System`' + name for name in (
+    'Pattern', 'Blank', 'BlankSequence', 'BlankNullSequence', 'Alternatives',
+    'Condition', 'PatternTest', 'Optional', 'Repeated', 'RepeatedNull',
+    'Except', 'HoldPattern', 'Verbatim', 'OptionsPattern', 'PatternSequence',
+    'Longest', 'Shortest', 'OrderlessPatternSequence'))
+
+# heads of leaves that can match a varying number of leaves
+_SEQUENCE_HEADS = frozenset('System`' + name for name in (
+    'BlankSequence', 'BlankNullSequence', 'Repeated', 'RepeatedNull',
+    'Optional', 'OptionsPattern', 'PatternSequence', 'Alternatives',
+    'Condition', 'PatternTest', 'Except', 'Longest', 'Shortest',
+    'OrderlessPatternSequence'))
+
+# attributes of heads for which leaf counts of pattern and expression
+# may differ, or a literal may match only a part of an expression
+_MATCHING_ATTRIBUTES = ('System`Flat', 'System`Orderless',
+                        'System`OneIdentity')
+
+
+def _is_literal(expr, get_matching):
+    """
+    Whether expr matches only expressions that are the same as itself, so
+    that it can be looked up by hash. get_matching(head_name) gives the
+    matching attributes of a head.
+    """
+
+    stack = [expr]
+    while stack:
+        expr = stack.pop()
+        if isinstance(expr, Real):
+            return False    # inexact numbers compare by precision
+        if not expr.is_atom():
+            head_name = expr.get_head_name()
+            if head_name in _PATTERN_HEADS:
+                return False
+            if head_name and get_matching(head_name):
+                return False
+            stack.append(expr.head)
+            stack.extend(expr.leaves)
+    return True
+
+
+def _get_matching(head_name, definitions):
+    attributes = definitions.get_attributes(head_name)
+    return frozenset(a for a in _MATCHING_ATTRIBUTES if a in attributes)
+
+
+def _has_fixed_length(leaf):
+    if leaf.is_atom():
+        return True
+    head_name = leaf.get_head_name()
+    if head_name == 'System`Pattern' and len(leaf.leaves) == 2:
+        return _has_fixed_length(leaf.leaves[1])
+    if head_name == 'System`HoldPattern' and len(leaf.leaves) == 1:
+        return _has_fixed_length(leaf.leaves[0])
+    return head_name not in _SEQUENCE_HEADS
+
+
+def _get_pattern_names(pattern):
+    names = set()
+    stack = [pattern]
+    while stack:
+        expr = stack.pop()
+        if not expr.is_atom():
+            if expr.get_head_name() == 'System`Pattern' and expr.leaves:
+                name = expr.leaves[0].get_name()
+                if name:
+                    names.add(name)
+            stack.append(expr.head)
+            stack.extend(expr.leaves)
+    return names
+
+
+def _get_positional_pattern(pattern):
+    """
+    For a pattern head[leaf, ...] with a symbol head and leaves that are
+    atoms or (named) blanks matching a single leaf, like f[x_Integer, _, 0],
+    returns the head name and a (name, blank head name, atom) triple per
+    leaf that can be matched one by one. Returns None for other patterns.
+    """
+
+    if pattern.is_atom():
+        return None
+    head_name = pattern.head.get_name()
+    if not head_name or head_name in _PATTERN_HEADS:
+        return None
+    leaf_patterns = []
+    arg_names = set()
+    for leaf in pattern.leaves:
+        if leaf.is_atom():
+            leaf_patterns.append((None, None, leaf))
+            continue
+        arg_name = None
+        if leaf.has_form('Pattern', 2):
+            arg_name = leaf.leaves[0].get_name()
+            if not arg_name or arg_name in arg_names:
+                return None
+            arg_names.add(arg_name)
+            arg_name = strip_context(arg_name)
+            leaf = leaf.leaves[1]
+        if leaf.has_form('Blank', 0):
+            blank_head = None
+        elif leaf.has_form('Blank', 1) and leaf.leaves[0].get_name():
+            blank_head = leaf.leaves[0].get_name()
+        else:
+            return None
+        leaf_patterns.append((arg_name, blank_head, None))
+    return head_name, leaf_patterns
+
+
+class ExpressionKey(object):
+    """
+    An expression as a dictionary key: keys are equal when their
+    expressions are the same.
+    """
+
+    __slots__ = ('expr', 'hash')
+
+    def __init__(self, expr):
+        self.expr = expr
+        self.hash = hash(expr)
+
+    def __hash__(self):
+        return self.hash
+
+    def __eq__(self, other):
+        return self.expr.same(other.expr)
+
+
+class RuleIndex(object):
+    """
+    A list of rules indexed by their left-hand sides, so that only the
+    rules that can match an expression are tried on it. Literal left-hand
+    sides are looked up in a hash table, patterns are bucketed by head and
+    leaf count. Rules are still tried in their order in the list.
+
+    The index depends on the matching attributes of the heads in the
+    left-hand sides, is_current() tells whether they are unchanged.
+    """
+
+    def __init__(self, rules, evaluation):
+        self.rules = rules
+        self.literals = {}      # ExpressionKey -> (position, rule)
+        self.buckets = {}       # (head name, leaf count) -> [(position, rule)]
+        self.heads = {}         # head name -> [(position, rule)]
+        self.general = []       # [(position, rule)]
+        self.candidates = {}    # (head name, leaf count) -> sorted entries
+        self.matching = {}      # head name -> its matching attributes
+
+        definitions = evaluation.definitions
+        self.checked = (definitions, definitions.now)
+
+        def get_matching(head_name):
+            matching = self.matching.get(head_name)
+            if matching is None:
+                matching = self.matching[head_name] = _get_matching(
+                    head_name, definitions)
+            return matching
+
+        for position, rule in enumerate(rules):
+            entry = (position, rule)
+            lhs = rule.pattern.expr
+            head_name = '' if lhs.is_atom() else lhs.head.get_name()
+            matching = get_matching(head_name) if head_name else ()
+            if 'System`OneIdentity' in matching:
+                # may match atoms and other heads through OneIdentity, like
+                # x_ ^ n_. matches a
+                self.general.append(entry)
+            elif not matching and _is_literal(lhs, get_matching):
+                try:
+                    key = ExpressionKey(lhs)
+                except (NotImplementedError, TypeError):
+                    self.general.append(entry)
+                    continue
+                self.literals.setdefault(key, entry)
+            elif not head_name or head_name in _PATTERN_HEADS:
+                self.general.append(entry)
+            elif not matching and all(
+                    _has_fixed_length(leaf) for leaf in lhs.leaves):
+                self.buckets.setdefault(
+                    (head_name, len(lhs.leaves)), []).append(entry)
+            else:
+                self.heads.setdefault(head_name, []).append(entry)
+
+    def is_current(self, evaluation):
+        'Whether the matching attributes the index depends on are unchanged.'
+        definitions = evaluation.definitions
+        checked = (definitions, definitions.now)
+        if self.checked == checked:
+            return True
+        for head_name, matching in self.matching.items():
+            if _get_matching(head_name, definitions) != matching:
+                return False
+        self.checked = checked
+        return True
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def get_rules(self, expr):
+        'Returns the rules that can match expr, in order.'
+        if expr.is_atom():
+            bucket = (expr.get_head_name(), None)
+        else:
+            bucket = (expr.get_head_name(), len(expr.leaves))
+        entries = self.candidates.get(bucket)
+        if entries is None:
+            entries = list(self.general)
+            if bucket[0]:
+                entries.extend(self.heads.get(bucket[0], ()))
+                entries.extend(self.buckets.get(bucket, ()))
+            entries.sort(key=lambda entry: entry[0])
+            self.candidates[bucket] = entries
+        if self.literals:
+            try:
+                literal = self.literals.get(ExpressionKey(expr))
+            except (NotImplementedError, TypeError):
+                literal = None
+            if literal is not None:
+                entries = sorted(entries + [literal], key=lambda entry: entry[0])
+        return [rule for position, rule in entries]
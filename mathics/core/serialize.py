@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compact binary serialization of expressions.
+
+An expression is written as a sequence of tagged items:
+
+    E <count> <head> <leaves...>     Expression
+    S <string>                       Symbol, added to the symbol table
+    Y <index>                        Symbol taken from the symbol table
+    I <zigzag varint>                Integer
+    J <string>                       Integer too large for a varint, in hex
+    Q <item> <item>                  Rational, numerator and denominator
+    R <8 bytes>                      MachineReal
+    P <item> <item> <item> <varint>  PrecisionReal, mantissa, exponent and
+                                     bit count of the mpf value, precision
+    C <item> <item>                  Complex, real and imaginary part
+    T <string>                       String
+    A <typecode> <count> <raw data>  List of machine integers or reals
+
+Strings are stored as their UTF-8 encoding preceded by the length and all
+binary numbers are little endian. Serialized data starts with MAGIC.
+
+compress and decompress stream the serialized data through zlib, so that
+neither the whole text nor the whole serialization has to be held in
+memory.
+"""
+
+from __future__ import unicode_literals
+from __future__ import absolute_import
+
+import struct
+import zlib
+
+import six
+import sympy
+from six.moves import range
+
+from mathics.core.expression import (
+    Expression, Symbol, String, Integer, Rational, MachineReal,
+    PrecisionReal, Complex)
+
+
+MAGIC = b'\x00MXS\x01'
+
+# Lists of at least this many machine numbers are stored raw
+PACKED_MIN_LENGTH = 4
+
+_CHUNK_SIZE = 1 << 16
+
+_MIN_INT64 = -(1 << 63)
+_MAX_INT64 = (1 << 63) - 1
+
+
+class _Writer(object):
+    def __init__(self, write):
+        self.write = write
+        self.buffer = bytearray()
+        self.symbols = {}
+
+    def flush(self):
+        if self.buffer:
+            self.write(bytes(self.buffer))
+            self.buffer = bytearray()
+
+    def varint(self, n):
+        buffer = self.buffer
+        while n > 0x7f:
+            buffer.append((n & 0x7f) | 0x80)
+            n >>= 7
+        buffer.append(n)
+
+    def string(self, s):
+        data = s.encode('utf-8')
+        self.varint(len(data))
+        self.buffer.extend(data)
+
+    def integer(self, n):
+        if _MIN_INT64 <= n <= _MAX_INT64:
+            self.buffer.extend(b'I')
+            self.varint((n << 1) if n >= 0 else ((-n << 1) - 1))
+        else:
+            self.buffer.extend(b'J')
+            self.string('%x' % n)
+
+    def expr(self, expr):
+        if len(self.buffer) > _CHUNK_SIZE:
+            self.flush()
+        buffer = self.buffer
+        if isinstance(expr, Expression):
+            leaves = expr.leaves
+            if (len(leaves) >= PACKED_MIN_LENGTH and
+                    expr.get_head_name() == 'System`List' and
+                    self.packed(leaves)):
+                return
+            buffer.extend(b'E')
+            self.varint(len(leaves))
+            self.expr(expr.head)
+            for leaf in leaves:
+                self.expr(leaf)
+        elif isinstance(expr, Symbol):
+            index = self.symbols.get(expr.name)
+            if index is None:
+                self.symbols[expr.name] = len(self.symbols)
+                buffer.extend(b'S')
+                self.string(expr.name)
+            else:
+                buffer.extend(b'Y')
+                self.varint(index)
+        elif isinstance(expr, Integer):
+            self.integer(expr.value)
+        elif isinstance(expr, String):
+            buffer.extend(b'T')
+            self.string(expr.value)
+        elif isinstance(expr, MachineReal):
+            buffer.extend(b'R')
+            buffer.extend(struct.pack('<d', expr.value))
+        elif isinstance(expr, PrecisionReal):
+            sign, man, exp, bc = expr.value._mpf_
+            buffer.extend(b'P')
+            self.integer(-int(man) if sign else int(man))
+            self.integer(int(exp))
+            self.integer(int(bc))
+            self.varint(expr.value._prec)
+        elif isinstance(expr, Rational):
+            buffer.extend(b'Q')
+            self.integer(int(expr.value.p))
+            self.integer(int(expr.value.q))
+        elif isinstance(expr, Complex):
+            buffer.extend(b'C')
+            self.expr(expr.real)
+            self.expr(expr.imag)
+        else:
+            raise ValueError('cannot serialize %s' % type(expr).__name__)
+
+    def packed(self, leaves):
+        if all(type(leaf) is MachineReal for leaf in leaves):
+            typecode = 'd'
+            values = [leaf.value for leaf in leaves]
+        elif all(type(leaf) is Integer for leaf in leaves):
+            typecode = 'q'
+            values = [leaf.value for leaf in leaves]
+            if not (_MIN_INT64 <= min(values) and max(values) <= _MAX_INT64):
+                return False
+        else:
+            return False
+        self.buffer.extend(b'A' + typecode.encode('ascii'))
+        self.varint(len(values))
+        self.buffer.extend(struct.pack(
+            str('<%d%s' % (len(values), typecode)), *values))
+        return True
+
+
+class _Reader(object):
+    def __init__(self, read):
+        self.read = read
+        self.buffer = bytearray()
+        self.pos = 0
+        self.symbols = []
+
+    def fill(self, n):
+        'Makes sure that at least n unread bytes are in the buffer.'
+        if self.pos:
+            del self.buffer[:self.pos]
+            self.pos = 0
+        while len(self.buffer) < n:
+            data = self.read(max(n - len(self.buffer), _CHUNK_SIZE))
+            if not data:
+                raise ValueError('unexpected end of data')
+            self.buffer.extend(data)
+
+    def bytes(self, n):
+        if self.pos + n > len(self.buffer):
+            self.fill(n)
+        result = self.buffer[self.pos:self.pos + n]
+        self.pos += n
+        return bytes(result)
+
+    def byte(self):
+        if self.pos >= len(self.buffer):
+            self.fill(1)
+        result = self.buffer[self.pos]
+        self.pos += 1
+        return result
+
+    def varint(self):
+        result = shift = 0
+        while True:
+            b = self.byte()
+            result |= (b & 0x7f) << shift
+            if b < 0x80:
+                return result
+            shift += 7
+
+    def string(self):
+        return self.bytes(self.varint()).decode('utf-8')
+
+    def integer(self):
+        tag = self.byte()
+        if tag == ord('I'):
+            n = self.varint()
+            return (n >> 1) if not n & 1 else -((n + 1) >> 1)
+        elif tag == ord('J'):
+            return int(self.string(), 16)
+        raise ValueError('integer expected')
+
+    def expr(self):
+        tag = self.byte()
+        if tag == ord('E'):
+            count = self.varint()
+            head = self.expr()
+            return Expression(head, *[self.expr() for i in range(count)])
+        elif tag == ord('Y'):
+            return Symbol(self.symbols[self.varint()])
+        elif tag == ord('S'):
+            name = self.string()
+            self.symbols.append(name)
+            return Symbol(name)
+        elif tag in (ord('I'), ord('J')):
+            self.pos -= 1
+            return Integer(self.integer())
+        elif tag == ord('T'):
+            return String(self.string())
+        elif tag == ord('R'):
+            return MachineReal(struct.unpack('<d', self.bytes(8))[0])
+        elif tag == ord('P'):
+            man = self.integer()
+            exp = self.integer()
+            bc = self.integer()
+            prec = self.varint()
+            mpf = (int(man < 0), abs(man), exp, bc)
+            return PrecisionReal(sympy.Float._new(mpf, prec))
+        elif tag == ord('Q'):
+            numerator = self.integer()
+            return Rational(numerator, self.integer())
+        elif tag == ord('C'):
+            real = self.expr()
+            return Complex(real, self.expr())
+        elif tag == ord('A'):
+            typecode = chr(self.byte())
+            if typecode not in 'dq':
+                raise ValueError('unknown packed type %s' % typecode)
+            count = self.varint()
+            values = struct.unpack(str('<%d%s' % (count, typecode)),
+                                   self.bytes(8 * count))
+            atom = MachineReal if typecode == 'd' else Integer
+            return Expression('List', *[atom(value) for value in values])
+        raise ValueError('unknown tag %r' % tag)
+
+
+def dump(expr, write):
+    '''
+    Serializes expr, passing the data in chunks to the function write.
+    Raises ValueError if expr contains atoms that cannot be serialized.
+    '''
+    writer = _Writer(write)
+    writer.buffer.extend(MAGIC)
+    writer.expr(expr)
+    writer.flush()
+
+
+def load(read):
+    '''
+    Reads a serialized expression using read(n), which returns at most n
+    bytes. Raises ValueError if the data is not a serialized expression.
+    '''
+    reader = _Reader(read)
+    if reader.bytes(len(MAGIC)) != MAGIC:
+        raise ValueError('not a serialized expression')
+    return reader.expr()
+
+
+def dumps(expr):
+    'Returns the serialization of expr as bytes.'
+    chunks = []
+    dump(expr, chunks.append)
+    return b''.join(chunks)
+
+
+def loads(data):
+    'Returns the expression serialized in the bytes data.'
+    return load(six.BytesIO(data).read)
+
+
+def compress(expr, level=zlib.Z_DEFAULT_COMPRESSION):
+    'Returns the zlib compressed serialization of expr.'
+    compressor = zlib.compressobj(level)
+    chunks = []
+    dump(expr, lambda data: chunks.append(compressor.compress(data)))
+    chunks.append(compressor.flush())
+    return b''.join(chunks)
+
+
+def decompress(data):
+    '''
+    Returns the expression from the output of compress. Raises ValueError
+    if the decompressed data is not a serialized expression and zlib.error
+    if data is not zlib compressed.
+    '''
+    decompressor = zlib.decompressobj()
+    pending = [data]
+
+    def read(n):
+        result = decompressor.decompress(pending[0], n)
+        pending[0] = decompressor.unconsumed_tail
+        if not result and not pending[0]:
+            result = decompressor.flush()
+        return result
+
+    return load(read)
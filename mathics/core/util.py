@@ -62,6 +62,13 @@ def permutations(items, without_duplicates=True):
 
 
 def subsets(items, min, max, included=None, less_first=False):
+    """
+    Yields the subsets of items with min to max elements. Identical items
+    (by same()) are treated as one multiset element when they are
+    adjacent, as in the leaves of an Orderless expression, so that every
+    distinct subset is yielded only once.
+    """
+
     if max is None:
         max = len(items)
     lengths = list(range(min, max + 1))
@@ -71,25 +78,31 @@ def subsets(items, min, max, included=None, less_first=False):
     if lengths and lengths[0] == 0:
         lengths = lengths[1:] + [0]
 
-    def decide(chosen, not_chosen, rest, count):
+    def decide(chosen, not_chosen, rest, count, skipped):
+        # skipped is the last item not chosen; an identical item following
+        # it must not be chosen either, as that subset was already yielded
         if count < 0 or len(rest) < count:
             return
         if count == 0:
             yield chosen, not_chosen + rest
         elif len(rest) == count:
+            if skipped is not None and rest[0].same(skipped):
+                return
             if included is None or all(item in included for item in rest):
                 yield chosen + rest, not_chosen
         elif rest:
             item = rest[0]
-            if included is None or item in included:
+            if ((included is None or item in included) and      # nopep8
+                    (skipped is None or not item.same(skipped))):
                 for set in decide(chosen + [item], not_chosen, rest[1:],
-                                  count - 1):
+                                  count - 1, skipped):
                     yield set
-            for set in decide(chosen, not_chosen + [item], rest[1:], count):
+            for set in decide(chosen, not_chosen + [item], rest[1:], count,
+                              item):
                 yield set
 
     for length in lengths:
-        for chosen, not_chosen in decide([], [], items, length):
+        for chosen, not_chosen in decide([], [], items, length, None):
             yield chosen, ([], not_chosen)
 
 
@@ -25,14 +25,36 @@ LOG_QUERIES = False
 # unix only
 TIMEOUT = None
 
+# seconds all expressions of a notebook query may take together in the
+# worker processes of the web interface, or None. A worker process that
+# does not reply within WORKER_REPLY_GRACE seconds more is restarted,
+# losing its sessions.
+QUERY_TIMEOUT = 60
+WORKER_REPLY_GRACE = 30
+
 # specifies a maximum recursion depth is safe for all Python environments
 # without setting a custom thread stack size.
 DEFAULT_MAX_RECURSION_DEPTH = 512
 
-# max pickle.dumps() size for storing results in DB
+# max estimated output size (in characters) for storing results in DB
 # historically 10000 was used on public mathics servers
 MAX_STORED_SIZE = 10000
 
+# results whose output would be longer than $OutputSizeLimit characters or
+# contain more than MAX_OUTPUT_LEAVES atoms (both estimated before formatting)
+# are shown as a sample of about OUTPUT_SAMPLE_SIZE characters, with the
+# omitted parts replaced by Skeleton[n]
+OUTPUT_SIZE_LIMIT = 1 << 20
+MAX_OUTPUT_LEAVES = 100000
+OUTPUT_SAMPLE_SIZE = 2000
+
+# number of results of builtins declared with memoize that are cached for
+# every session
+MEMOIZE_CACHE_SIZE = 1000
+
+# number of compiled rule and match patterns kept for reuse
+PATTERN_CACHE_SIZE = 1000
+
 ADMINS = (
     ('Admin', 'mail@test.com'),
 )
@@ -46,6 +68,19 @@ else:
 # if not path.exists(DATA_DIR):
 #    os.makedirs(DATA_DIR)
 
+# Parsed files read by Get are cached here. Set to None to only cache them
+# in memory.
+PARSE_CACHE_DIR = DATA_DIR + 'parse_cache/'
+
+# Number of worker processes evaluating notebook queries. Each keeps the
+# definitions of the sessions pinned to it in memory, up to
+# MAX_WORKER_SESSIONS; the least recently used ones are spilled to
+# SESSION_SPILL_DIR. With 0, queries are evaluated in the server process
+# and only the changed definitions are written to the database.
+EVALUATION_WORKERS = 4
+MAX_WORKER_SESSIONS = 50
+SESSION_SPILL_DIR = DATA_DIR + 'sessions/'
+
 DOC_DIR = ROOT_DIR + 'doc/documentation/'
 DOC_TEX_DATA = ROOT_DIR + 'doc/tex/data'
 DOC_XML_DATA = ROOT_DIR + 'doc/xml/data'
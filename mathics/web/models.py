@@ -32,3 +32,14 @@ class Worksheet(models.Model):
 
     class Meta:
         unique_together = (('user', 'name'),)
+
+
+class UserDefinition(models.Model):
+    # the pickled definition of the symbol name, or of the In/Out history
+    # if name is empty, in the notebook session session
+    session = models.CharField(max_length=32, db_index=True)
+    name = models.TextField()
+    data = models.BinaryField()
+
+    class Meta:
+        unique_together = (('session', 'name'),)
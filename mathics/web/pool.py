@@ -0,0 +1,260 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Evaluation of notebook queries in a pool of long-lived worker processes.
+
+Every worker loads the builtin definitions once and keeps the user
+definitions of the sessions pinned to it in memory, so that a query does
+not have to unpickle and pickle the whole session. Sessions that were not
+used for the longest time are spilled to disk when a worker holds more
+than settings.MAX_WORKER_SESSIONS of them. The web view talks to the
+workers over pipes. A query times out after settings.QUERY_TIMEOUT
+seconds, and a worker that does not reply soon after is restarted. The
+sessions it held in memory are lost, which their users are told on their
+next query.
+"""
+
+from __future__ import unicode_literals
+from __future__ import absolute_import
+
+import os
+import sys
+import hashlib
+import threading
+import traceback
+import zlib
+import multiprocessing
+from collections import OrderedDict
+
+import six.moves.cPickle as pickle
+
+from mathics import settings
+from mathics.core.definitions import Definitions, History, UserDefinitions
+from mathics.core.evaluation import (
+    Evaluation, Message, Result, Output, clock)
+
+
+class WebOutput(Output):
+    pass
+
+
+def evaluate_query(definitions, input, query_timeout=None):
+    '''
+    Evaluates all expressions of the string input, each for at most
+    settings.TIMEOUT seconds and all of them for at most query_timeout
+    seconds. Returns the data of the results and whether the evaluation
+    timed out.
+    '''
+    from mathics.core.parser import MultiLineFeeder
+
+    evaluation = Evaluation(definitions, format='xml', output=WebOutput())
+    feeder = MultiLineFeeder(input, '<notebook>')
+    results = []
+    if query_timeout is not None:
+        deadline = clock() + query_timeout
+    try:
+        while not feeder.empty():
+            expr = evaluation.parse_feeder(feeder)
+            if expr is None:
+                results.append(Result(evaluation.out, None, None))  # syntax errors
+                evaluation.out = []
+                continue
+            timeout = settings.TIMEOUT
+            if query_timeout is not None:
+                # the expressions of the query share its time
+                remaining = max(deadline - clock(), 0)
+                if timeout is None or remaining < timeout:
+                    timeout = remaining
+            result = evaluation.evaluate(expr, timeout=timeout)
+            if result is not None:
+                results.append(result)
+    except Exception as exc:
+        if settings.DEBUG and settings.DISPLAY_EXCEPTIONS:
+            info = traceback.format_exception(*sys.exc_info())
+            info = '\n'.join(info)
+            msg = 'Exception raised: %s\n\n%s' % (exc, info)
+            results.append(Result([Message('System', 'exception', msg)], None, None))
+        else:
+            raise
+    return [result.get_data() for result in results], evaluation.timeout
+
+
+class SessionStore(object):
+    '''
+    The user definitions and histories of the sessions of one worker, the
+    least recently used ones spilled to disk.
+    '''
+
+    def __init__(self, max_sessions, spill_dir):
+        self.max_sessions = max_sessions
+        self.spill_dir = spill_dir
+        self.sessions = OrderedDict()   # key -> (user, history)
+
+    def spill_path(self, key):
+        name = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.spill_dir, name + '.pickle')
+
+    def get(self, key):
+        state = self.sessions.pop(key, None)
+        if state is None:
+            path = self.spill_path(key)
+            try:
+                with open(path, 'rb') as spill_file:
+                    state = pickle.load(spill_file)
+                os.remove(path)
+            except (IOError, OSError, EOFError, pickle.UnpicklingError):
+                state = (UserDefinitions(), History())
+        self.sessions[key] = state
+        return state
+
+    def put(self, key, state):
+        self.sessions.pop(key, None)
+        self.sessions[key] = state
+        while len(self.sessions) > self.max_sessions:
+            old_key, old_state = self.sessions.popitem(last=False)
+            try:
+                if not os.path.exists(self.spill_dir):
+                    os.makedirs(self.spill_dir)
+                with open(self.spill_path(old_key), 'wb') as spill_file:
+                    pickle.dump(old_state, spill_file, protocol=2)
+            except (IOError, OSError, pickle.PicklingError):
+                pass    # the session is lost, as if it had expired
+
+
+def _worker_main(conn, max_sessions, spill_dir):
+    definitions = Definitions(add_builtin=True)
+    store = SessionStore(max_sessions, spill_dir)
+    last_key = None
+    conn.send('ready')
+    while True:
+        try:
+            key, input = conn.recv()
+        except EOFError:
+            break
+        if key != last_key:
+            definitions.set_user(*store.get(key))
+            last_key = key
+        try:
+            reply = ('ok', evaluate_query(
+                definitions, input, settings.QUERY_TIMEOUT))
+        except Exception:
+            reply = ('error', traceback.format_exc())
+        # Quit[] replaces the user definitions and the history
+        store.put(key, (definitions.user, definitions.history))
+        conn.send(reply)
+
+
+def _message_data(text):
+    return Result([Message('System', 'session', text)], None, None).get_data()
+
+
+class Worker(object):
+    def __init__(self, max_sessions, spill_dir):
+        self.args = (max_sessions, spill_dir)
+        self.lock = threading.Lock()
+        self.process = None
+        self.conn = None
+        # the keys of the sessions the worker holds in memory, least
+        # recently used first as in its SessionStore, and of those lost
+        # with a worker whose users were not told yet
+        self.sessions = OrderedDict()
+        self.lost = set()
+
+    def start(self):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_main, args=(child_conn,) + self.args)
+        self.process.daemon = True
+        self.process.start()
+        child_conn.close()
+        # loading the builtins does not count for the time of a query
+        self.conn.recv()
+
+    def stop(self):
+        self.process.terminate()
+        self.process.join()
+        self.process = None
+        self.conn.close()
+
+    def evaluate(self, key, input):
+        if settings.QUERY_TIMEOUT is None:
+            reply_timeout = None
+        else:
+            reply_timeout = settings.QUERY_TIMEOUT + settings.WORKER_REPLY_GRACE
+        with self.lock:
+            notices = []
+            if key in self.lost:
+                self.lost.discard(key)
+                notices.append(_message_data(
+                    'The definitions of this session were lost when another '
+                    'evaluation had to be stopped.'))
+            try:
+                if self.process is None or not self.process.is_alive():
+                    self.start()
+                self.conn.send((key, input))
+                if not self.conn.poll(reply_timeout):
+                    # stuck outside of the evaluation's deadline checks
+                    self.stop()
+                    return self.lose_sessions(key, notices, (
+                        'The evaluation did not stop after its time limit '
+                        'and was aborted. The definitions of this session '
+                        'were lost.'), True)
+                status, value = self.conn.recv()
+            except (EOFError, IOError, OSError):
+                # the worker died, e.g. from running out of memory
+                self.process = None
+                return self.lose_sessions(key, notices, (
+                    'The evaluation stopped unexpectedly, e.g. because it ran '
+                    'out of memory. The definitions of this session were '
+                    'lost.'), False)
+            self.sessions.pop(key, None)
+            self.sessions[key] = True
+            while len(self.sessions) > self.args[0]:
+                self.sessions.popitem(last=False)
+        if status == 'error':
+            raise RuntimeError('evaluation failed in worker:\n' + value)
+        data, timeout = value
+        return notices + data, timeout
+
+    def lose_sessions(self, key, notices, text, timeout):
+        '''
+        Records that the sessions held by the worker were lost, and returns
+        the reply to the query of session key.
+        '''
+        self.lost.update(self.sessions)
+        self.lost.discard(key)
+        self.sessions = OrderedDict()
+        return notices + [_message_data(text)], timeout
+
+
+class EvaluationPool(object):
+    '''
+    A fixed number of worker processes, each session pinned to one of them.
+    Workers are started on their first query.
+    '''
+
+    def __init__(self, size, max_sessions, spill_dir):
+        self.workers = [Worker(max_sessions, spill_dir) for i in range(size)]
+
+    def evaluate(self, key, input):
+        '''
+        Evaluates input in the session key. Returns the data of the results
+        and whether the evaluation timed out.
+        '''
+        index = zlib.crc32(key.encode('utf-8')) % len(self.workers)
+        return self.workers[index].evaluate(key, input)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = EvaluationPool(
+                settings.EVALUATION_WORKERS, settings.MAX_WORKER_SESSIONS,
+                settings.SESSION_SPILL_DIR)
+        return _pool
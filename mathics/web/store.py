@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Storage of the user definitions of notebook sessions in the database, one
+row per symbol, so that a query only loads the definitions it uses and
+only writes back the ones it changed.
+"""
+
+from __future__ import unicode_literals
+from __future__ import absolute_import
+
+import six.moves.cPickle as pickle
+
+from django.db import transaction
+
+from mathics.web.models import UserDefinition
+
+# the name of the row holding the In/Out history, which is no symbol name
+HISTORY_NAME = ''
+
+
+class DatabaseDefinitionStore(object):
+    def __init__(self, session):
+        self.session = session
+
+    def _rows(self):
+        return UserDefinition.objects.filter(session=self.session)
+
+    def _load(self, name):
+        try:
+            row = self._rows().get(name=name)
+        except UserDefinition.DoesNotExist:
+            return None
+        return pickle.loads(bytes(row.data))
+
+    def _save(self, name, value):
+        UserDefinition.objects.update_or_create(
+            session=self.session, name=name,
+            defaults={'data': pickle.dumps(value, protocol=2)})
+
+    def get_names(self):
+        return self._rows().exclude(name=HISTORY_NAME).values_list(
+            'name', flat=True)
+
+    def load(self, name):
+        return self._load(name)
+
+    def save(self, changes):
+        with transaction.atomic():
+            removed = [name for name, definition in changes.items()
+                       if definition is None]
+            if removed:
+                self._rows().filter(name__in=removed).delete()
+            for name, definition in changes.items():
+                if definition is not None:
+                    self._save(name, definition)
+
+    def load_history(self):
+        return self._load(HISTORY_NAME)
+
+    def save_history(self, history):
+        self._save(HISTORY_NAME, history)
@@ -5,8 +5,7 @@ from __future__ import unicode_literals
 from __future__ import print_function
 from __future__ import absolute_import
 
-import sys
-import traceback
+import uuid
 
 from django.shortcuts import render_to_response
 from django.template import RequestContext, loader
@@ -20,7 +19,8 @@ from django.contrib.auth.models import User
 from django.core.mail import send_mail
 
 from mathics.core.definitions import Definitions
-from mathics.core.evaluation import Evaluation, Message, Result, Output
+from mathics.web.pool import evaluate_query, get_pool
+from mathics.web.store import DatabaseDefinitionStore
 
 from mathics.web.models import Query, Worksheet
 from mathics.web.forms import LoginForm, SaveForm
@@ -47,10 +47,6 @@ class JsonResponse(HttpResponse):
         super(JsonResponse, self).__init__(response, content_type=JSON_CONTENT_TYPE)
 
 
-class WebOutput(Output):
-    pass
-
-
 def require_ajax_login(func):
     def new_func(request, *args, **kwargs):
         if not request.user.is_authenticated():
@@ -90,8 +86,6 @@ def error_500_view(request):
 
 
 def query(request):
-    from mathics.core.parser import MultiLineFeeder
-
     input = request.POST.get('query', '')
     if settings.DEBUG and not input:
         input = request.GET.get('query', '')
@@ -107,36 +101,22 @@ def query(request):
                           )
         query_log.save()
 
-    user_definitions = request.session.get('definitions')
-    definitions.set_user_definitions(user_definitions)
-    evaluation = Evaluation(definitions, format='xml', output=WebOutput())
-    feeder = MultiLineFeeder(input, '<notebook>')
-    results = []
-    try:
-        while not feeder.empty():
-            expr = evaluation.parse_feeder(feeder)
-            if expr is None:
-                results.append(Result(evaluation.out, None, None))  # syntax errors
-                evaluation.out = []
-                continue
-            result = evaluation.evaluate(expr, timeout=settings.TIMEOUT)
-            if result is not None:
-                results.append(result)
-    except Exception as exc:
-        if settings.DEBUG and settings.DISPLAY_EXCEPTIONS:
-            info = traceback.format_exception(*sys.exc_info())
-            info = '\n'.join(info)
-            msg = 'Exception raised: %s\n\n%s' % (exc, info)
-            results.append(Result([Message('System', 'exception', msg)], None, None))
-        else:
-            raise
+    # the key survives logout(), unlike the session key
+    key = request.session.get('evaluation_key')
+    if key is None:
+        key = request.session['evaluation_key'] = uuid.uuid4().hex
+    if settings.EVALUATION_WORKERS:
+        data, timeout = get_pool().evaluate(key, input)
+    else:
+        definitions.set_user_store(DatabaseDefinitionStore(key))
+        data, timeout = evaluate_query(definitions, input)
+        definitions.save_user_definitions()
     result = {
-        'results': [result.get_data() for result in results],
+        'results': data,
     }
-    request.session['definitions'] = definitions.get_user_definitions()
 
     if settings.LOG_QUERIES:
-        query_log.timeout = evaluation.timeout
+        query_log.timeout = timeout
         query_log.result = six.text_type(result)  # evaluation.results
         query_log.error = False
         query_log.save()
@@ -235,9 +215,10 @@ Your password is: %s\n\nYours,\nThe Mathics team""" % password)
 
 def logout(request):
     # Remember user definitions
-    user_definitions = request.session.get('definitions', {})
+    evaluation_key = request.session.get('evaluation_key')
     auth.logout(request)
-    request.session['definitions'] = user_definitions
+    if evaluation_key is not None:
+        request.session['evaluation_key'] = evaluation_key
     return JsonResponse()
 
 
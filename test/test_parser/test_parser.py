@@ -347,6 +347,16 @@ class GeneralTests(ParserTests):
         self.check('{, a, b}', Node('List', Symbol('Null'), Symbol('a'), Symbol('b')))
         self.check('{,a,b,}', Node('List', Symbol('Null'), Symbol('a'), Symbol('b'), Symbol('Null')))
 
+    def testAssociation(self):
+        self.check('<|a -> 1|>', Node('Association', Node('Rule', Symbol('a'), Number('1'))))
+        self.check('<||>', Node('Association'))
+        self.check('<|a -> 1, b :> 2|>', 'Association[Rule[a, 1], RuleDelayed[b, 2]]')
+        self.check('<|a|b|>', Node('Association', Node('Alternatives', Symbol('a'), Symbol('b'))))
+        self.check('<|a||b|>', Node('Association', Node('Or', Symbol('a'), Symbol('b'))))
+        self.check('<|a -> <|b -> 1|>|>', 'Association[Rule[a, Association[Rule[b, 1]]]]')
+        self.check('<|a -> 1|>[a]', 'Association[Rule[a, 1]][a]')
+        self.check('<|a,|>', Node('Association', Symbol('a'), Symbol('Null')))
+
     def testSequence(self):
         self.check('Sin[x, y]', Node('Sin', Symbol('x'), Symbol('y')))
 
@@ -646,12 +656,14 @@ class IncompleteTests(ParserTests):
         self.invalid_error('x]')      # bktmop
         self.invalid_error('x}')      # bktmop
         self.invalid_error('x]]')     # bktmop
+        self.invalid_error('x|>')     # bktmop
 
     def testBracketIncomplete(self):
         self.incomplete_error('(x')     # bktmcp
         self.incomplete_error('f[x')    # bktmcp
         self.incomplete_error('{x')     # bktmcp
         self.incomplete_error('f[[x')   # bktmcp
+        self.incomplete_error('<|x')    # bktmcp
 
     def testBracketIncompleteInvalid(self):
         self.invalid_error('(x,')
@@ -659,6 +671,8 @@ class IncompleteTests(ParserTests):
         self.invalid_error('[x')
         self.incomplete_error('{x')
         self.invalid_error('[[x')
+        self.invalid_error('<|x]')
+        self.invalid_error('{x|>')
 
 
 class CommentTests(ParserTests):
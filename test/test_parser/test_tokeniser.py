@@ -129,6 +129,14 @@ class TokeniserTest(unittest.TestCase):
         self.assertEqual(self.tokens('f @ x'), [Token('Symbol', 'f', 0), Token('Prefix', '@', 2), Token('Symbol', 'x', 4)])
         self.assertEqual(self.tokens('f ~ x'), [Token('Symbol', 'f', 0), Token('Infix', '~', 2), Token('Symbol', 'x', 4)])
 
+    def testAssociation(self):
+        self.assertEqual(self.tokens('<|a|>'), [Token('RawLeftAssociation', '<|', 0), Token('Symbol', 'a', 2), Token('RawRightAssociation', '|>', 3)])
+        self.assertEqual(self.tokens('<||>'), [Token('RawLeftAssociation', '<|', 0), Token('RawRightAssociation', '|>', 2)])
+        self.assertEqual(self.tokens('a|b'), [Token('Symbol', 'a', 0), Token('Alternatives', '|', 1), Token('Symbol', 'b', 2)])
+        self.assertEqual(self.tokens('a||b'), [Token('Symbol', 'a', 0), Token('Or', '||', 1), Token('Symbol', 'b', 3)])
+        self.assertEqual(self.tags('<|a|b|>'), ['RawLeftAssociation', 'Symbol', 'Alternatives', 'Symbol', 'RawRightAssociation'])
+        self.assertEqual(self.tags('x<y|z'), ['Symbol', 'Less', 'Symbol', 'Alternatives', 'Symbol'])
+
     def testBackslash(self):
         self.assertEqual(self.tokens('\[Backslash]'), [Token('Backslash', '\u2216', 0)])
         self.assertEqual(self.tokens('\\ a'), [Token('RawBackslash', '\\', 0), Token('Symbol', 'a', 2)])
@@ -1,8 +1,11 @@
+import marshal
 import unittest
 import six
 
 from mathics.core.definitions import Definitions
-from mathics.core.parser import parse, InvalidSyntaxError, IncompleteSyntaxError
+from mathics.core.parser import (
+    parse, parse_generic, convert_generic, InvalidSyntaxError,
+    IncompleteSyntaxError)
 from mathics.core.parser.feed import SingleLineFeeder, MultiLineFeeder
 
 
@@ -84,3 +87,29 @@ class MultiLineParserTests(UtilTests):
         feeder = MultiLineFeeder('a;;\n^b')
         self.compare(parse(definitions, feeder), self.parse('Span[a, All]'))
         self.assertRaises(InvalidSyntaxError, lambda f: parse(definitions, f), feeder)
+
+
+class GenericParserTests(UtilTests):
+    def parse(self, code):
+        generic = parse_generic(SingleLineFeeder(code))
+        # the generic form must survive the on-disk cache of Get
+        generic = marshal.loads(marshal.dumps(generic))
+        return convert_generic(generic, definitions)
+
+    def compare(self, expr1, expr2):
+        self.assertTrue(expr1.same(expr2))
+
+    def test_same_as_parse(self):
+        for code in ['f[x_, y_:1] := x^2 + y', 'a`b + `c', '{1, -2.5, 3/4}',
+                     '1.5`30', '"s\\n" <> s', '16^^ff']:
+            expr = parse(definitions, SingleLineFeeder(code))
+            self.check(code, expr)
+
+    def test_context(self):
+        generic = parse_generic(SingleLineFeeder('x'))
+        definitions.set_current_context('GenericTest`')
+        try:
+            self.check(convert_generic(generic, definitions),
+                       parse(definitions, SingleLineFeeder('GenericTest`x')))
+        finally:
+            definitions.set_current_context('Global`')
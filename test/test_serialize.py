@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import unicode_literals
+
+import unittest
+
+from mathics.core.definitions import Definitions
+from mathics.core.evaluation import Evaluation
+from mathics.core.parser import parse, SingleLineFeeder
+from mathics.core import serialize
+
+
+definitions = Definitions(add_builtin=True)
+
+
+def evaluate(code):
+    expr = parse(definitions, SingleLineFeeder(code))
+    return expr.evaluate(Evaluation(definitions, catch_interrupt=False))
+
+
+class SerializeTest(unittest.TestCase):
+    def check(self, code):
+        expr = evaluate(code)
+        result = serialize.loads(serialize.dumps(expr))
+        self.assertTrue(result.same(expr), code)
+        result = serialize.decompress(serialize.compress(expr))
+        self.assertTrue(result.same(expr), code)
+        return result
+
+    def testAtoms(self):
+        self.check('x')
+        self.check('"abc―"')
+        self.check('-17')
+        self.check('2 ^ 100')
+        self.check('-2 ^ 70')
+        self.check('3 / 7')
+        self.check('-1.5')
+        self.check('1.5 - 2 I')
+        self.check('3 / 4 + 2 I')
+
+    def testPrecisionReal(self):
+        for code in ['N[Pi, 30]', 'N[-E / 10 ^ 50, 40]', '1.5`20']:
+            expr = evaluate(code)
+            result = self.check(code)
+            self.assertEqual(result.value._prec, expr.value._prec)
+
+    def testExpressions(self):
+        self.check('f[x, {a, b}, {a, b}, g[][y]]')
+        self.check('Hold[1 + 1]')
+        self.check('{}')
+
+    def testPacked(self):
+        self.check('Range[1000]')
+        self.check('N[Range[1000] / 7]')
+        self.check('{1, 2, 3, 2 ^ 64}')
+        self.check('{1, 2, 3, 4.5}')
+        data = serialize.dumps(evaluate('Range[1000]'))
+        self.assertEqual(data[:len(serialize.MAGIC) + 2],
+                         serialize.MAGIC + b'Aq')
+
+    def testInvalid(self):
+        self.assertRaises(ValueError, serialize.loads, b'f[x]')
+        self.assertRaises(ValueError, serialize.loads, serialize.MAGIC + b'E')
+
+
+if __name__ == '__main__':
+    unittest.main()